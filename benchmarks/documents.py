@@ -0,0 +1,106 @@
+"""Module providing the generated documents of the loader and upload benchmarks"""
+import csv
+import os
+import zipfile
+from typing import Dict, Optional
+
+
+def write_csv(path: str, rows: int) -> str:
+    """Write a CSV file with a header and rows data rows"""
+    with open(path, "w", newline="", encoding="utf-8") as file:
+        writer = csv.writer(file)
+        writer.writerow(["id", "name", "price", "date", "comment"])
+        for index in range(rows):
+            writer.writerow([index, f"product {index}", index * 1.5, "2024-01-01", "lorem ipsum dolor sit amet"])
+    return path
+
+
+def write_xlsx(path: str, rows: int) -> Optional[str]:
+    """Write an XLSX file (None if openpyxl is not installed)"""
+    try:
+        import openpyxl  # pylint: disable=import-outside-toplevel
+    except ImportError:
+        return None
+    workbook = openpyxl.Workbook(write_only=True)
+    sheet = workbook.create_sheet()
+    sheet.append(["id", "name", "price", "date", "comment"])
+    for index in range(rows):
+        sheet.append([index, f"product {index}", index * 1.5, "2024-01-01", "lorem ipsum dolor sit amet"])
+    workbook.save(path)
+    return path
+
+
+def write_docx(path: str, paragraphs: int) -> str:
+    """Write a minimal DOCX file (one text run per paragraph)"""
+    body = "".join(
+        f"<w:p><w:r><w:t>Paragraph {index} lorem ipsum dolor sit amet, consectetur adipiscing elit.</w:t></w:r></w:p>"
+        for index in range(paragraphs))
+    with zipfile.ZipFile(path, "w", zipfile.ZIP_DEFLATED) as archive:
+        archive.writestr("[Content_Types].xml", (
+            '<?xml version="1.0" encoding="UTF-8"?>'
+            '<Types xmlns="http://schemas.openxmlformats.org/package/2006/content-types">'
+            '<Default Extension="rels" ContentType="application/vnd.openxmlformats-package.relationships+xml"/>'
+            '<Default Extension="xml" ContentType="application/xml"/>'
+            '<Override PartName="/word/document.xml" '
+            'ContentType="application/vnd.openxmlformats-officedocument.wordprocessingml.document.main+xml"/>'
+            '</Types>'))
+        archive.writestr("_rels/.rels", (
+            '<?xml version="1.0" encoding="UTF-8"?>'
+            '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+            '<Relationship Id="rId1" Target="word/document.xml" '
+            'Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/officeDocument"/>'
+            '</Relationships>'))
+        archive.writestr("word/document.xml", (
+            '<?xml version="1.0" encoding="UTF-8"?>'
+            '<w:document xmlns:w="http://schemas.openxmlformats.org/wordprocessingml/2006/main">'
+            f'<w:body>{body}</w:body></w:document>'))
+    return path
+
+
+def write_pdf(path: str, pages: int) -> str:
+    """Write a minimal PDF file with one line of text per page"""
+    objects = [
+        "<< /Type /Catalog /Pages 2 0 R >>",
+        f"<< /Type /Pages /Kids [{' '.join(f'{3 + 2 * index} 0 R' for index in range(pages))}] /Count {pages} >>"]
+    font = 3 + 2 * pages
+    for index in range(pages):
+        content = f"BT /F1 12 Tf 72 720 Td (Page {index} lorem ipsum dolor sit amet) Tj ET"
+        objects.append(
+            f"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 612 792] /Contents {4 + 2 * index} 0 R "
+            f"/Resources << /Font << /F1 {font} 0 R >> >> >>")
+        objects.append(f"<< /Length {len(content)} >>\nstream\n{content}\nendstream")
+    objects.append("<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>")
+    output = b"%PDF-1.4\n"
+    offsets = []
+    for number, obj in enumerate(objects, 1):
+        offsets.append(len(output))
+        output += f"{number} 0 obj\n{obj}\nendobj\n".encode("ascii")
+    xref = len(output)
+    output += f"xref\n0 {len(objects) + 1}\n0000000000 65535 f \n".encode("ascii")
+    for offset in offsets:
+        output += f"{offset:010d} 00000 n \n".encode("ascii")
+    output += f"trailer\n<< /Size {len(objects) + 1} /Root 1 0 R >>\nstartxref\n{xref}\n%%EOF\n".encode("ascii")
+    with open(path, "wb") as file:
+        file.write(output)
+    return path
+
+
+def write_upload(path: str, size: int) -> str:
+    """Write a file of size random bytes (uploaded, never parsed)"""
+    with open(path, "wb") as file:
+        file.write(os.urandom(size))
+    return path
+
+
+def write_documents(directory: str, rows: int, pages: int, upload_bytes: int) -> Dict[str, Optional[str]]:
+    """Write all benchmark documents into directory
+
+    Returns:
+        Dict[str, Optional[str]]: File path by kind (csv, xlsx, docx, pdf, upload), None if it could not be written
+    """
+    return {
+        "csv": write_csv(os.path.join(directory, "table.csv"), rows),
+        "xlsx": write_xlsx(os.path.join(directory, "table.xlsx"), rows),
+        "docx": write_docx(os.path.join(directory, "text.docx"), pages * 20),
+        "pdf": write_pdf(os.path.join(directory, "text.pdf"), pages),
+        "upload": write_upload(os.path.join(directory, "upload.pdf"), upload_bytes)}
@@ -0,0 +1,218 @@
+"""Module providing a local stand-in of the AI Manager API for the benchmarks.
+
+Implements the routes used by the clients (auth, models, prompts, datasources) with configurable
+latency, payload sizes and error rate. Run it standalone (python benchmarks/fake_server.py --port 8080)
+or in a child process via FakeServer, so it does not compete with the measured client for the GIL."""
+import argparse
+import base64
+import json
+import multiprocessing
+import os
+import random
+import time
+from dataclasses import asdict, dataclass
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Optional
+import jwt
+
+BASE = "/api/v1/"
+
+
+@dataclass
+class ServerConfig:
+    """Represents the behaviour of the fake server"""
+    latency: float = 0.05
+    jitter: float = 0.0
+    error_rate: float = 0.0
+    response_chars: int = 512
+    model_count: int = 20
+    datasource_count: int = 50
+    media_per_datasource: int = 2
+    media_bytes: int = 32 * 1024
+    token_ttl: int = 3600
+
+
+class _Handler(BaseHTTPRequestHandler):
+    """Warning: This class is private and should not be instantiated manually"""
+    protocol_version = "HTTP/1.1"
+    # headers and body are written separately, Nagle + delayed ACK would add ~40ms per response
+    disable_nagle_algorithm = True
+    server: "_Server"
+
+    def log_message(self, format, *args) -> None:  # pylint: disable=redefined-builtin
+        pass
+
+    def do_GET(self) -> None:  # pylint: disable=invalid-name
+        self._handle("GET")
+
+    def do_POST(self) -> None:  # pylint: disable=invalid-name
+        self._handle("POST")
+
+    def do_PUT(self) -> None:  # pylint: disable=invalid-name
+        self._handle("PUT")
+
+    def do_DELETE(self) -> None:  # pylint: disable=invalid-name
+        self._handle("DELETE")
+
+    def _handle(self, method: str) -> None:
+        config = self.server.config
+        body = self._read_body()
+        path = self.path.split("?", 1)[0]
+        if path.startswith(f"{BASE}auth/"):
+            self._send({"access_token": self.server.token(), "refresh_token": "refresh"})
+            return
+
+        delay = config.latency + (random.uniform(0, config.jitter) if config.jitter > 0 else 0.0)
+        if delay > 0:
+            time.sleep(delay)
+        if config.error_rate > 0 and random.random() < config.error_rate:
+            self._send_status(503, "Service Unavailable")
+            return
+
+        if path == f"{BASE}models":
+            self._send(self.server.models)
+        elif path.startswith(f"{BASE}prompts/"):
+            payload = json.loads(body) if self.headers.get("Content-Type", "").startswith("application/json") else {}
+            self._send({
+                "response": self.server.response_text,
+                "done": True,
+                "model": path.rsplit("/", 1)[-1],
+                "prompt_chars": len(payload.get("prompt", ""))})
+        elif path == f"{BASE}datasources":
+            if method == "POST":
+                self._send({"datasource": {"id": config.datasource_count + 1}})
+            else:
+                self._send(self.server.listing)
+        elif path.startswith(f"{BASE}datasources/"):
+            datasource_id = path.rsplit("/", 1)[-1]
+            if method == "DELETE":
+                self._send_status(200, "OK")
+            elif method == "PUT":
+                self._send({"datasource": {"id": int(datasource_id), "received_bytes": len(body)}})
+            else:
+                self._send(self.server.datasource(int(datasource_id)))
+        else:
+            self._send_status(404, "Not Found")
+
+    def _read_body(self) -> bytes:
+        if self.headers.get("Transfer-Encoding", "").lower() == "chunked":
+            chunks = []
+            while True:
+                size = int(self.rfile.readline().split(b";", 1)[0].strip(), 16)
+                if size == 0:
+                    self.rfile.readline()
+                    return b"".join(chunks)
+                chunks.append(self.rfile.read(size))
+                self.rfile.readline()
+        return self.rfile.read(int(self.headers.get("Content-Length", 0)))
+
+    def _send(self, data) -> None:
+        body = json.dumps({"messageContent": {"data": data}}).encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _send_status(self, status_code: int, reason: str) -> None:
+        body = json.dumps({"message": reason}).encode("utf-8")
+        self.send_response(status_code, reason)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+
+class _Server(ThreadingHTTPServer):
+    """Warning: This class is private and should not be instantiated manually"""
+    daemon_threads = True
+    request_queue_size = 512
+
+    def __init__(self, address, config: ServerConfig) -> None:
+        super().__init__(address, _Handler)
+        self.config = config
+        self.response_text = ("lorem ipsum " * (config.response_chars // 12 + 1))[:config.response_chars]
+        self.models = {"Models": [
+            {"id": index, "uuId": f"uuid-{index}", "name": f"model-{index}", "defaultModelTagId": 10 + index}
+            for index in range(1, config.model_count + 1)]}
+        self.listing = {"datasources": [
+            self._datasource_head(index) for index in range(1, config.datasource_count + 1)]}
+        self._media = base64.b64encode(os.urandom(config.media_bytes)).decode("ascii")
+
+    def token(self) -> str:
+        """Get a fresh access token (the clients do not verify its signature)"""
+        return jwt.encode({"exp": int(time.time()) + self.config.token_ttl}, "benchmark-signing-key-of-32-bytes", algorithm="HS256")
+
+    def datasource(self, datasource_id: int) -> dict:
+        """Get the details of a datasource (with base64 media bodies)"""
+        datasource = self._datasource_head(datasource_id)
+        datasource["media"] = [
+            {"id": index, "name": f"doc-{index}.pdf", "mime_type": "application/pdf",
+             "size": self.config.media_bytes, "base64": self._media}
+            for index in range(self.config.media_per_datasource)]
+        return {"datasource": datasource}
+
+    def _datasource_head(self, datasource_id: int) -> dict:
+        return {
+            "id": datasource_id, "name": f"datasource-{datasource_id}", "summary": "benchmark datasource",
+            "categories": [], "tags": [], "assocContexts": [], "status": 2,
+            "mediaCount": self.config.media_per_datasource, "ownerId": 1}
+
+
+def serve(config: ServerConfig, port: int = 0, ready=None) -> None:
+    """Run the fake server until the process is terminated
+
+    Args:
+        config (ServerConfig): The server behaviour
+        port (int, optional): The port. Defaults to 0 (a free port).
+        ready (optional): A queue receiving the port once the server listens. Defaults to None.
+    """
+    server = _Server(("127.0.0.1", port), config)
+    if ready is not None:
+        ready.put(server.server_address[1])
+    server.serve_forever()
+
+
+class FakeServer:
+    """Represents the fake server running in a child process (use as context manager)"""
+
+    def __init__(self, config: Optional[ServerConfig] = None) -> None:
+        self.config = ServerConfig() if config is None else config
+        self.url: Optional[str] = None
+        self._process: Optional[multiprocessing.Process] = None
+
+    def start(self) -> "FakeServer":
+        """Start the server process and wait until it listens"""
+        ready = multiprocessing.Queue()
+        self._process = multiprocessing.Process(target=serve, args=(self.config, 0, ready), daemon=True)
+        self._process.start()
+        self.url = f"http://127.0.0.1:{ready.get(timeout=30)}"
+        return self
+
+    def stop(self) -> None:
+        """Terminate the server process"""
+        if self._process is not None:
+            self._process.terminate()
+            self._process.join()
+            self._process = None
+
+    def __enter__(self) -> "FakeServer":
+        return self.start()
+
+    def __exit__(self, exc_type, exc_value, traceback) -> None:
+        self.stop()
+
+
+def _main() -> None:
+    parser = argparse.ArgumentParser(description="Local stand-in of the AI Manager API")
+    parser.add_argument("--port", type=int, default=8080)
+    for name, value in asdict(ServerConfig()).items():
+        parser.add_argument(f"--{name.replace('_', '-')}", type=type(value), default=value)
+    args = vars(parser.parse_args())
+    port = args.pop("port")
+    print(f"listening on http://127.0.0.1:{port}", flush=True)
+    serve(ServerConfig(**args), port=port)
+
+
+if __name__ == "__main__":
+    _main()
@@ -0,0 +1,300 @@
+"""Benchmark suite of the service clients against a local stand-in of the AI Manager API.
+
+Measures throughput, p50/p99 latency and peak (python heap) memory of the client calls and the
+document loaders across concurrency levels, plus the import time of the client. The results are
+written as JSON, so they can be compared between releases:
+
+    python benchmarks/run.py --concurrency 1 4 16 --requests 200 --output current.json
+    python benchmarks/run.py --baseline previous.json --max-regression 0.25
+
+The exit code is 1 if a result regressed against the baseline or the import check failed."""
+import argparse
+import asyncio
+import json
+import math
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import asdict
+from datetime import datetime, timezone
+from typing import Callable, Dict, List, Optional, Tuple
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+# pylint: disable=wrong-import-position
+from fake_server import FakeServer, ServerConfig
+from documents import write_documents
+from brandcompete.core.classes import Loader
+from brandcompete.core.credentials import TokenCredential
+from brandcompete.core.loaders import load_document
+from brandcompete.client import AIManServiceClient
+
+CLIENT_SCENARIOS = ["prompt", "prompt_template", "prompt_async", "prompt_on_datasource", "fetch_all_datasources", "add_documents"]
+LOADER_SCENARIOS = ["loader_csv", "loader_excel", "loader_docx", "loader_pdf"]
+HEAVY_MODULES = ["pandas", "PyPDF2", "openpyxl", "docx2txt", "aiohttp"]
+MODEL_TAG = 11
+
+
+def percentile(values: List[float], q: float) -> float:
+    """Get the q-th percentile (nearest rank) of values"""
+    ordered = sorted(values)
+    return ordered[max(0, math.ceil(q / 100 * len(ordered)) - 1)]
+
+
+def summarize(latencies: List[float]) -> Dict[str, float]:
+    """Get the latency distribution in milliseconds"""
+    if not latencies:
+        return {}
+    return {
+        "p50": round(percentile(latencies, 50) * 1000, 3),
+        "p90": round(percentile(latencies, 90) * 1000, 3),
+        "p99": round(percentile(latencies, 99) * 1000, 3),
+        "max": round(max(latencies) * 1000, 3),
+        "mean": round(sum(latencies) / len(latencies) * 1000, 3)}
+
+
+def run_threads(call: Callable[[int], object], concurrency: int, requests: int) -> Tuple[List[float], int, float]:
+    """Run call(index) requests times on concurrency threads
+
+    Returns:
+        Tuple[List[float], int, float]: latencies of the successful calls, number of errors and the wall time
+    """
+    def timed(index: int) -> Tuple[float, bool]:
+        start = time.perf_counter()
+        try:
+            call(index)
+            return time.perf_counter() - start, True
+        except Exception:  # pylint: disable=broad-exception-caught
+            return time.perf_counter() - start, False
+
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        list(pool.map(timed, range(concurrency)))
+        start = time.perf_counter()
+        results = list(pool.map(timed, range(requests)))
+        wall = time.perf_counter() - start
+    return [latency for latency, ok in results if ok], sum(1 for _, ok in results if not ok), wall
+
+
+def run_async(credential: TokenCredential, concurrency: int, requests: int) -> Tuple[List[float], int, float]:
+    """Run requests prompts of the async client with concurrency prompts in flight (see run_threads)"""
+    from brandcompete.client import AsyncAIManServiceClient  # pylint: disable=import-outside-toplevel
+
+    async def main() -> Tuple[List[float], int, float]:
+        async with AsyncAIManServiceClient(credential=credential, max_concurrency=concurrency) as client:
+            semaphore = asyncio.Semaphore(concurrency)
+
+            async def timed(index: int) -> Tuple[float, bool]:
+                async with semaphore:
+                    start = time.perf_counter()
+                    try:
+                        await client.prompt(model_tag=MODEL_TAG, query=f"benchmark query {index}")
+                        return time.perf_counter() - start, True
+                    except Exception:  # pylint: disable=broad-exception-caught
+                        return time.perf_counter() - start, False
+
+            await asyncio.gather(*[timed(index) for index in range(concurrency)])
+            start = time.perf_counter()
+            results = await asyncio.gather(*[timed(index) for index in range(requests)])
+            wall = time.perf_counter() - start
+        return [latency for latency, ok in results if ok], sum(1 for _, ok in results if not ok), wall
+
+    return asyncio.run(main())
+
+
+def build_call(scenario: str, client: AIManServiceClient, files: Dict[str, Optional[str]], config: ServerConfig) -> Optional[Callable[[int], object]]:
+    """Get the measured call of a (sync) scenario, None if it can not run here"""
+    if scenario == "prompt":
+        return lambda index: client.prompt(model_tag=MODEL_TAG, query=f"benchmark query {index}")
+    if scenario == "prompt_template":
+        template = client.prepare_prompt(MODEL_TAG)
+        return lambda index: client.prompt_template(template, f"benchmark query {index}")
+    if scenario == "prompt_on_datasource":
+        return lambda index: client.prompt_on_datasource(
+            datasource_id=1 + index % config.datasource_count, model_tag_id=MODEL_TAG, query=f"benchmark query {index}")
+    if scenario == "fetch_all_datasources":
+        return lambda index: client.fetch_all_datasources(hydrate=True)
+    if scenario == "add_documents":
+        return lambda index: client.add_documents(
+            data_source_id=1 + index % config.datasource_count, sources=[files["upload"]])
+    loaders = {
+        "loader_csv": (Loader.CSV, files["csv"]),
+        "loader_excel": (Loader.EXCEL, files["xlsx"]),
+        "loader_docx": (Loader.DOCX, files["docx"]),
+        "loader_pdf": (Loader.PDF, files["pdf"])}
+    loader, file_path = loaders[scenario]
+    if file_path is None:
+        return None
+    try:
+        load_document(file_path=file_path, loader=loader)
+    except ImportError:
+        return None
+    return lambda index: load_document(file_path=file_path, loader=loader)
+
+
+def measure(scenario: str, concurrency: int, requests: int, run: Callable[[int, int], Tuple[List[float], int, float]], memory: bool) -> dict:
+    """Measure a scenario at a concurrency level (peak memory in a second, traced run)"""
+    latencies, errors, wall = run(concurrency, requests)
+    result = {
+        "scenario": scenario,
+        "concurrency": concurrency,
+        "requests": requests,
+        "errors": errors,
+        "throughput_rps": round((requests - errors) / wall, 3) if wall > 0 else None,
+        "latency_ms": summarize(latencies),
+        "peak_memory_bytes": None}
+    if memory:
+        tracemalloc.start()
+        try:
+            run(concurrency, max(concurrency * 4, 20))
+            result["peak_memory_bytes"] = tracemalloc.get_traced_memory()[1]
+        finally:
+            tracemalloc.stop()
+    return result
+
+
+def measure_import(repeat: int, budget_ms: float) -> dict:
+    """Measure the import time of the client in fresh interpreters and the heavy modules it loads"""
+    code = (
+        "import sys, time\n"
+        "start = time.perf_counter()\n"
+        "import brandcompete.client\n"
+        "print(time.perf_counter() - start)\n"
+        f"print(','.join(name for name in {HEAVY_MODULES!r} if name in sys.modules))\n")
+    timings = []
+    heavy = []
+    for _ in range(repeat):
+        output = subprocess.run(
+            [sys.executable, "-c", code], cwd=ROOT, capture_output=True, text=True, check=True).stdout.splitlines()
+        timings.append(float(output[0]))
+        heavy = [name for name in output[1].split(",") if name] if len(output) > 1 else []
+    median_ms = round(sorted(timings)[len(timings) // 2] * 1000, 3)
+    return {
+        "median_ms": median_ms,
+        "budget_ms": budget_ms,
+        "heavy_modules_loaded": heavy,
+        "ok": median_ms <= budget_ms and not heavy}
+
+
+def compare(results: List[dict], baseline: dict, max_regression: float) -> List[dict]:
+    """Get the results whose p99 latency or throughput regressed by more than max_regression"""
+    previous = {(entry["scenario"], entry["concurrency"]): entry for entry in baseline.get("results", [])}
+    regressions = []
+    for result in results:
+        old = previous.get((result["scenario"], result["concurrency"]))
+        if old is None or not old.get("latency_ms") or not result.get("latency_ms"):
+            continue
+        p99_ratio = result["latency_ms"]["p99"] / max(old["latency_ms"]["p99"], 1e-9)
+        throughput_ratio = (result["throughput_rps"] or 0) / max(old["throughput_rps"] or 0, 1e-9)
+        if p99_ratio > 1 + max_regression or throughput_ratio < 1 / (1 + max_regression):
+            regressions.append({
+                "scenario": result["scenario"],
+                "concurrency": result["concurrency"],
+                "p99_ratio": round(p99_ratio, 3),
+                "throughput_ratio": round(throughput_ratio, 3)})
+    return regressions
+
+
+def parse_args(argv: Optional[List[str]] = None) -> argparse.Namespace:
+    """Parse the command line"""
+    parser = argparse.ArgumentParser(description="Benchmarks of the AI Manager service clients")
+    parser.add_argument("--scenarios", nargs="+", default=CLIENT_SCENARIOS + LOADER_SCENARIOS,
+                        choices=CLIENT_SCENARIOS + LOADER_SCENARIOS)
+    parser.add_argument("--concurrency", nargs="+", type=int, default=[1, 4, 16])
+    parser.add_argument("--requests", type=int, default=100, help="measured calls per scenario and concurrency")
+    parser.add_argument("--loader-requests", type=int, default=20, help="measured calls of the loader scenarios")
+    parser.add_argument("--latency", type=float, default=0.02, help="server latency in seconds")
+    parser.add_argument("--jitter", type=float, default=0.0, help="random extra server latency in seconds")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="share of 503 responses")
+    parser.add_argument("--response-chars", type=int, default=512)
+    parser.add_argument("--datasources", type=int, default=20)
+    parser.add_argument("--media-bytes", type=int, default=32 * 1024, help="size of every datasource media entry")
+    parser.add_argument("--upload-bytes", type=int, default=1024 * 1024, help="size of the add_documents file")
+    parser.add_argument("--rows", type=int, default=5000, help="rows of the CSV and XLSX files")
+    parser.add_argument("--pages", type=int, default=20, help="pages of the PDF file")
+    parser.add_argument("--no-memory", action="store_true", help="skip the peak memory runs")
+    parser.add_argument("--import-repeat", type=int, default=5)
+    parser.add_argument("--import-budget-ms", type=float, default=500.0)
+    parser.add_argument("--output", help="write the JSON results to this file (default: stdout)")
+    parser.add_argument("--baseline", help="JSON results of a previous run to compare with")
+    parser.add_argument("--max-regression", type=float, default=0.25)
+    return parser.parse_args(argv)
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    """Run the benchmarks
+
+    Returns:
+        int: The exit code
+    """
+    args = parse_args(argv)
+    config = ServerConfig(
+        latency=args.latency,
+        jitter=args.jitter,
+        error_rate=args.error_rate,
+        response_chars=args.response_chars,
+        datasource_count=args.datasources,
+        media_bytes=args.media_bytes)
+    report = {
+        "meta": {
+            "timestamp": datetime.now(timezone.utc).isoformat(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpu_count": os.cpu_count(),
+            "args": vars(args)},
+        "server": asdict(config),
+        "import": measure_import(args.import_repeat, args.import_budget_ms),
+        "results": []}
+
+    with FakeServer(config) as server, tempfile.TemporaryDirectory() as directory:
+        files = write_documents(directory, rows=args.rows, pages=args.pages, upload_bytes=args.upload_bytes)
+        credential = TokenCredential(
+            api_host_url=server.url, user_name="benchmark", password="benchmark", allow_insecure_http=True)
+        for scenario in args.scenarios:
+            is_loader = scenario in LOADER_SCENARIOS
+            requests = args.loader_requests if is_loader else args.requests
+            for concurrency in args.concurrency:
+                print(f"{scenario} x{concurrency}", file=sys.stderr, flush=True)
+                if scenario == "prompt_async":
+                    result = measure(
+                        scenario, concurrency, requests,
+                        lambda level, count: run_async(credential, level, count),
+                        memory=not args.no_memory)
+                    report["results"].append(result)
+                    continue
+                client = AIManServiceClient(credential=credential, pool_maxsize=max(16, concurrency))
+                try:
+                    call = build_call(scenario, client, files, config)
+                    if call is None:
+                        report["results"].append({"scenario": scenario, "concurrency": concurrency, "skipped": True})
+                        break
+                    result = measure(
+                        scenario, concurrency, requests,
+                        lambda level, count, call=call: run_threads(call, level, count),
+                        memory=not args.no_memory)
+                    report["results"].append(result)
+                finally:
+                    client.close()
+
+    exit_code = 0 if report["import"]["ok"] else 1
+    if args.baseline:
+        with open(args.baseline, "r", encoding="utf-8") as file:
+            report["regressions"] = compare(report["results"], json.load(file), args.max_regression)
+        if report["regressions"]:
+            exit_code = 1
+    output = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as file:
+            file.write(output)
+    else:
+        print(output)
+    return exit_code
+
+
+if __name__ == "__main__":
+    sys.exit(main())
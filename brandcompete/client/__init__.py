@@ -1,2 +1,12 @@
 from ._ai_man_client import AIManServiceClient
 from ._ai_man_client import AIModel
+from ._prompt_stream import PromptStream
+from ._prompt_stream import AsyncPromptStream
+
+
+def __getattr__(name):
+    # the async client (and aiohttp) is imported on first access
+    if name == "AsyncAIManServiceClient":
+        from ._async_ai_man_client import AsyncAIManServiceClient
+        return AsyncAIManServiceClient
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
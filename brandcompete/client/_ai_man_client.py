@@ -1,231 +1,536 @@
 """Module providing a aiman service client"""
-import json
-import base64
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
 from typing import (
+    Dict,
+    Iterable,
+    Iterator,
     List,
-    Optional
+    Optional,
+    Union
 )
-import PyPDF2
-import pandas
-import docx2txt
 import requests
-from brandcompete.core.util import Util
+from urllib3.exceptions import DecodeError, ProtocolError, ReadTimeoutError, SSLError
 from brandcompete.core.credentials import TokenCredential
+from brandcompete.core.extraction import DocumentExtractor
+from brandcompete.core.cache import DocumentCache
+from brandcompete.core.response_cache import ResponseCache
+from brandcompete.core.registry import ModelRegistry
+from brandcompete.core.singleflight import SingleFlight
+from brandcompete.core.resilience import CircuitBreaker, RateLimiter, RetryPolicy, is_connection_reset, parse_retry_after
+from brandcompete.core.timeouts import Deadline
+from brandcompete.core.exceptions import AIManRequestError, DeadlineExceededError
+from brandcompete.core.serialization import JsonSerializer
+from brandcompete.core.instrumentation import Instrumentation
+from brandcompete.core.session import SessionFactory, connection_reused, forget_connection
+from brandcompete.core.upload import MultipartBody, StreamedJsonBody
+from brandcompete.core.templates import PromptTemplate
+from brandcompete.core.batch import PromptResult
 from brandcompete.core.classes import (
     AIModel,
-    Attachment,
     DataSource,
+    Loader,
     PromptOptions,
     Route,
-    Prompt,
-    Loader,
-    RequestType
+    RequestType,
+    Timeout,
+    UploadMode
 )
+from brandcompete.client._base_client import AIManClientBase
+from brandcompete.client._prompt_stream import PromptStream
 
 
-class AIManServiceClient():
+class AIManServiceClient(AIManClientBase):
     """Represents the AI Manager Service Client"""
 
-    def __init__(self, credential: TokenCredential) -> None:
-
-        self.credential = credential
-        self.request_timeout = 200
+    def __init__(
+            self,
+            credential: TokenCredential,
+            session: Optional[requests.Session] = None,
+            pool_connections: int = 4,
+            pool_maxsize: int = 16,
+            max_retries: int = 2,
+            document_extractor: Optional[DocumentExtractor] = None,
+            document_cache: Optional[DocumentCache] = None,
+            response_cache: Optional[ResponseCache] = None,
+            model_registry: Optional[ModelRegistry] = None,
+            coalesce_routes: Iterable[Union[Route, str]] = (Route.GET_MODELS, Route.DATA_SOURCE),
+            retry_policy: Optional[RetryPolicy] = None,
+            rate_limiter: Optional[RateLimiter] = None,
+            circuit_breaker: Optional[CircuitBreaker] = None,
+            timeouts: Optional[Dict[str, Timeout]] = None,
+            serializer: Optional[JsonSerializer] = None,
+            upload_mode: Union[UploadMode, str] = UploadMode.BASE64,
+            instrumentation: Optional[Instrumentation] = None) -> None:
+        """Create a service client
 
-    def get_models(self) -> List[AIModel]:
+        Args:
+            credential (TokenCredential): The token credential
+            session (requests.Session, optional): An externally owned session. If None, the client
+                creates (and owns) a pooled keep-alive session. Defaults to None.
+            pool_connections (int, optional): Number of host pools to cache. Defaults to 4.
+            pool_maxsize (int, optional): Max. number of pooled connections per host. Defaults to 16.
+            max_retries (int, optional): Retries on connection errors. Defaults to 2.
+                A reset of an idle pooled connection is retried once (see SessionFactory).
+            document_extractor (DocumentExtractor, optional): Parses the files_to_rag of a prompt and
+                the files of add_documents in parallel. Defaults to None (serial parsing).
+            document_cache (DocumentCache, optional): Caches the parsed and base64 encoded
+                documents. Defaults to None.
+            response_cache (ResponseCache, optional): Caches the responses of prompt and
+                prompt_on_datasource (deterministic prompts only). Defaults to None.
+            model_registry (ModelRegistry, optional): Catalogue resolving model names to model tags
+                (may be shared between clients). Defaults to None (a registry with a ttl of 300 seconds).
+            coalesce_routes (Iterable[Union[Route, str]], optional): Routes (and their sub routes) whose concurrent
+                identical GET requests share one request and its result. Defaults to models and datasources.
+            retry_policy (RetryPolicy, optional): Retries of throttled (429) and failed requests with jittered
+                exponential backoff. Defaults to None (RetryPolicy()).
+            rate_limiter (RateLimiter, optional): Client side rate limit, adapting to throttling. Defaults to None.
+            circuit_breaker (CircuitBreaker, optional): Rejects requests immediately while the host is failing. Defaults to None.
+            timeouts (Dict[str, Timeout], optional): Timeouts by method name (e.g. {"get_models": Timeout(connect=3, read=10)}).
+                Defaults to None (connect 10 seconds, read request_timeout).
+            serializer (JsonSerializer, optional): The json codec of request and response bodies.
+                Defaults to None (orjson or ujson if installed, else the standard library json).
+            upload_mode (Union[UploadMode, str], optional): Transport of files and attachments: base64 encoded in the
+                json body, raw bytes in a multipart/form-data body, or auto (multipart, falling back to base64 json
+                if the server rejects it with 400 or 415). Defaults to UploadMode.BASE64.
+            instrumentation (Instrumentation, optional): Receives the metrics of every request attempt, token
+                request and document extraction. Defaults to None.
+        """
+        super().__init__(
+            credential=credential,
+            document_extractor=document_extractor,
+            document_cache=document_cache,
+            response_cache=response_cache,
+            model_registry=model_registry,
+            coalesce_routes=coalesce_routes,
+            retry_policy=retry_policy,
+            rate_limiter=rate_limiter,
+            circuit_breaker=circuit_breaker,
+            timeouts=timeouts,
+            serializer=serializer,
+            upload_mode=upload_mode,
+            instrumentation=instrumentation)
+        self._owns_session = session is None
+        self._single_flight = SingleFlight()
+        if session is None:
+            session = SessionFactory.create(
+                pool_connections=pool_connections,
+                pool_maxsize=pool_maxsize,
+                max_retries=max_retries)
+        self.session = session
+        self.credential.use_session(self.session)
+
+    def __enter__(self) -> "AIManServiceClient":
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback) -> None:
+        self.close()
+
+    def close(self) -> None:
+        """Close the pooled connections (only if the session is owned by the client)"""
+        if self._owns_session:
+            self.session.close()
+
+    def get_models(self, cached: bool = False, timeout: Optional[Timeout] = None) -> List[AIModel]:
         """Get all available models to prompt on
 
+        Args:
+            cached (bool, optional): Serve the models from the model registry (loaded on first use,
+                refreshed in the background once expired). Defaults to False.
+            timeout (Timeout, optional): Timeout of this call. Defaults to None (see timeouts).
+
         Returns:
             List[AIModel]: List of available AIModel objects
         """
+        if cached:
+            self._ensure_models()
+            return self.model_registry.models
         results = self._perform_request(
-            request_type=RequestType.GET, route=Route.GET_MODELS.value)
-        models = []
-        for model in results['Models']:
-            new_model = AIModel()
-            models.append(new_model.from_dict(model))
+            request_type=RequestType.GET,
+            route=Route.GET_MODELS.value,
+            timeout=self._timeout_for("get_models", timeout))
+        return self._parse_models(results)
+
+    def resolve_model(self, model: Union[int, str]) -> int:
+        """Resolve a model name or uuid to its default model tag (without a catalogue request per call)
 
-        return models
+        Args:
+            model (Union[int, str]): model name, uuid or model tag
+
+        Raises:
+            ValueError: If the model is unknown
+
+        Returns:
+            int: The model tag
+        """
+        if ModelRegistry.is_name(model):
+            self._ensure_models()
+        return self.model_registry.resolve(model)
 
     def prompt(self, **kwargs) -> dict:
         """_summary_
 
         Args:
-            model_id (int): the model id
+            model_tag (Union[int, str]): the model tag, or a model name or uuid (resolved via the model registry)
             query (str): Query to prompt
             loader (Optional[Loader], optional): Content loader. Defaults to None.
             file_append_to_query (Optional[str], optional): Absolute path to a file (The content is added to the query). Defaults to None.
             files_to_rag (Optional[List[str]], optional): Absolute path to a file (File content to rag). Defaults to None.
             prompt_options (Optional[PromptOptions], optional): Prompt options. Defaults to None.
+            pages (Optional[Iterable[int]], optional): Zero based pages of file_append_to_query to extract (PDF only). Defaults to None.
+            max_chars (Optional[int], optional): Max. characters extracted from file_append_to_query (PDF, CSV and EXCEL). Defaults to None.
+            usecols (Optional[List[Union[int, str]]], optional): Columns of file_append_to_query to keep (CSV and EXCEL). Defaults to None.
+            nrows (Optional[int], optional): Max. data rows of file_append_to_query (CSV and EXCEL). Defaults to None.
+            sheet_name (Optional[Union[int, str]], optional): Sheet of file_append_to_query (EXCEL only). Defaults to None.
+            context_packer (Optional[ContextPacker], optional): Packs the document contents into the context budget
+                (num_ctx - num_predict) instead of appending them completely. Defaults to None.
+            cache_bypass (bool, optional): Neither read nor write the response cache. Defaults to False.
+            cache_refresh (bool, optional): Skip the response cache lookup, but cache the new response. Defaults to False.
+            retry (bool, optional): True also retries on server and transport errors (not only on throttling),
+                False disables retries. Defaults to None.
+            timeout (Optional[Timeout], optional): Timeout of this call. Defaults to None (see timeouts).
+            deadline (Optional[Union[float, Deadline]], optional): Seconds (or a Deadline) by which the call
+                including its retries has to finish. Defaults to None.
 
         Raises:
             ValueError: If any of the required parameters are missing
+            DeadlineExceededError: If the deadline passed
 
         Returns:
             dict: The API-Response as dict
         """
-        if "model_id" in kwargs:
-            raise ValueError(
-                "Error: model_id as parameter is deprecated. Use the model_tag instead. Aborting....")
-
-        if "model_tag" not in kwargs:
-            raise ValueError(
-                "Error: missing required argument: model_tag")
-
-        if "query" not in kwargs:
-            raise ValueError(
-                "Error: missing required argument: query")
-
-        model_tag: int = kwargs["model_tag"]
-        query = kwargs["query"]
-        loader = kwargs["loader"] if "loader" in kwargs else None
-        file_append_to_query = kwargs["file_append_to_query"] if "file_append_to_query" in kwargs else None
-        files_to_rag = kwargs["files_to_rag"] if "files_to_rag" in kwargs else None
-        prompt_options = kwargs["prompt_options"] if "prompt_options" in kwargs else None
-
-        if loader is not None and file_append_to_query is None and files_to_rag is None:
-            raise ValueError(
-                "Missing Argument: file_append_to_query or files_to_rag")
-
-        attachments = []
-        if loader is not None:
-            if file_append_to_query is not None:
-                doc_content = self.get_document_content(
-                    file_path=file_append_to_query, loader=loader)
-                if loader == Loader.IMAGE:
-                    encoded_contents = base64.b64encode(doc_content)
-                    attachment = Attachment()
-                    attachment.name = Util.get_file_name(
-                        file_path=file_append_to_query)
-                    attachment.base64 = encoded_contents.decode()
-                    attachments.append(attachment.to_dict())
+        self._prepare_model(kwargs.get("model_tag"))
+        route, prompt_dict = self._build_prompt_request(kwargs)
+        return self._perform_prompt(
+            route=route,
+            data=prompt_dict,
+            cache_bypass=kwargs["cache_bypass"] if "cache_bypass" in kwargs else False,
+            cache_refresh=kwargs["cache_refresh"] if "cache_refresh" in kwargs else False,
+            retry=kwargs["retry"] if "retry" in kwargs else None,
+            timeout=self._timeout_for("prompt", kwargs["timeout"] if "timeout" in kwargs else None),
+            deadline=Deadline.of(kwargs["deadline"] if "deadline" in kwargs else None))
+
+    def prompt_stream(self, **kwargs) -> PromptStream:
+        """Prompt a query and stream the response (same arguments as prompt)
+
+        Args:
+            model_tag (Union[int, str]): the model tag, or a model name or uuid
+            query (str): Query to prompt
+            timeout (Optional[Timeout], optional): connect and read timeout (between two chunks) of this call.
+                Defaults to None (see timeouts).
+
+        Raises:
+            ValueError: If any of the required parameters are missing
+
+        Returns:
+            PromptStream: Iterable of tokens as they arrive. After the iteration
+                message_content holds the aggregated response
+        """
+        kwargs["stream"] = True
+        self._prepare_model(kwargs.get("model_tag"))
+        route, prompt_dict = self._build_prompt_request(kwargs)
+        timeout = self._timeout_for("prompt_stream", kwargs["timeout"] if "timeout" in kwargs else None)
+        body = self._build_multipart_prompt(prompt_dict) if self._use_multipart(probe=False) else None
+        start = time.perf_counter()
+        event = self._request_event(RequestType.POST, route, 0)
+        wait_seconds, probe = self._before_send(route)
+        try:
+            if wait_seconds > 0:
+                time.sleep(wait_seconds)
+            if event is not None:
+                event.queue_wait = time.perf_counter() - start
+            self._ensure_valid_token()
+            headers = self._build_headers(RequestType.POST)
+            if body is None:
+                body = self.serializer.dumps(prompt_dict)
+            else:
+                headers.update({"Content-Type": body.content_type})
+            if event is not None:
+                event.request_bytes = len(body)
+        except BaseException:
+            self._abandon_send(probe)
+            raise
+        try:
+            response = self.session.post(
+                url=f"{self.credential.api_host}{route}",
+                headers=headers,
+                data=body,
+                allow_redirects=True,
+                stream=True,
+                timeout=(timeout.connect, timeout.read))
+        except requests.RequestException as e:
+            self._after_send(route, None)
+            self._emit_request(event, start, e)
+            raise
+        except BaseException:
+            self._abandon_send(probe)
+            raise
+        self._after_send(route, response.status_code)
+        if event is not None:
+            event.status_code = response.status_code
+            event.time_to_first_byte = time.perf_counter() - start
+        if response.status_code not in [200, 201, 202]:
+            response.close()
+        try:
+            self._raise_for_status(
+                response.status_code, response.reason, parse_retry_after(response.headers.get("Retry-After")))
+        except AIManRequestError as e:
+            self._emit_request(event, start, e)
+            raise
+        self._emit_request(event, start)
+        return PromptStream(response, serializer=self.serializer)
+
+    def prompt_many(
+            self,
+            jobs: Iterable,
+            max_concurrency: int = 8,
+            ordered: bool = True,
+            timeout: Optional[Timeout] = None,
+            deadline: Optional[Union[float, Deadline]] = None) -> Iterator[PromptResult]:
+        """Prompt a batch of queries concurrently
+
+        The token is checked once for the whole batch, all prompts share the pooled
+        session and equal prompt options are serialized only once.
+        A failing prompt does not abort the batch, its error is part of the result.
+        Prompts are answered from the response cache if possible.
+
+        Args:
+            jobs (Iterable): PromptJob objects (with a PromptTemplate, see prepare_prompt) or
+                (model_tag, query, prompt_options, files_to_rag) tuples
+            max_concurrency (int, optional): Max. number of prompts in flight. Defaults to 8.
+            ordered (bool, optional): Yield results in input order (True) or in completion order (False). Defaults to True.
+            timeout (Timeout, optional): Timeout of every prompt. Defaults to None (see timeouts, key "prompt").
+            deadline (Union[float, Deadline], optional): Seconds (or a Deadline) by which the whole batch has to finish.
+                Prompts not finished by then fail with DeadlineExceededError. Defaults to None.
+
+        Yields:
+            Iterator[PromptResult]: One result per job
+        """
+        self._ensure_valid_token()
+        options_cache = {}
+        timeout = self._timeout_for("prompt", timeout)
+        deadline = Deadline.of(deadline)
+        payload = self.response_cache is not None
+
+        def run(index: int, job) -> PromptResult:
+            result = PromptResult(index=index)
+            try:
+                if deadline is not None:
+                    deadline.check()
+                result.job = self._to_prompt_job(job)
+                if result.job.template is not None:
+                    route, prompt_dict, body = self._build_template_request(
+                        result.job.template, result.job.query, result.job.files_to_rag,
+                        loader=result.job.loader, payload=payload)
                 else:
-                    query += f" {doc_content}"
-
-            if files_to_rag is not None:
-
-                for file in files_to_rag:
-                    content = self.get_document_content(
-                        file_path=file, loader=loader)
-                    encoded_contents = base64.b64encode(str.encode(content))
-                    attachment = Attachment()
-                    attachment.name = Util.get_file_name(file_path=file)
-                    attachment.base64 = encoded_contents.decode()
-                    attachments.append(attachment.to_dict())
-
-        if prompt_options is None:
-            prompt_options = PromptOptions()
-        prompt = Prompt()
-        prompt.prompt = query
-        prompt_dict = prompt.to_dict()
-        prompt_option_dict = prompt_options.to_dict()
-        prompt_dict['options'] = prompt_option_dict
-        if len(attachments) > 0:
-            prompt_dict['attachments'] = attachments
-
-        prompt_dict['raw'] = prompt_options.raw
-        prompt_dict['keepContext'] = prompt_options.keep_context
-
-        route = Route.PROMPT.value.replace("model_tag", f"{model_tag}")
-        response = self._perform_request(
-            RequestType.POST, route=route, data=prompt_dict)
-        return response
+                    self._prepare_model(result.job.model_tag)
+                    route, prompt_dict = self._build_prompt_request(
+                        result.job.to_kwargs(), options_cache=options_cache)
+                    body = None
+                if body is None:
+                    result.response = self._perform_prompt(
+                        route=route, data=prompt_dict, timeout=timeout, deadline=deadline)
+                else:
+                    result.response = self._perform_request(
+                        RequestType.POST, route=route, body=body, timeout=timeout, deadline=deadline)
+            except Exception as e:  # pylint: disable=broad-exception-caught
+                result.error = e
+            return result
+
+        jobs = iter(enumerate(jobs))
+        pending = set()
+        finished = {}
+        next_index = 0
+        with ThreadPoolExecutor(max_workers=max_concurrency) as executor:
+            while True:
+                for index, job in jobs:
+                    pending.add(executor.submit(run, index, job))
+                    if len(pending) >= max_concurrency * 2:
+                        break
+                if not pending:
+                    break
+                done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    result = future.result()
+                    if not ordered:
+                        yield result
+                        continue
+                    finished[result.index] = result
+                while next_index in finished:
+                    yield finished.pop(next_index)
+                    next_index += 1
+
+    def prepare_prompt(
+            self,
+            model_tag: Union[int, str],
+            prompt_options: Optional[PromptOptions] = None,
+            loader: Optional[Loader] = None) -> PromptTemplate:
+        """Prepare a prompt template for repeated prompts with the same model and prompt options.
+        The static part of the payload is serialized once (see prompt_template)
+
+        Args:
+            model_tag (Union[int, str]): the model tag, or a model name or uuid (resolved now)
+            prompt_options (PromptOptions, optional): Prompt options (copied). Defaults to None.
+            loader (Loader, optional): Loader of the files to rag. Defaults to None (inferred from the file extension).
+
+        Raises:
+            ValueError: If the model is unknown
+
+        Returns:
+            PromptTemplate: The template
+        """
+        return PromptTemplate(
+            self.resolve_model(model_tag), prompt_options=prompt_options, loader=loader, serializer=self.serializer)
+
+    def prompt_template(
+            self,
+            template: PromptTemplate,
+            query: str,
+            files_to_rag: Optional[List[str]] = None,
+            cache_bypass: bool = False,
+            cache_refresh: bool = False,
+            retry: Optional[bool] = None,
+            timeout: Optional[Timeout] = None,
+            deadline: Optional[Union[float, Deadline]] = None) -> dict:
+        """Prompt a query with a prepared template (see prepare_prompt)
+
+        Only the query and the attachments are serialized per call.
+
+        Args:
+            template (PromptTemplate): The template
+            query (str): Query to prompt
+            files_to_rag (List[str], optional): Absolute paths of files to rag. Defaults to None.
+            cache_bypass (bool, optional): Neither read nor write the response cache. Defaults to False.
+            cache_refresh (bool, optional): Skip the response cache lookup, but cache the new response. Defaults to False.
+            retry (bool, optional): See prompt. Defaults to None.
+            timeout (Timeout, optional): Timeout of this call. Defaults to None (see timeouts, key "prompt").
+            deadline (Union[float, Deadline], optional): Seconds (or a Deadline) by which the call
+                including its retries has to finish. Defaults to None.
+
+        Raises:
+            ValueError: If the loader of a file to rag can not be inferred
+            DeadlineExceededError: If the deadline passed
 
-    def prompt_on_datasource(self, datasource_id: int, model_tag_id: int, query: str, prompt_options: PromptOptions = None) -> dict:
+        Returns:
+            dict: The API-Response as dict
+        """
+        route, prompt_dict, body = self._build_template_request(
+            template, query, files_to_rag, payload=self.response_cache is not None and not cache_bypass)
+        timeout = self._timeout_for("prompt", timeout)
+        if body is None:
+            return self._perform_prompt(
+                route=route,
+                data=prompt_dict,
+                cache_bypass=cache_bypass,
+                cache_refresh=cache_refresh,
+                retry=retry,
+                timeout=timeout,
+                deadline=Deadline.of(deadline))
+        return self._perform_request(
+            RequestType.POST, route=route, body=body, retry=retry, timeout=timeout, deadline=Deadline.of(deadline))
+
+    def prompt_on_datasource(
+            self,
+            datasource_id: int,
+            model_tag_id: Union[int, str],
+            query: str,
+            prompt_options: PromptOptions = None,
+            cache_bypass: bool = False,
+            cache_refresh: bool = False,
+            retry: Optional[bool] = None,
+            timeout: Optional[Timeout] = None,
+            deadline: Optional[Union[float, Deadline]] = None) -> dict:
         """Prompt on a datasource (by id)
 
         Args:
             datasource_id (int): The datasource id (related to current account)
-            model_tag_id (int): Model tag id
+            model_tag_id (Union[int, str]): Model tag id, or a model name or uuid
             query (str): The query to prompt
             prompt_options (PromptOptions, optional): Prompt options. Defaults to None.
+            cache_bypass (bool, optional): Neither read nor write the response cache. Defaults to False.
+            cache_refresh (bool, optional): Skip the response cache lookup, but cache the new response. Defaults to False.
+            retry (bool, optional): True also retries on server and transport errors (not only on throttling),
+                False disables retries. Defaults to None.
+            timeout (Timeout, optional): Timeout of this call. Defaults to None (see timeouts).
+            deadline (Union[float, Deadline], optional): Seconds (or a Deadline) by which the call
+                including its retries has to finish. Defaults to None.
 
         Returns:
             dict: The API-Response as dict
         """
-        if prompt_options is None:
-            prompt_options = PromptOptions()
-        prompt = Prompt()
-        prompt.prompt = query
-        prompt.datasource_id = datasource_id
-        prompt_dict = prompt.to_dict()
-        prompt_option_dict = prompt_options.to_dict()
-        prompt_dict['options'] = prompt_option_dict
-
-        route = f"{Route.PROMPT_WITH_DATASOURCE.value}/{model_tag_id}"
-        response = self._perform_request(
-            RequestType.POST, route=route, data=prompt_dict)
-        return response
+        self._prepare_model(model_tag_id)
+        route, prompt_dict = self._build_datasource_prompt_request(
+            datasource_id=datasource_id, model_tag_id=model_tag_id, query=query, prompt_options=prompt_options)
+        return self._perform_prompt(
+            route=route,
+            data=prompt_dict,
+            cache_bypass=cache_bypass,
+            cache_refresh=cache_refresh,
+            retry=retry,
+            timeout=self._timeout_for("prompt_on_datasource", timeout),
+            deadline=Deadline.of(deadline))
+
+    def fetch_all_datasources(
+            self,
+            hydrate: bool = False,
+            max_concurrency: int = 8,
+            include_media: bool = True,
+            deadline: Optional[Union[float, Deadline]] = None) -> List[DataSource]:
+        """Fetch all datasources related to the account
 
-    def get_document_content(self, file_path: str, loader: Loader = None) -> Optional[str]:
-        """Parsing document content)
+        By default the datasources are built from the listing (one request). With hydrate=True the
+        details (e.g. media) of every datasource are fetched in parallel.
 
         Args:
-            file_path (str): The absolute file path
-            loader (Loader, optional): Loader to use for parsing content. Defaults to None.
-
-        Returns:
-            str: None or string
-        """
-        if loader == Loader.BASE64_ONLY:
-            with open(file_path, "rb") as rag_file:
-                return rag_file.read()
-        if loader == Loader.EXCEL:
-            df = pandas.read_excel(file_path)
-            return df.to_csv(sep='\t', index=False)
-
-        if loader == Loader.IMAGE:
-            with open(file_path, "rb") as image_file:
-                return image_file.read()
-
-        if loader == Loader.CSV:
-            df = pandas.read_csv(file_path)
-            return df.to_csv(sep='\t', index=False)
-
-        if loader == Loader.PDF:
-            pdf_reader = PyPDF2.PdfReader(file_path)
-            text = ""
-            for i in enumerate(pdf_reader.pages):
-                page = pdf_reader.pages[i]
-                text += page.extract_text()
-            return text
-
-        if loader == Loader.DOCX:
-            text = docx2txt.process(file_path)
-            return text
-
-        return None
-
-    def fetch_all_datasources(self) -> List[DataSource]:
-        """Fetch all datasources related to the account
+            hydrate (bool, optional): Fetch the details of every datasource. Defaults to False.
+            max_concurrency (int, optional): Max. number of detail requests in flight (hydrate only). Defaults to 8.
+            include_media (bool, optional): Keep the base64 bodies of the media entries (hydrate only). Defaults to True.
+            deadline (Union[float, Deadline], optional): Seconds (or a Deadline) by which the listing and all
+                detail requests have to finish. Defaults to None.
 
         Returns:
             List[DataSource]: List of datasource objects
         """
+        deadline = Deadline.of(deadline)
         fetch_all_response = self._perform_request(
-            RequestType.GET, Route.DATA_SOURCE.value)
-        datasources = list()
-        for response in fetch_all_response["datasources"]:
-            source = self.get_datasource_by_id(response["id"])
-
-            datasources.append(source)
-        return datasources
-
-    def get_datasource_by_id(self, datasource_id: int) -> Optional[DataSource]:
+            RequestType.GET,
+            Route.DATA_SOURCE.value,
+            timeout=self._timeout_for("fetch_all_datasources"),
+            deadline=deadline)
+        datasources = self._parse_datasource_listing(fetch_all_response)
+        if not hydrate:
+            return datasources
+
+        with ThreadPoolExecutor(max_workers=max_concurrency) as executor:
+            return list(executor.map(
+                lambda source: self.get_datasource_by_id(
+                    source.id, include_media=include_media, deadline=deadline), datasources))
+
+    def get_datasource_by_id(
+            self,
+            datasource_id: int,
+            include_media: bool = True,
+            timeout: Optional[Timeout] = None,
+            deadline: Optional[Union[float, Deadline]] = None) -> Optional[DataSource]:
         """Get a specific datasource by id
 
         Args:
             datasource_id (int): the datasource id
+            include_media (bool, optional): Keep the base64 bodies of the media entries. Defaults to True.
+            timeout (Timeout, optional): Timeout of this call. Defaults to None (see timeouts).
+            deadline (Union[float, Deadline], optional): Seconds (or a Deadline) by which the call has to finish. Defaults to None.
 
         Returns:
             DataSource: None or Datasource object
         """
-        # TODO THA 2024-12-13 Check if response has a valid datasource
-
         url = f"{Route.DATA_SOURCE.value}/{datasource_id}"
-        response = self._perform_request(RequestType.GET, url)
-        source = response["datasource"]
-        data_source = DataSource()
-        return data_source.from_dict(source)
+        response = self._perform_request(
+            RequestType.GET,
+            url,
+            timeout=self._timeout_for("get_datasource_by_id", timeout),
+            deadline=Deadline.of(deadline))
+        return self._parse_datasource(response, include_media=include_media)
 
     def init_new_datasource(self, name: str, summary: str, tags: List[str] = None, categories: List[str] = None) -> int:
         """Initiate and add a new datasource to current account
@@ -239,22 +544,15 @@ class AIManServiceClient():
         Returns:
             int: The datasource id
         """
-        data = {
-            "name": name,
-            "summary": summary,
-            "tags": [] if tags is None else tags,
-            "categories": [] if categories is None else categories,
-            "assocContexts": [],
-            "media": []
-        }
+        data = self._build_new_datasource_payload(
+            name=name, summary=summary, tags=tags, categories=categories)
         response = self._perform_request(
-            request_type=RequestType.POST, route=Route.DATA_SOURCE.value, data=data)
-
-        if "datasource" in response:
-            datasource = response["datasource"]
-            if "id" in datasource:
-                return datasource["id"]
-        return -1
+            request_type=RequestType.POST,
+            route=Route.DATA_SOURCE.value,
+            data=data,
+            retry=False,
+            timeout=self._timeout_for("init_new_datasource"))
+        return self._parse_new_datasource_id(response)
 
     def delete_datasource(self, datasource_id: int) -> bool:
         """Delete a specific datasource by id
@@ -266,15 +564,21 @@ class AIManServiceClient():
             bool: success true or false
         """
         code: int = self._perform_request(
-            request_type=RequestType.DELETE, route=f"{Route.DATA_SOURCE.value}/{datasource_id}")
+            request_type=RequestType.DELETE,
+            route=f"{Route.DATA_SOURCE.value}/{datasource_id}",
+            timeout=self._timeout_for("delete_datasource"))
         return code
 
-    def add_documents(self, data_source_id: int, sources: List[str]) -> DataSource:
+    def add_documents(self, data_source_id: int, sources: List[str], stream_upload: bool = True) -> DataSource:
         """Add one or more documents (files, urls) to an datasource
 
         Args:
             data_source_id (int): the datasource id
             sources (List[str]): list of file paths or urls
+            stream_upload (bool, optional): Base64 encode the files chunk by chunk while uploading
+                (bounded memory) instead of loading them into memory. Defaults to True.
+                Multipart uploads (see upload_mode) are always streamed.
+                The upload is not retried, a retry could add the documents twice.
 
         Raises:
             Exception: If datasource not exists
@@ -284,107 +588,340 @@ class AIManServiceClient():
         """
         datasource: DataSource = self.get_datasource_by_id(
             datasource_id=data_source_id)
+        if not stream_upload and not self._use_multipart():
+            self._append_documents(datasource=datasource, sources=sources)
+            return self.update_datasource(datasource=datasource)
+
+        if self._use_multipart():
+            upload_body = MultipartBody(dumps=self.serializer.dumps)
+        else:
+            upload_body = StreamedJsonBody(dumps=self.serializer.dumps)
+        self._append_documents(
+            datasource=datasource, sources=sources, upload_body=upload_body)
+        upload_body.encode(self._build_update_payload(datasource, delta=True))
+        try:
+            response = self._perform_request(
+                RequestType.PUT,
+                f"{Route.DATA_SOURCE.value}/{datasource.id}",
+                body=upload_body,
+                retry=False,
+                timeout=self._timeout_for("add_documents"))
+        except AIManRequestError as e:
+            if not self._multipart_rejected(upload_body, e):
+                raise
+            return self.add_documents(data_source_id=data_source_id, sources=sources, stream_upload=stream_upload)
+        self._multipart_accepted(upload_body)
+        return response
 
-        for path_or_url in sources:
-            path_or_url = path_or_url.lower()
-            if Util.validate_url(url=path_or_url, check_only=True):
-                datasource.media.append(
-                    {"name": path_or_url, "mime_type": "text/x-uri"})
-                continue
-            filename, file_ext = Util.get_file_name_and_ext(
-                file_path=path_or_url)
-            loader, mime_type = Util.get_loader_by_ext(file_ext=file_ext)
-            if loader is None:
-                raise ValueError(
-                    f"Error: Unsupported filetype:{file_ext} (file:{filename})")
-
-            content_base64 = base64.b64encode(self.get_document_content(
-                file_path=path_or_url, loader=Loader.BASE64_ONLY))
-            size_in_bytes = (len(content_base64) * (3/4)) - 1
-            datasource.media.append({"base64": content_base64.decode(
-            ), "name": filename, "mime_type": mime_type, "size": size_in_bytes * 10})
-        return self.update_datasource(datasource=datasource)
-
-    def update_datasource(self, datasource: DataSource) -> DataSource:
+    def update_datasource(self, datasource: DataSource, delta: bool = True) -> DataSource:
         """Update an existing datasource
 
+        If the datasource was fetched from the api, only the changed fields are sent by default
+        and unchanged media entries are referenced without their base64 body.
+        An update adding media is not retried (a retry could add the files twice).
+        The media of a datasource from the listing are loaded first, if the update sends media.
+
         Args:
             datasource (DataSource): The datasource to update
+            delta (bool, optional): Send only the changes (see DataSource.changed_fields). Defaults to True.
 
         Returns:
-            DataSource: Updated datasource
+            DataSource: Updated datasource (empty dict if there was nothing to update)
         """
-        data = {
-            "name": datasource.name,
-            "summary": datasource.summary,
-            "categories": datasource.categories,
-            "tags": datasource.tags,
-            "assocContexts": datasource.assoc_contexts,
-            "media": datasource.media}
-
+        if self._needs_media(datasource, delta=delta):
+            loaded = self.get_datasource_by_id(datasource_id=datasource.id, include_media=not delta)
+            datasource.load_media(loaded.media)
+        data = self._build_update_payload(datasource, delta=delta)
+        if not data:
+            return {}
         response = self._perform_request(
-            RequestType.PUT, f"{Route.DATA_SOURCE.value}/{datasource.id}", data=data)
+            RequestType.PUT,
+            f"{Route.DATA_SOURCE.value}/{datasource.id}",
+            data=data,
+            retry=False if self._adds_media(datasource) else None,
+            timeout=self._timeout_for("update_datasource"))
+        datasource.mark_clean()
         return response
 
-    def _perform_request(self, request_type: RequestType, route: str, data: dict = None) -> dict:
+    def _perform_prompt(
+            self,
+            route: str,
+            data: dict,
+            cache_bypass: bool = False,
+            cache_refresh: bool = False,
+            retry: Optional[bool] = None,
+            timeout: Optional[Timeout] = None,
+            deadline: Optional[Deadline] = None) -> dict:
+        """Warning: This method is private and should not be called manually
+           Performs a prompt request, served from the response cache if possible"""
+        key, response = self._lookup_response(
+            route, data, cache_bypass=cache_bypass, cache_refresh=cache_refresh)
+        if response is not None:
+            return response
+        start = time.perf_counter()
+        body = self._build_multipart_prompt(data) if self._use_multipart() else None
+        try:
+            response = self._perform_request(
+                RequestType.POST,
+                route=route,
+                data=data if body is None else None,
+                body=body,
+                retry=retry,
+                timeout=timeout,
+                deadline=deadline)
+        except AIManRequestError as e:
+            if not self._multipart_rejected(body, e):
+                raise
+            response = self._perform_request(
+                RequestType.POST, route=route, data=data, retry=retry, timeout=timeout, deadline=deadline)
+        else:
+            self._multipart_accepted(body)
+        self._store_response(key, response, time.perf_counter() - start)
+        return response
+
+    def _prepare_model(self, model: Union[int, str]) -> None:
+        """Warning: This method is private and should not be called manually
+           Makes sure a model name can be resolved by the model registry"""
+        if ModelRegistry.is_name(model):
+            self._ensure_models()
+
+    def _ensure_models(self) -> None:
+        """Warning: This method is private and should not be called manually
+           Loads the model registry on first use, refreshes an expired registry in the background"""
+        if not self.model_registry.loaded:
+            self.get_models()
+        elif self.model_registry.expired and self.model_registry.begin_refresh():
+            threading.Thread(target=self._refresh_models, daemon=True).start()
+
+    def _refresh_models(self) -> None:
+        """Warning: This method is private and should not be called manually"""
+        try:
+            self.get_models()
+        except Exception:  # pylint: disable=broad-exception-caught
+            # the expired catalogue stays in use, the next lookup retries
+            pass
+        finally:
+            self.model_registry.end_refresh()
+
+    def _ensure_valid_token(self) -> None:
+        """Warning: This method is private and should not be called manually"""
+        self.credential.ensure_valid_token()
+
+    def _perform_request(
+            self,
+            request_type: RequestType,
+            route: str,
+            data: dict = None,
+            body=None,
+            retry: Optional[bool] = None,
+            timeout: Optional[Timeout] = None,
+            deadline: Optional[Deadline] = None) -> dict:
         """Warning. This method is private and should not be called manually
 
         Args:
             request_type (RequestType): Enum of RequestTypes (GET, POST, PUT and DELETE)
             route (str): _description_
             data (dict, optional): _description_. Defaults to None.
+            body (optional): Already serialized body (json bytes, StreamedJsonBody or MultipartBody), sent instead of data.
+                Defaults to None.
+            retry (bool, optional): True marks a POST as retryable, False disables retries (see RetryPolicy). Defaults to None.
+            timeout (Timeout, optional): Timeout of every attempt (total limits all attempts). Defaults to None (the default timeout).
+            deadline (Deadline, optional): Deadline of the request including its retries. Defaults to None.
 
         Raises:
-            Exception: _description_
+            AIManRequestError: If the api responds with an error status code (after all retries)
+            DeadlineExceededError: If the deadline passed
 
         Returns:
             dict: _description_
         """
-        if self.credential.auto_refresh_token and Util.is_token_expired(self.credential.access.expires_on):
-            self.credential.refresh_access_token()
-
-        url = f"{self.credential.api_host}{route}"
-        response = None
-        headers = {"accept": "application/json"}
-        headers.update(
-            {"Authorization": f"Bearer {self.credential.access.token}"})
-        if request_type == RequestType.GET:
-            response = requests.get(
-                url=url,
-                headers=headers,
-                allow_redirects=True,
-                timeout=self.request_timeout)
-
-        if request_type == RequestType.POST:
-            headers.update({"Content-Type": "application/json"})
-            response = requests.post(
-                url=url,
-                headers=headers,
-                json=data,
-                allow_redirects=True,
-                timeout=self.request_timeout)
-
-        if request_type == RequestType.DELETE:
-            headers.update({"Content-Type": "application/json"})
-            response = requests.delete(
-                url=url,
-                headers=headers,
-                allow_redirects=True,
-                timeout=self.request_timeout)
-            return response.status_code
+        if self._coalesces(request_type, route):
+            return self._single_flight.do(
+                route, lambda: self._send_request(request_type, route, timeout=timeout, deadline=deadline))
+        return self._send_request(
+            request_type, route, data=data, body=body, retry=retry, timeout=timeout, deadline=deadline)
+
+    def _send_request(
+            self,
+            request_type: RequestType,
+            route: str,
+            data: dict = None,
+            body=None,
+            retry: Optional[bool] = None,
+            timeout: Optional[Timeout] = None,
+            deadline: Optional[Deadline] = None) -> dict:
+        """Warning. This method is private and should not be called manually
+           Performs the request, retried according to the retry policy (see _perform_request)"""
+        timeout = self._timeout_for(None, timeout)
+        if timeout.total is not None:
+            deadline = Deadline.earliest(deadline, Deadline(timeout.total))
+        attempt = 0
+        while True:
+            attempt_timeout = timeout if deadline is None else deadline.bound(timeout)
+            try:
+                return self._send_attempt(
+                    request_type,
+                    route,
+                    data=data,
+                    body=body,
+                    timeout=attempt_timeout,
+                    attempt=attempt)
+            except Exception as e:  # pylint: disable=broad-exception-caught
+                delay = self.retry_policy.delay(
+                    request_type,
+                    e,
+                    attempt,
+                    transient=isinstance(e, (requests.ConnectionError, requests.Timeout)),
+                    retry=retry)
+                if delay is None and attempt == 0 and retry is not False and self._is_stale_connection(e):
+                    # a pooled connection closed by the host while idle, sent once more (also a POST)
+                    delay = 0.0
+                if delay is None or (deadline is not None and delay >= deadline.remaining()):
+                    if self._is_timeout(e) and self._capped_by_deadline(deadline, timeout, attempt_timeout):
+                        raise DeadlineExceededError("Error: deadline exceeded") from e
+                    raise
+            time.sleep(delay)
+            attempt += 1
+
+    @staticmethod
+    def _is_timeout(error: Exception) -> bool:
+        """Warning. This method is private and should not be called manually
+           Whether a connect or read timeout fired (a read timeout while reading the body is a requests.ConnectionError)"""
+        return isinstance(error, requests.Timeout) or (
+            isinstance(error, requests.ConnectionError) and isinstance(error.__cause__, ReadTimeoutError))
 
-        if request_type == RequestType.PUT:
-            headers.update({"Content-Type": "application/json"})
-            response = requests.put(
-                url=url,
-                headers=headers,
-                json=data,
-                allow_redirects=True,
-                timeout=self.request_timeout)
+    @staticmethod
+    def _is_stale_connection(error: Exception) -> bool:
+        """Warning. This method is private and should not be called manually
+           Whether a reused keep-alive connection was reset before any byte of the response arrived,
+           the host closed it while it was idle and has not seen the request. The errors of reading the
+           body are ChunkedEncodingErrors, no requests.ConnectionError"""
+        return isinstance(error, requests.ConnectionError) and connection_reused() and is_connection_reset(error)
 
-        if response.status_code not in [200, 201, 202]:
-            raise RuntimeError(
-                f"[{response.status_code}] Reason: {response.reason}")
+    def _read_content(self, response: requests.Response, deadline: Optional[Deadline]) -> bytes:
+        """Warning. This method is private and should not be called manually
+           Reads the body of a response, checking the deadline between the reads (the read timeout alone
+           does not end a response whose bytes keep trickling in)
 
-        content = json.loads(response.content.decode('utf-8'))
-        return content['messageContent']['data']
+        Raises:
+            DeadlineExceededError: If the deadline passes while reading (the connection is dropped)
+        """
+        if deadline is None:
+            return response.content
+        read = getattr(response.raw, "read1", None)
+        if read is None:
+            # urllib3 < 2 has no read1, the deadline is checked per chunk
+            reads = response.iter_content(chunk_size=65536)
+        else:
+            reads = iter(lambda: read(65536, decode_content=True), b"")
+        chunks = []
+        try:
+            for chunk in reads:
+                deadline.check()
+                chunks.append(chunk)
+        except (DeadlineExceededError, ProtocolError, DecodeError, ReadTimeoutError, SSLError) as e:
+            response.close()
+            if isinstance(e, DeadlineExceededError):
+                raise
+            # the exceptions of requests (as response.content raises them)
+            if isinstance(e, ProtocolError):
+                raise requests.exceptions.ChunkedEncodingError(e) from e
+            if isinstance(e, DecodeError):
+                raise requests.exceptions.ContentDecodingError(e) from e
+            if isinstance(e, ReadTimeoutError):
+                raise requests.ConnectionError(e) from e
+            raise requests.exceptions.SSLError(e) from e
+        return b"".join(chunks)
+
+    def _send_attempt(self, request_type: RequestType, route: str, timeout: Timeout, data: dict = None, body=None, attempt: int = 0) -> dict:
+        """Warning. This method is private and should not be called manually
+           Performs a single attempt of a request (timeout.total is the time left for the attempt)"""
+        start = time.perf_counter()
+        deadline = None if timeout.total is None else Deadline(timeout.total)
+        forget_connection()
+        event = self._request_event(request_type, route, attempt)
+        wait_seconds, probe = self._before_send(route)
+        try:
+            if timeout.total is not None and wait_seconds >= timeout.total:
+                raise DeadlineExceededError("Error: deadline exceeded while waiting for the rate limit")
+            if wait_seconds > 0:
+                time.sleep(wait_seconds)
+            if event is not None:
+                event.queue_wait = time.perf_counter() - start
+            self._ensure_valid_token()
+
+            url = f"{self.credential.api_host}{route}"
+            response = None
+            headers = self._build_headers(request_type)
+            if body is None and data is not None and request_type in (RequestType.POST, RequestType.PUT):
+                body = self.serializer.dumps(data)
+            if hasattr(body, "content_type"):
+                headers.update({"Content-Type": body.content_type})
+            if event is not None:
+                event.request_bytes = 0 if body is None else len(body)
+        except BaseException:
+            self._abandon_send(probe)
+            raise
+        try:
+            if request_type == RequestType.GET:
+                response = self.session.get(
+                    url=url,
+                    headers=headers,
+                    allow_redirects=True,
+                    stream=deadline is not None,
+                    timeout=(timeout.connect, timeout.read))
+
+            if request_type == RequestType.POST:
+                response = self.session.post(
+                    url=url,
+                    headers=headers,
+                    data=body,
+                    allow_redirects=True,
+                    stream=deadline is not None,
+                    timeout=(timeout.connect, timeout.read))
+
+            if request_type == RequestType.DELETE:
+                response = self.session.delete(
+                    url=url,
+                    headers=headers,
+                    allow_redirects=True,
+                    stream=deadline is not None,
+                    timeout=(timeout.connect, timeout.read))
+
+            if request_type == RequestType.PUT:
+                response = self.session.put(
+                    url=url,
+                    headers=headers,
+                    data=body,
+                    allow_redirects=True,
+                    stream=deadline is not None,
+                    timeout=(timeout.connect, timeout.read))
+        except requests.RequestException as e:
+            self._after_send(route, None)
+            self._emit_request(event, start, e)
+            raise
+        except BaseException:
+            self._abandon_send(probe)
+            raise
+        self._after_send(route, response.status_code)
+        if event is not None:
+            event.status_code = response.status_code
+            event.time_to_first_byte = event.queue_wait + response.elapsed.total_seconds()
+
+        error = None
+        try:
+            content = self._read_content(response, deadline)
+            if event is not None:
+                event.response_bytes = len(content)
+            if request_type == RequestType.DELETE:
+                return response.status_code
+
+            self._raise_for_status(
+                response.status_code, response.reason, parse_retry_after(response.headers.get("Retry-After")))
+
+            return self.serializer.loads_data(content)
+        except Exception as e:
+            error = e
+            raise
+        finally:
+            self._emit_request(event, start, error)
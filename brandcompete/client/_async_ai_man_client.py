@@ -0,0 +1,888 @@
+"""Module providing an asyncio based aiman service client"""
+import asyncio
+import time
+from typing import (
+    AsyncIterator,
+    Dict,
+    Iterable,
+    List,
+    Optional,
+    Union
+)
+try:
+    import aiohttp
+except ImportError:
+    aiohttp = None
+from brandcompete.core.util import Util
+from brandcompete.core.credentials import TokenCredential
+from brandcompete.core.extraction import DocumentExtractor
+from brandcompete.core.cache import DocumentCache
+from brandcompete.core.response_cache import ResponseCache
+from brandcompete.core.registry import ModelRegistry
+from brandcompete.core.singleflight import AsyncSingleFlight
+from brandcompete.core.resilience import CircuitBreaker, RateLimiter, RetryPolicy, is_connection_reset, parse_retry_after
+from brandcompete.core.timeouts import Deadline
+from brandcompete.core.exceptions import AIManRequestError, DeadlineExceededError
+from brandcompete.core.serialization import JsonSerializer
+from brandcompete.core.instrumentation import Instrumentation
+from brandcompete.core.session import connection_reused, connection_trace_config, forget_connection
+from brandcompete.core.upload import MultipartBody, StreamedJsonBody
+from brandcompete.core.templates import PromptTemplate
+from brandcompete.core.batch import PromptResult
+from brandcompete.core.classes import (
+    AIModel,
+    DataSource,
+    Loader,
+    PromptOptions,
+    Route,
+    RequestType,
+    Timeout,
+    UploadMode
+)
+from brandcompete.client._base_client import AIManClientBase
+from brandcompete.client._prompt_stream import AsyncPromptStream
+
+
+class AsyncAIManServiceClient(AIManClientBase):
+    """Represents the asyncio based AI Manager Service Client"""
+
+    def __init__(
+            self,
+            credential: TokenCredential,
+            session=None,
+            max_concurrency: int = 64,
+            document_extractor: Optional[DocumentExtractor] = None,
+            document_cache: Optional[DocumentCache] = None,
+            response_cache: Optional[ResponseCache] = None,
+            model_registry: Optional[ModelRegistry] = None,
+            coalesce_routes: Iterable[Union[Route, str]] = (Route.GET_MODELS, Route.DATA_SOURCE),
+            retry_policy: Optional[RetryPolicy] = None,
+            rate_limiter: Optional[RateLimiter] = None,
+            circuit_breaker: Optional[CircuitBreaker] = None,
+            timeouts: Optional[Dict[str, Timeout]] = None,
+            serializer: Optional[JsonSerializer] = None,
+            upload_mode: Union[UploadMode, str] = UploadMode.BASE64,
+            instrumentation: Optional[Instrumentation] = None) -> None:
+        """Create an async service client
+
+        Args:
+            credential (TokenCredential): The token credential
+            session (aiohttp.ClientSession, optional): An externally owned session. If None, the client
+                creates (and owns) a session on first use. Defaults to None.
+            max_concurrency (int, optional): Max. number of requests in flight at the same time.
+                Further requests wait until a slot is free. Defaults to 64.
+            document_extractor (DocumentExtractor, optional): Parses the files_to_rag of a prompt and
+                the files of add_documents in parallel. Defaults to None (serial parsing).
+            document_cache (DocumentCache, optional): Caches the parsed and base64 encoded
+                documents. Defaults to None.
+            response_cache (ResponseCache, optional): Caches the responses of prompt and
+                prompt_on_datasource (deterministic prompts only). Defaults to None.
+            model_registry (ModelRegistry, optional): Catalogue resolving model names to model tags
+                (may be shared between clients). Defaults to None (a registry with a ttl of 300 seconds).
+            coalesce_routes (Iterable[Union[Route, str]], optional): Routes (and their sub routes) whose concurrent
+                identical GET requests share one request and its result. Defaults to models and datasources.
+            retry_policy (RetryPolicy, optional): Retries of throttled (429) and failed requests with jittered
+                exponential backoff. Defaults to None (RetryPolicy()).
+            rate_limiter (RateLimiter, optional): Client side rate limit, adapting to throttling. Defaults to None.
+            circuit_breaker (CircuitBreaker, optional): Rejects requests immediately while the host is failing. Defaults to None.
+            timeouts (Dict[str, Timeout], optional): Timeouts by method name (e.g. {"get_models": Timeout(connect=3, read=10)}).
+                Defaults to None (connect 10 seconds, read request_timeout).
+            serializer (JsonSerializer, optional): The json codec of request and response bodies.
+                Defaults to None (orjson or ujson if installed, else the standard library json).
+            upload_mode (Union[UploadMode, str], optional): Transport of files and attachments: base64 encoded in the
+                json body, raw bytes in a multipart/form-data body, or auto (multipart, falling back to base64 json
+                if the server rejects it with 400 or 415). Defaults to UploadMode.BASE64.
+            instrumentation (Instrumentation, optional): Receives the metrics of every request attempt, token
+                request and document extraction. Defaults to None.
+
+        Raises:
+            ImportError: If aiohttp is not installed
+        """
+        if aiohttp is None:
+            raise ImportError(
+                "Error: aiohttp is required for the async client. Install it via: pip install AI-Manager-Python-SDK[async]")
+        super().__init__(
+            credential=credential,
+            document_extractor=document_extractor,
+            document_cache=document_cache,
+            response_cache=response_cache,
+            model_registry=model_registry,
+            coalesce_routes=coalesce_routes,
+            retry_policy=retry_policy,
+            rate_limiter=rate_limiter,
+            circuit_breaker=circuit_breaker,
+            timeouts=timeouts,
+            serializer=serializer,
+            upload_mode=upload_mode,
+            instrumentation=instrumentation)
+        self.max_concurrency = max_concurrency
+        self.session = session
+        self._owns_session = session is None
+        self._single_flight = AsyncSingleFlight()
+        self._semaphore: Optional[asyncio.Semaphore] = None
+        self._refresh_lock: Optional[asyncio.Lock] = None
+
+    async def __aenter__(self) -> "AsyncAIManServiceClient":
+        return self
+
+    async def __aexit__(self, exc_type, exc_value, traceback) -> None:
+        await self.close()
+
+    async def close(self) -> None:
+        """Close the pooled connections (only if the session is owned by the client)"""
+        if self._owns_session and self.session is not None:
+            await self.session.close()
+            self.session = None
+
+    async def get_models(self, cached: bool = False, timeout: Optional[Timeout] = None) -> List[AIModel]:
+        """Get all available models to prompt on
+
+        Args:
+            cached (bool, optional): Serve the models from the model registry (loaded on first use,
+                refreshed in the background once expired). Defaults to False.
+            timeout (Timeout, optional): Timeout of this call. Defaults to None (see timeouts).
+
+        Returns:
+            List[AIModel]: List of available AIModel objects
+        """
+        if cached:
+            await self._ensure_models()
+            return self.model_registry.models
+        results = await self._perform_request(
+            request_type=RequestType.GET,
+            route=Route.GET_MODELS.value,
+            timeout=self._timeout_for("get_models", timeout))
+        return self._parse_models(results)
+
+    async def resolve_model(self, model: Union[int, str]) -> int:
+        """Resolve a model name or uuid to its default model tag (see AIManServiceClient.resolve_model)
+
+        Raises:
+            ValueError: If the model is unknown
+
+        Returns:
+            int: The model tag
+        """
+        if ModelRegistry.is_name(model):
+            await self._ensure_models()
+        return self.model_registry.resolve(model)
+
+    async def prompt(self, **kwargs) -> dict:
+        """Prompt a query (see AIManServiceClient.prompt for all arguments)
+
+        Documents passed via loader are parsed in the default executor.
+
+        Raises:
+            ValueError: If any of the required parameters are missing
+            DeadlineExceededError: If the deadline passed
+
+        Returns:
+            dict: The API-Response as dict
+        """
+        await self._prepare_model(kwargs.get("model_tag"))
+        if "loader" in kwargs and kwargs["loader"] is not None:
+            route, prompt_dict = await asyncio.get_running_loop().run_in_executor(
+                None, self._build_prompt_request, kwargs)
+        else:
+            route, prompt_dict = self._build_prompt_request(kwargs)
+        return await self._perform_prompt(
+            route=route,
+            data=prompt_dict,
+            cache_bypass=kwargs["cache_bypass"] if "cache_bypass" in kwargs else False,
+            cache_refresh=kwargs["cache_refresh"] if "cache_refresh" in kwargs else False,
+            retry=kwargs["retry"] if "retry" in kwargs else None,
+            timeout=self._timeout_for("prompt", kwargs["timeout"] if "timeout" in kwargs else None),
+            deadline=Deadline.of(kwargs["deadline"] if "deadline" in kwargs else None))
+
+    async def prompt_stream(self, **kwargs) -> AsyncPromptStream:
+        """Prompt a query and stream the response (same arguments as prompt)
+
+        Raises:
+            ValueError: If any of the required parameters are missing
+
+        Returns:
+            AsyncPromptStream: Async iterable of tokens as they arrive. After the iteration
+                message_content holds the aggregated response
+        """
+        kwargs["stream"] = True
+        await self._prepare_model(kwargs.get("model_tag"))
+        if "loader" in kwargs and kwargs["loader"] is not None:
+            route, prompt_dict = await asyncio.get_running_loop().run_in_executor(
+                None, self._build_prompt_request, kwargs)
+        else:
+            route, prompt_dict = self._build_prompt_request(kwargs)
+        timeout = self._timeout_for("prompt_stream", kwargs["timeout"] if "timeout" in kwargs else None)
+        body = self._build_multipart_prompt(prompt_dict) if self._use_multipart(probe=False) else None
+        start = time.perf_counter()
+        event = self._request_event(RequestType.POST, route, 0)
+        wait_seconds, probe = self._before_send(route)
+        try:
+            if wait_seconds > 0:
+                await asyncio.sleep(wait_seconds)
+            token_start = time.perf_counter()
+            await self._ensure_valid_token()
+            token_seconds = time.perf_counter() - token_start
+            headers = self._build_headers(RequestType.POST)
+            if body is None:
+                body = self.serializer.dumps(prompt_dict)
+            else:
+                headers.update({"Content-Type": body.content_type, "Content-Length": str(len(body))})
+            if event is not None:
+                event.request_bytes = len(body)
+            semaphore = self._get_semaphore()
+            await semaphore.acquire()
+        except BaseException:
+            self._abandon_send(probe)
+            raise
+        if event is not None:
+            event.queue_wait = time.perf_counter() - start - token_seconds
+        try:
+            response = await self._get_session().post(
+                f"{self.credential.api_host}{route}",
+                headers=headers,
+                data=body,
+                allow_redirects=True,
+                timeout=aiohttp.ClientTimeout(total=None, sock_connect=timeout.connect, sock_read=timeout.read))
+        except BaseException as e:
+            semaphore.release()
+            if isinstance(e, (aiohttp.ClientError, asyncio.TimeoutError)):
+                self._after_send(route, None)
+                self._emit_request(event, start, e)
+            else:
+                self._abandon_send(probe)
+            raise
+        self._after_send(route, response.status)
+        if event is not None:
+            event.status_code = response.status
+            event.time_to_first_byte = time.perf_counter() - start
+        if response.status not in [200, 201, 202]:
+            response.release()
+            semaphore.release()
+        try:
+            self._raise_for_status(
+                response.status, response.reason, parse_retry_after(response.headers.get("Retry-After")))
+        except AIManRequestError as e:
+            self._emit_request(event, start, e)
+            raise
+        self._emit_request(event, start)
+        return AsyncPromptStream(response, on_close=semaphore.release, serializer=self.serializer)
+
+    async def prompt_many(
+            self,
+            jobs: Iterable,
+            max_concurrency: int = 8,
+            ordered: bool = True,
+            timeout: Optional[Timeout] = None,
+            deadline: Optional[Union[float, Deadline]] = None) -> AsyncIterator[PromptResult]:
+        """Prompt a batch of queries concurrently (see AIManServiceClient.prompt_many)
+
+        Args:
+            jobs (Iterable): PromptJob objects (with a PromptTemplate, see prepare_prompt) or
+                (model_tag, query, prompt_options, files_to_rag) tuples
+            max_concurrency (int, optional): Max. number of prompts in flight. Defaults to 8.
+            ordered (bool, optional): Yield results in input order (True) or in completion order (False). Defaults to True.
+            timeout (Timeout, optional): Timeout of every prompt. Defaults to None (see timeouts, key "prompt").
+            deadline (Union[float, Deadline], optional): Seconds (or a Deadline) by which the whole batch has to finish.
+                Defaults to None.
+
+        Yields:
+            AsyncIterator[PromptResult]: One result per job
+        """
+        await self._ensure_valid_token()
+        options_cache = {}
+        timeout = self._timeout_for("prompt", timeout)
+        deadline = Deadline.of(deadline)
+        loop = asyncio.get_running_loop()
+        payload = self.response_cache is not None
+
+        async def run(index: int, job) -> PromptResult:
+            result = PromptResult(index=index)
+            try:
+                if deadline is not None:
+                    deadline.check()
+                result.job = self._to_prompt_job(job)
+                body = None
+                if result.job.template is not None and result.job.files_to_rag:
+                    route, prompt_dict, body = await loop.run_in_executor(
+                        None, self._build_template_request,
+                        result.job.template, result.job.query, result.job.files_to_rag, result.job.loader, payload)
+                elif result.job.template is not None:
+                    route, prompt_dict, body = self._build_template_request(
+                        result.job.template, result.job.query, payload=payload)
+                else:
+                    await self._prepare_model(result.job.model_tag)
+                    kwargs = result.job.to_kwargs()
+                    if result.job.loader is not None:
+                        route, prompt_dict = await loop.run_in_executor(
+                            None, self._build_prompt_request, kwargs, options_cache)
+                    else:
+                        route, prompt_dict = self._build_prompt_request(
+                            kwargs, options_cache=options_cache)
+                if body is None:
+                    result.response = await self._perform_prompt(
+                        route=route, data=prompt_dict, timeout=timeout, deadline=deadline)
+                else:
+                    result.response = await self._perform_request(
+                        RequestType.POST, route=route, body=body, timeout=timeout, deadline=deadline)
+            except Exception as e:  # pylint: disable=broad-exception-caught
+                result.error = e
+            return result
+
+        jobs = iter(enumerate(jobs))
+        pending = set()
+        finished = {}
+        next_index = 0
+        try:
+            while True:
+                for index, job in jobs:
+                    pending.add(asyncio.ensure_future(run(index, job)))
+                    if len(pending) >= max_concurrency:
+                        break
+                if not pending:
+                    break
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    result = task.result()
+                    if not ordered:
+                        yield result
+                        continue
+                    finished[result.index] = result
+                while next_index in finished:
+                    yield finished.pop(next_index)
+                    next_index += 1
+        finally:
+            for task in pending:
+                task.cancel()
+
+    async def prepare_prompt(
+            self,
+            model_tag: Union[int, str],
+            prompt_options: Optional[PromptOptions] = None,
+            loader: Optional[Loader] = None) -> PromptTemplate:
+        """Prepare a prompt template (see AIManServiceClient.prepare_prompt)
+
+        Raises:
+            ValueError: If the model is unknown
+
+        Returns:
+            PromptTemplate: The template
+        """
+        return PromptTemplate(
+            await self.resolve_model(model_tag), prompt_options=prompt_options, loader=loader, serializer=self.serializer)
+
+    async def prompt_template(
+            self,
+            template: PromptTemplate,
+            query: str,
+            files_to_rag: Optional[List[str]] = None,
+            cache_bypass: bool = False,
+            cache_refresh: bool = False,
+            retry: Optional[bool] = None,
+            timeout: Optional[Timeout] = None,
+            deadline: Optional[Union[float, Deadline]] = None) -> dict:
+        """Prompt a query with a prepared template (see AIManServiceClient.prompt_template)
+
+        Files to rag are parsed in the default executor.
+
+        Raises:
+            ValueError: If the loader of a file to rag can not be inferred
+            DeadlineExceededError: If the deadline passed
+
+        Returns:
+            dict: The API-Response as dict
+        """
+        payload = self.response_cache is not None and not cache_bypass
+        if files_to_rag:
+            route, prompt_dict, body = await asyncio.get_running_loop().run_in_executor(
+                None, self._build_template_request, template, query, files_to_rag, None, payload)
+        else:
+            route, prompt_dict, body = self._build_template_request(template, query, payload=payload)
+        timeout = self._timeout_for("prompt", timeout)
+        if body is None:
+            return await self._perform_prompt(
+                route=route,
+                data=prompt_dict,
+                cache_bypass=cache_bypass,
+                cache_refresh=cache_refresh,
+                retry=retry,
+                timeout=timeout,
+                deadline=Deadline.of(deadline))
+        return await self._perform_request(
+            RequestType.POST, route=route, body=body, retry=retry, timeout=timeout, deadline=Deadline.of(deadline))
+
+    async def prompt_on_datasource(
+            self,
+            datasource_id: int,
+            model_tag_id: Union[int, str],
+            query: str,
+            prompt_options: PromptOptions = None,
+            cache_bypass: bool = False,
+            cache_refresh: bool = False,
+            retry: Optional[bool] = None,
+            timeout: Optional[Timeout] = None,
+            deadline: Optional[Union[float, Deadline]] = None) -> dict:
+        """Prompt on a datasource (by id)
+
+        Args:
+            datasource_id (int): The datasource id (related to current account)
+            model_tag_id (Union[int, str]): Model tag id, or a model name or uuid
+            query (str): The query to prompt
+            prompt_options (PromptOptions, optional): Prompt options. Defaults to None.
+            cache_bypass (bool, optional): Neither read nor write the response cache. Defaults to False.
+            cache_refresh (bool, optional): Skip the response cache lookup, but cache the new response. Defaults to False.
+            retry (bool, optional): True also retries on server and transport errors (not only on throttling),
+                False disables retries. Defaults to None.
+            timeout (Timeout, optional): Timeout of this call. Defaults to None (see timeouts).
+            deadline (Union[float, Deadline], optional): Seconds (or a Deadline) by which the call
+                including its retries has to finish. Defaults to None.
+
+        Returns:
+            dict: The API-Response as dict
+        """
+        await self._prepare_model(model_tag_id)
+        route, prompt_dict = self._build_datasource_prompt_request(
+            datasource_id=datasource_id, model_tag_id=model_tag_id, query=query, prompt_options=prompt_options)
+        return await self._perform_prompt(
+            route=route,
+            data=prompt_dict,
+            cache_bypass=cache_bypass,
+            cache_refresh=cache_refresh,
+            retry=retry,
+            timeout=self._timeout_for("prompt_on_datasource", timeout),
+            deadline=Deadline.of(deadline))
+
+    async def fetch_all_datasources(
+            self,
+            hydrate: bool = False,
+            max_concurrency: int = 8,
+            include_media: bool = True,
+            deadline: Optional[Union[float, Deadline]] = None) -> List[DataSource]:
+        """Fetch all datasources related to the account (see AIManServiceClient.fetch_all_datasources)
+
+        Args:
+            hydrate (bool, optional): Fetch the details of every datasource. Defaults to False.
+            max_concurrency (int, optional): Max. number of detail requests in flight (hydrate only). Defaults to 8.
+            include_media (bool, optional): Keep the base64 bodies of the media entries (hydrate only). Defaults to True.
+            deadline (Union[float, Deadline], optional): Seconds (or a Deadline) by which the listing and all
+                detail requests have to finish. Defaults to None.
+
+        Returns:
+            List[DataSource]: List of datasource objects
+        """
+        deadline = Deadline.of(deadline)
+        fetch_all_response = await self._perform_request(
+            RequestType.GET,
+            Route.DATA_SOURCE.value,
+            timeout=self._timeout_for("fetch_all_datasources"),
+            deadline=deadline)
+        datasources = self._parse_datasource_listing(fetch_all_response)
+        if not hydrate:
+            return datasources
+
+        semaphore = asyncio.Semaphore(max_concurrency)
+
+        async def hydrate_source(source: DataSource) -> DataSource:
+            async with semaphore:
+                return await self.get_datasource_by_id(
+                    source.id, include_media=include_media, deadline=deadline)
+
+        return list(await asyncio.gather(*[hydrate_source(source) for source in datasources]))
+
+    async def get_datasource_by_id(
+            self,
+            datasource_id: int,
+            include_media: bool = True,
+            timeout: Optional[Timeout] = None,
+            deadline: Optional[Union[float, Deadline]] = None) -> Optional[DataSource]:
+        """Get a specific datasource by id
+
+        Args:
+            datasource_id (int): the datasource id
+            include_media (bool, optional): Keep the base64 bodies of the media entries. Defaults to True.
+            timeout (Timeout, optional): Timeout of this call. Defaults to None (see timeouts).
+            deadline (Union[float, Deadline], optional): Seconds (or a Deadline) by which the call has to finish. Defaults to None.
+
+        Returns:
+            DataSource: None or Datasource object
+        """
+        url = f"{Route.DATA_SOURCE.value}/{datasource_id}"
+        response = await self._perform_request(
+            RequestType.GET,
+            url,
+            timeout=self._timeout_for("get_datasource_by_id", timeout),
+            deadline=Deadline.of(deadline))
+        return self._parse_datasource(response, include_media=include_media)
+
+    async def init_new_datasource(self, name: str, summary: str, tags: List[str] = None, categories: List[str] = None) -> int:
+        """Initiate and add a new datasource to current account
+
+        Args:
+            name (str): datasource name
+            summary (str): summary
+            tags (List[str], optional): A list of tags. Defaults to None.
+            categories (List[str], optional): a list of categories. Defaults to None.
+
+        Returns:
+            int: The datasource id
+        """
+        data = self._build_new_datasource_payload(
+            name=name, summary=summary, tags=tags, categories=categories)
+        response = await self._perform_request(
+            request_type=RequestType.POST,
+            route=Route.DATA_SOURCE.value,
+            data=data,
+            retry=False,
+            timeout=self._timeout_for("init_new_datasource"))
+        return self._parse_new_datasource_id(response)
+
+    async def delete_datasource(self, datasource_id: int) -> bool:
+        """Delete a specific datasource by id
+
+        Args:
+            datasource_id (int): the datasource id
+
+        Returns:
+            bool: success true or false
+        """
+        code: int = await self._perform_request(
+            request_type=RequestType.DELETE,
+            route=f"{Route.DATA_SOURCE.value}/{datasource_id}",
+            timeout=self._timeout_for("delete_datasource"))
+        return code
+
+    async def add_documents(self, data_source_id: int, sources: List[str], stream_upload: bool = True) -> DataSource:
+        """Add one or more documents (files, urls) to an datasource
+
+        Args:
+            data_source_id (int): the datasource id
+            sources (List[str]): list of file paths or urls
+            stream_upload (bool, optional): Base64 encode the files chunk by chunk while uploading
+                (bounded memory) instead of loading them into memory. Defaults to True.
+                Multipart uploads (see upload_mode) are always streamed.
+                The upload is not retried, a retry could add the documents twice.
+
+        Raises:
+            Exception: If datasource not exists
+
+        Returns:
+            DataSource: the datasource with all added documents (media list)
+        """
+        datasource: DataSource = await self.get_datasource_by_id(
+            datasource_id=data_source_id)
+        if not stream_upload and not self._use_multipart():
+            await asyncio.get_running_loop().run_in_executor(
+                None, self._append_documents, datasource, sources)
+            return await self.update_datasource(datasource=datasource)
+
+        if self._use_multipart():
+            upload_body = MultipartBody(dumps=self.serializer.dumps)
+        else:
+            upload_body = StreamedJsonBody(dumps=self.serializer.dumps)
+        self._append_documents(
+            datasource=datasource, sources=sources, upload_body=upload_body)
+        upload_body.encode(self._build_update_payload(datasource, delta=True))
+        try:
+            response = await self._perform_request(
+                RequestType.PUT,
+                f"{Route.DATA_SOURCE.value}/{datasource.id}",
+                body=upload_body,
+                retry=False,
+                timeout=self._timeout_for("add_documents"))
+        except AIManRequestError as e:
+            if not self._multipart_rejected(upload_body, e):
+                raise
+            return await self.add_documents(data_source_id=data_source_id, sources=sources, stream_upload=stream_upload)
+        self._multipart_accepted(upload_body)
+        return response
+
+    async def update_datasource(self, datasource: DataSource, delta: bool = True) -> DataSource:
+        """Update an existing datasource
+
+        If the datasource was fetched from the api, only the changed fields are sent by default
+        and unchanged media entries are referenced without their base64 body.
+        An update adding media is not retried (a retry could add the files twice).
+        The media of a datasource from the listing are loaded first, if the update sends media.
+
+        Args:
+            datasource (DataSource): The datasource to update
+            delta (bool, optional): Send only the changes (see DataSource.changed_fields). Defaults to True.
+
+        Returns:
+            DataSource: Updated datasource (empty dict if there was nothing to update)
+        """
+        if self._needs_media(datasource, delta=delta):
+            loaded = await self.get_datasource_by_id(datasource_id=datasource.id, include_media=not delta)
+            datasource.load_media(loaded.media)
+        data = self._build_update_payload(datasource, delta=delta)
+        if not data:
+            return {}
+        response = await self._perform_request(
+            RequestType.PUT,
+            f"{Route.DATA_SOURCE.value}/{datasource.id}",
+            data=data,
+            retry=False if self._adds_media(datasource) else None,
+            timeout=self._timeout_for("update_datasource"))
+        datasource.mark_clean()
+        return response
+
+    async def _perform_prompt(
+            self,
+            route: str,
+            data: dict,
+            cache_bypass: bool = False,
+            cache_refresh: bool = False,
+            retry: Optional[bool] = None,
+            timeout: Optional[Timeout] = None,
+            deadline: Optional[Deadline] = None) -> dict:
+        """Warning: This method is private and should not be called manually
+           Performs a prompt request, served from the response cache if possible"""
+        key, response = self._lookup_response(
+            route, data, cache_bypass=cache_bypass, cache_refresh=cache_refresh)
+        if response is not None:
+            return response
+        start = time.perf_counter()
+        body = self._build_multipart_prompt(data) if self._use_multipart() else None
+        try:
+            response = await self._perform_request(
+                RequestType.POST,
+                route=route,
+                data=data if body is None else None,
+                body=body,
+                retry=retry,
+                timeout=timeout,
+                deadline=deadline)
+        except AIManRequestError as e:
+            if not self._multipart_rejected(body, e):
+                raise
+            response = await self._perform_request(
+                RequestType.POST, route=route, data=data, retry=retry, timeout=timeout, deadline=deadline)
+        else:
+            self._multipart_accepted(body)
+        self._store_response(key, response, time.perf_counter() - start)
+        return response
+
+    async def _prepare_model(self, model: Union[int, str]) -> None:
+        """Warning: This method is private and should not be called manually
+           Makes sure a model name can be resolved by the model registry"""
+        if ModelRegistry.is_name(model):
+            await self._ensure_models()
+
+    async def _ensure_models(self) -> None:
+        """Warning: This method is private and should not be called manually
+           Loads the model registry on first use, refreshes an expired registry in the background"""
+        if not self.model_registry.loaded:
+            await self.get_models()
+        elif self.model_registry.expired and self.model_registry.begin_refresh():
+            asyncio.ensure_future(self._refresh_models())
+
+    async def _refresh_models(self) -> None:
+        """Warning: This method is private and should not be called manually"""
+        try:
+            await self.get_models()
+        except Exception:  # pylint: disable=broad-exception-caught
+            # the expired catalogue stays in use, the next lookup retries
+            pass
+        finally:
+            self.model_registry.end_refresh()
+
+    def _get_session(self):
+        """Warning: This method is private and should not be called manually"""
+        if self.session is None:
+            connector = aiohttp.TCPConnector(limit=self.max_concurrency)
+            self.session = aiohttp.ClientSession(
+                connector=connector,
+                trace_configs=[connection_trace_config()],
+                cookies=self.credential.session.cookies.get_dict())
+        return self.session
+
+    def _get_semaphore(self) -> asyncio.Semaphore:
+        """Warning: This method is private and should not be called manually"""
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(self.max_concurrency)
+        return self._semaphore
+
+    async def _ensure_valid_token(self) -> None:
+        """Warning: This method is private and should not be called manually
+           Refreshes an expired token once, even if many tasks notice the expiry at the same time.
+           A token about to expire is refreshed in the background"""
+        access = self.credential.access
+        if not self.credential.auto_refresh_token:
+            return
+        if self._refresh_lock is None:
+            self._refresh_lock = asyncio.Lock()
+        if Util.is_token_expired(access.expires_on):
+            async with self._refresh_lock:
+                if self.credential.access is access:
+                    await self.credential.refresh_access_token_async(self._get_session())
+            return
+        if self.credential.expires_soon(access) and not self._refresh_lock.locked():
+            asyncio.ensure_future(self._refresh_in_background(access))
+
+    async def _refresh_in_background(self, access) -> None:
+        """Warning: This method is private and should not be called manually"""
+        async with self._refresh_lock:
+            if self.credential.access is not access:
+                return
+            try:
+                await self.credential.refresh_access_token_async(self._get_session())
+            except Exception:  # pylint: disable=broad-exception-caught
+                # the token is still valid, a failed refresh is repeated in the foreground once it expired
+                pass
+
+    async def _perform_request(
+            self,
+            request_type: RequestType,
+            route: str,
+            data: dict = None,
+            body=None,
+            retry: Optional[bool] = None,
+            timeout: Optional[Timeout] = None,
+            deadline: Optional[Deadline] = None) -> dict:
+        """Warning. This method is private and should not be called manually
+
+        Args:
+            request_type (RequestType): Enum of RequestTypes (GET, POST, PUT and DELETE)
+            route (str): The api route
+            data (dict, optional): The json payload. Defaults to None.
+            body (optional): Already serialized body (json bytes, StreamedJsonBody or MultipartBody), sent instead of data.
+                Defaults to None.
+            retry (bool, optional): True marks a POST as retryable, False disables retries (see RetryPolicy). Defaults to None.
+            timeout (Timeout, optional): Timeout of every attempt (total limits all attempts). Defaults to None (the default timeout).
+            deadline (Deadline, optional): Deadline of the request including its retries. Defaults to None.
+
+        Raises:
+            AIManRequestError: If the api responds with an error status code (after all retries)
+            DeadlineExceededError: If the deadline passed
+
+        Returns:
+            dict: The data of the api response
+        """
+        if self._coalesces(request_type, route):
+            return await self._single_flight.do(
+                route, lambda: self._send_request(request_type, route, timeout=timeout, deadline=deadline))
+        return await self._send_request(
+            request_type, route, data=data, body=body, retry=retry, timeout=timeout, deadline=deadline)
+
+    async def _send_request(
+            self,
+            request_type: RequestType,
+            route: str,
+            data: dict = None,
+            body=None,
+            retry: Optional[bool] = None,
+            timeout: Optional[Timeout] = None,
+            deadline: Optional[Deadline] = None) -> dict:
+        """Warning. This method is private and should not be called manually
+           Performs the request, retried according to the retry policy (see _perform_request)"""
+        timeout = self._timeout_for(None, timeout)
+        if timeout.total is not None:
+            deadline = Deadline.earliest(deadline, Deadline(timeout.total))
+        attempt = 0
+        while True:
+            attempt_timeout = timeout if deadline is None else deadline.bound(timeout)
+            try:
+                return await self._send_attempt(
+                    request_type,
+                    route,
+                    data=data,
+                    body=body,
+                    timeout=attempt_timeout,
+                    attempt=attempt)
+            except Exception as e:  # pylint: disable=broad-exception-caught
+                delay = self.retry_policy.delay(
+                    request_type,
+                    e,
+                    attempt,
+                    transient=isinstance(e, (aiohttp.ClientConnectionError, asyncio.TimeoutError)),
+                    retry=retry)
+                if delay is None and attempt == 0 and retry is not False and self._is_stale_connection(e):
+                    # a pooled connection closed by the host while idle, sent once more (also a POST)
+                    delay = 0.0
+                if delay is None or (deadline is not None and delay >= deadline.remaining()):
+                    if isinstance(e, asyncio.TimeoutError) and self._capped_by_deadline(deadline, timeout, attempt_timeout):
+                        raise DeadlineExceededError("Error: deadline exceeded") from e
+                    raise
+            await asyncio.sleep(delay)
+            attempt += 1
+
+    @staticmethod
+    def _is_stale_connection(error: Exception) -> bool:
+        """Warning. This method is private and should not be called manually
+           Whether a reused keep-alive connection was reset before any byte of the response arrived,
+           the host closed it while it was idle and has not seen the request. The errors of reading the
+           body are ClientPayloadErrors"""
+        if not connection_reused():
+            return False
+        return isinstance(error, aiohttp.ServerDisconnectedError) or (
+            isinstance(error, aiohttp.ClientOSError) and is_connection_reset(error))
+
+    async def _send_attempt(self, request_type: RequestType, route: str, timeout: Timeout, data: dict = None, body=None, attempt: int = 0) -> dict:
+        """Warning. This method is private and should not be called manually
+           Performs a single attempt of a request (timeout.total is the time left for the attempt)"""
+        start = time.perf_counter()
+        forget_connection()
+        event = self._request_event(request_type, route, attempt)
+        wait_seconds, probe = self._before_send(route)
+        sent = False
+        try:
+            if timeout.total is not None and wait_seconds >= timeout.total:
+                raise DeadlineExceededError("Error: deadline exceeded while waiting for the rate limit")
+            if wait_seconds > 0:
+                await asyncio.sleep(wait_seconds)
+            token_start = time.perf_counter()
+            await self._ensure_valid_token()
+            token_seconds = time.perf_counter() - token_start
+
+            url = f"{self.credential.api_host}{route}"
+            headers = self._build_headers(request_type)
+            if body is not None:
+                headers.update({"Content-Length": str(len(body))})
+                if hasattr(body, "content_type"):
+                    headers.update({"Content-Type": body.content_type})
+            elif request_type in (RequestType.POST, RequestType.PUT):
+                body = self.serializer.dumps(data)
+            if event is not None:
+                event.request_bytes = 0 if body is None else len(body)
+            session = self._get_session()
+        except BaseException:
+            self._abandon_send(probe)
+            raise
+        error = None
+        try:
+            async with self._get_semaphore():
+                if event is not None:
+                    event.queue_wait = time.perf_counter() - start - token_seconds
+                try:
+                    async with session.request(
+                            request_type.name,
+                            url,
+                            headers=headers,
+                            data=body,
+                            allow_redirects=True,
+                            timeout=aiohttp.ClientTimeout(
+                                total=timeout.total, sock_connect=timeout.connect, sock_read=timeout.read)) as response:
+                        sent = True
+                        self._after_send(route, response.status)
+                        if event is not None:
+                            event.status_code = response.status
+                            event.time_to_first_byte = time.perf_counter() - start
+                        if request_type == RequestType.DELETE:
+                            return response.status
+                        self._raise_for_status(
+                            response.status, response.reason, parse_retry_after(response.headers.get("Retry-After")))
+                        content = await response.read()
+                except (aiohttp.ClientError, asyncio.TimeoutError):
+                    if not sent:
+                        sent = True
+                        self._after_send(route, None)
+                    raise
+            if event is not None:
+                event.response_bytes = len(content)
+            return self.serializer.loads_data(content)
+        except Exception as e:
+            error = e
+            raise
+        finally:
+            if not sent:
+                self._abandon_send(probe)
+            self._emit_request(event, start, error)
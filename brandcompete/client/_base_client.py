@@ -0,0 +1,755 @@
+"""Module providing the transport independent parts of the aiman service clients"""
+import base64
+import os
+import time
+from typing import (
+    Dict,
+    Iterable,
+    Iterator,
+    List,
+    Optional,
+    Tuple,
+    Union
+)
+from brandcompete.core.util import Util
+from brandcompete.core.credentials import TokenCredential
+from brandcompete.core.upload import MultipartBody, StreamedJsonBody
+from brandcompete.core.loaders import load_document
+from brandcompete.core.extraction import DocumentExtractor, extract_document
+from brandcompete.core.cache import DocumentCache
+from brandcompete.core.packing import ContextPacker
+from brandcompete.core.response_cache import ResponseCache
+from brandcompete.core.registry import ModelRegistry
+from brandcompete.core.exceptions import AIManRequestError
+from brandcompete.core.resilience import CircuitBreaker, RateLimiter, RetryPolicy
+from brandcompete.core.timeouts import Deadline
+from brandcompete.core.serialization import JsonSerializer, get_serializer
+from brandcompete.core.instrumentation import Instrumentation, emit
+from brandcompete.core.templates import PromptTemplate
+from brandcompete.core.batch import PromptJob
+from brandcompete.core.classes import (
+    AIModel,
+    Attachment,
+    DataSource,
+    ExtractionResult,
+    PromptOptions,
+    Route,
+    Prompt,
+    Loader,
+    RequestEvent,
+    RequestType,
+    Timeout,
+    UploadMode
+)
+
+
+class AIManClientBase():
+    """Represents the shared (request building and response parsing) part of the service clients.
+    Warning: This class should not be instantiated directly"""
+
+    def __init__(
+            self,
+            credential: TokenCredential,
+            document_extractor: Optional[DocumentExtractor] = None,
+            document_cache: Optional[DocumentCache] = None,
+            response_cache: Optional[ResponseCache] = None,
+            model_registry: Optional[ModelRegistry] = None,
+            coalesce_routes: Iterable[Union[Route, str]] = (Route.GET_MODELS, Route.DATA_SOURCE),
+            retry_policy: Optional[RetryPolicy] = None,
+            rate_limiter: Optional[RateLimiter] = None,
+            circuit_breaker: Optional[CircuitBreaker] = None,
+            timeouts: Optional[Dict[str, Timeout]] = None,
+            serializer: Optional[JsonSerializer] = None,
+            upload_mode: Union[UploadMode, str] = UploadMode.BASE64,
+            instrumentation: Optional[Instrumentation] = None) -> None:
+        self.credential = credential
+        self.request_timeout = 200
+        self.connect_timeout = 10
+        self.timeouts = {} if timeouts is None else dict(timeouts)
+        self.document_extractor = document_extractor
+        self.document_cache = document_cache
+        self.response_cache = response_cache
+        self.model_registry = ModelRegistry() if model_registry is None else model_registry
+        self.coalesce_routes = tuple(
+            route.value if isinstance(route, Route) else route for route in coalesce_routes)
+        self.retry_policy = RetryPolicy() if retry_policy is None else retry_policy
+        self.rate_limiter = rate_limiter
+        self.circuit_breaker = circuit_breaker
+        self.serializer = get_serializer() if serializer is None else serializer
+        self.upload_mode = UploadMode(upload_mode)
+        self._multipart_supported: Optional[bool] = None
+        self.instrumentation = instrumentation
+        if instrumentation is not None and credential.instrumentation is None:
+            credential.instrumentation = instrumentation
+
+    def get_document_content(
+            self,
+            file_path: str,
+            loader: Loader = None,
+            pages: Optional[Iterable[int]] = None,
+            max_chars: Optional[int] = None,
+            usecols: Optional[List[Union[int, str]]] = None,
+            nrows: Optional[int] = None,
+            sheet_name: Optional[Union[int, str]] = None) -> Optional[str]:
+        """Parsing document content)
+
+        Args:
+            file_path (str): The absolute file path
+            loader (Loader, optional): Loader to use for parsing content. Defaults to None.
+            pages (Iterable[int], optional): Zero based page numbers to extract (PDF only). Defaults to None (all pages).
+            max_chars (int, optional): Stop extracting after this many characters (PDF, CSV and EXCEL). Defaults to None.
+            usecols (List[Union[int, str]], optional): Column names or indices to keep (CSV and EXCEL). Defaults to None.
+            nrows (int, optional): Max. number of data rows (CSV and EXCEL). Defaults to None.
+            sheet_name (Union[int, str], optional): Sheet name or index (EXCEL only). Defaults to None (first sheet).
+
+        Returns:
+            str: None or string
+        """
+        pages = None if pages is None else tuple(pages)
+        loader_options = {
+            "pages": pages,
+            "max_chars": max_chars,
+            "usecols": usecols,
+            "nrows": nrows,
+            "sheet_name": sheet_name
+        }
+        if self.document_cache is None:
+            return self._load_document(file_path, loader, loader_options)
+        key = self.document_cache.key(
+            file_path=file_path, loader=loader, kind=f"content|{loader_options}")
+        content = self.document_cache.get(key)
+        if content is None:
+            content = self._load_document(file_path, loader, loader_options)
+            self.document_cache.set(key, content)
+        return content
+
+    def _load_document(self, file_path: str, loader: Loader, loader_options: dict) -> Optional[str]:
+        """Warning: This method is private and should not be called manually
+           Loads a document (reporting the extraction time to the instrumentation)"""
+        if self.instrumentation is None:
+            return load_document(file_path=file_path, loader=loader, **loader_options)
+        result = ExtractionResult(file_path=file_path, loader=loader)
+        start = time.perf_counter()
+        try:
+            result.content = load_document(file_path=file_path, loader=loader, **loader_options)
+        except Exception as e:
+            result.error = e
+            raise
+        finally:
+            result.elapsed = time.perf_counter() - start
+            emit(self.instrumentation, "on_extraction", result)
+        return result.content
+
+    def _extract_documents(self, file_paths: List[str], loader: Loader, encode_base64: bool = False) -> Iterator[ExtractionResult]:
+        """Warning: This method is private and should not be called manually
+           Loads the documents from the document cache or parses them (in parallel if a
+           document extractor is set) and caches the results
+
+        Raises:
+            Exception: The first error raised while parsing a document
+
+        Yields:
+            Iterator[ExtractionResult]: The results (cache hits first, see ExtractionResult.index)
+        """
+        kind = "base64" if encode_base64 else "content"
+        keys = {}
+        missing = []
+        for index, file_path in enumerate(file_paths):
+            if self.document_cache is not None:
+                keys[index] = self.document_cache.key(file_path=file_path, loader=loader, kind=kind)
+                content = self.document_cache.get(keys[index])
+                if content is not None:
+                    yield ExtractionResult(file_path=file_path, loader=loader, content=content, index=index)
+                    continue
+            missing.append(index)
+        if not missing:
+            return
+
+        if self.document_extractor is not None:
+            results = self.document_extractor.extract(
+                [file_paths[index] for index in missing], loader=loader, encode_base64=encode_base64)
+        else:
+            results = (extract_document(file_paths[index], loader, encode_base64) for index in missing)
+        for position, result in enumerate(results):
+            emit(self.instrumentation, "on_extraction", result)
+            if result.error is not None:
+                raise result.error
+            result.index = missing[result.index if self.document_extractor is not None else position]
+            if self.document_cache is not None:
+                self.document_cache.set(keys[result.index], result.content)
+            yield result
+
+    def _build_prompt_request(self, kwargs: dict, options_cache: Optional[dict] = None) -> Tuple[str, dict]:
+        """Warning: This method is private and should not be called manually
+           Validates the prompt arguments and builds route and payload
+
+        Args:
+            kwargs (dict): The keyword arguments passed to prompt
+            options_cache (dict, optional): Serialized prompt options by object id (shared within a batch). Defaults to None.
+
+        Raises:
+            ValueError: If any of the required parameters are missing
+
+        Returns:
+            Tuple[str, dict]: route and prompt payload
+        """
+        if "model_id" in kwargs:
+            raise ValueError(
+                "Error: model_id as parameter is deprecated. Use the model_tag instead. Aborting....")
+
+        if "model_tag" not in kwargs:
+            raise ValueError(
+                "Error: missing required argument: model_tag")
+
+        if "query" not in kwargs:
+            raise ValueError(
+                "Error: missing required argument: query")
+
+        model_tag: int = self.model_registry.resolve(kwargs["model_tag"])
+        query = kwargs["query"]
+        loader = kwargs["loader"] if "loader" in kwargs else None
+        file_append_to_query = kwargs["file_append_to_query"] if "file_append_to_query" in kwargs else None
+        files_to_rag = kwargs["files_to_rag"] if "files_to_rag" in kwargs else None
+        prompt_options = kwargs["prompt_options"] if "prompt_options" in kwargs else None
+        context_packer = kwargs["context_packer"] if "context_packer" in kwargs else None
+        loader_options = {
+            name: kwargs[name] for name in ("pages", "max_chars", "usecols", "nrows", "sheet_name") if name in kwargs}
+
+        if loader is not None and file_append_to_query is None and files_to_rag is None:
+            raise ValueError(
+                "Missing Argument: file_append_to_query or files_to_rag")
+
+        if prompt_options is None:
+            prompt_options = PromptOptions()
+
+        attachments = []
+        if loader is not None and context_packer is not None and loader != Loader.IMAGE:
+            query, attachments = self._pack_documents(
+                context_packer=context_packer,
+                query=query,
+                loader=loader,
+                file_append_to_query=file_append_to_query,
+                files_to_rag=files_to_rag,
+                loader_options=loader_options,
+                prompt_options=prompt_options)
+
+        elif loader is not None:
+            if file_append_to_query is not None:
+                if loader == Loader.IMAGE:
+                    for result in self._extract_documents([file_append_to_query], loader=loader, encode_base64=True):
+                        attachments.append(self._build_attachment(result.file_path, result.content))
+                else:
+                    doc_content = self.get_document_content(
+                        file_path=file_append_to_query, loader=loader, **loader_options)
+                    query += f" {doc_content}"
+
+            if files_to_rag is not None:
+                attachments.extend(self._build_rag_attachments(files_to_rag, loader))
+
+        prompt = Prompt(prompt=query, stream=kwargs["stream"] if "stream" in kwargs else False)
+        prompt_dict = prompt.to_dict()
+        if options_cache is None:
+            prompt_option_dict = prompt_options.to_dict()
+        else:
+            prompt_option_dict = options_cache.get(id(prompt_options))
+            if prompt_option_dict is None:
+                prompt_option_dict = prompt_options.to_dict()
+                options_cache[id(prompt_options)] = prompt_option_dict
+        prompt_dict['options'] = prompt_option_dict
+        if len(attachments) > 0:
+            prompt_dict['attachments'] = attachments
+
+        prompt_dict['raw'] = prompt_options.raw
+        prompt_dict['keepContext'] = prompt_options.keep_context
+
+        route = Route.PROMPT.value.replace("model_tag", f"{model_tag}")
+        return route, prompt_dict
+
+    def _build_template_request(
+            self,
+            template: PromptTemplate,
+            query: str,
+            files_to_rag: Optional[List[str]] = None,
+            loader: Optional[Loader] = None,
+            payload: bool = False) -> Tuple[str, Optional[dict], Optional[bytes]]:
+        """Warning: This method is private and should not be called manually
+           Builds route and json body of a prompt from a template
+
+        Args:
+            template (PromptTemplate): The template
+            query (str): Query to prompt
+            files_to_rag (List[str], optional): Absolute paths of files to rag. Defaults to None.
+            loader (Loader, optional): Defaults to None (the loader of the template or inferred from the file extension).
+            payload (bool, optional): Build the payload instead of the body (e.g. for the response cache). Defaults to False.
+
+        Returns:
+            Tuple[str, Optional[dict], Optional[bytes]]: route, payload and body (one of them is None).
+                The payload is also built if the attachments are sent as multipart body
+        """
+        attachments = None
+        if files_to_rag:
+            if loader is None:
+                loader = self._loader_of(files_to_rag[0]) if template.loader is None else template.loader
+            attachments = self._build_rag_attachments(files_to_rag, loader)
+        if payload or (attachments and self._use_multipart()):
+            return template.route, template.render(query, attachments), None
+        return template.route, None, template.encode(query, attachments)
+
+    def _build_rag_attachments(self, files_to_rag: List[str], loader: Loader) -> List[dict]:
+        """Warning: This method is private and should not be called manually
+           Builds the attachments of the files to rag (in input order)"""
+        attachments = [None] * len(files_to_rag)
+        for result in self._extract_documents(files_to_rag, loader=loader, encode_base64=True):
+            attachments[result.index] = self._build_attachment(result.file_path, result.content)
+        return attachments
+
+    def _build_attachment(self, file_path: str, content_base64: str) -> dict:
+        """Warning: This method is private and should not be called manually
+           Builds a prompt attachment (with the size of the file in bytes)"""
+        filename, file_ext = Util.get_file_name_and_ext(file_path=file_path)
+        loader_and_mime_type = Util.get_loader_by_ext(file_ext=file_ext)
+        attachment = Attachment(
+            name=filename,
+            base64=content_base64,
+            size=Util.get_base64_size(content_base64),
+            mime_type="" if loader_and_mime_type is None else loader_and_mime_type[1])
+        return attachment.to_dict()
+
+    def _build_multipart_prompt(self, prompt_dict: dict) -> Optional[MultipartBody]:
+        """Warning: This method is private and should not be called manually
+           Builds a multipart body sending the attachments of a prompt as raw bytes
+
+        Args:
+            prompt_dict (dict): The prompt payload
+
+        Returns:
+            MultipartBody: None (the prompt has no attachments) or the body
+        """
+        if not prompt_dict.get("attachments"):
+            return None
+        body = MultipartBody(dumps=self.serializer.dumps)
+        attachments = []
+        for attachment in prompt_dict["attachments"]:
+            content = base64.b64decode(attachment["base64"])
+            attachment = {key: value for key, value in attachment.items() if key != "base64"}
+            attachment["file"] = body.add_bytes(content, attachment["name"], attachment["mime_type"])
+            attachment["size"] = len(content)
+            attachments.append(attachment)
+        return body.encode(dict(prompt_dict, attachments=attachments))
+
+    def _use_multipart(self, probe: bool = True) -> bool:
+        """Warning: This method is private and should not be called manually
+           True if files and attachments are sent as multipart body
+
+        Args:
+            probe (bool, optional): In auto mode, try multipart while the server support is unknown. Defaults to True.
+        """
+        if self.upload_mode == UploadMode.AUTO:
+            return self._multipart_supported is True or (probe and self._multipart_supported is None)
+        return self.upload_mode == UploadMode.MULTIPART
+
+    def _multipart_rejected(self, body, error: Exception) -> bool:
+        """Warning: This method is private and should not be called manually
+           In auto mode, records a rejected multipart body (400 or 415 while the server support is unknown)
+
+        Returns:
+            bool: True if the request has to be sent again as base64 json
+        """
+        if (self.upload_mode != UploadMode.AUTO or self._multipart_supported is not None
+                or not isinstance(body, MultipartBody) or not isinstance(error, AIManRequestError)
+                or error.status_code not in (400, 415)):
+            return False
+        self._multipart_supported = False
+        return True
+
+    def _multipart_accepted(self, body) -> None:
+        """Warning: This method is private and should not be called manually
+           In auto mode, records an accepted multipart body"""
+        if self.upload_mode == UploadMode.AUTO and isinstance(body, MultipartBody):
+            self._multipart_supported = True
+
+    def _lookup_response(self, route: str, data: dict, cache_bypass: bool = False, cache_refresh: bool = False) -> Tuple[Optional[str], Optional[dict]]:
+        """Warning: This method is private and should not be called manually
+           Looks a prompt up in the response cache
+
+        Args:
+            route (str): The api route
+            data (dict): The prompt payload
+            cache_bypass (bool, optional): Neither read nor write the cache. Defaults to False.
+            cache_refresh (bool, optional): Skip the lookup but cache the new response. Defaults to False.
+
+        Returns:
+            Tuple[Optional[str], Optional[dict]]: cache key (None if the response must not be cached) and cached response
+        """
+        if self.response_cache is None or cache_bypass or not self.response_cache.cacheable(data):
+            return None, None
+        key = self.response_cache.key(route, data, host=self.credential.api_host)
+        if cache_refresh:
+            return key, None
+        return key, self.response_cache.get(key)
+
+    def _store_response(self, key: Optional[str], response: dict, latency: float) -> None:
+        """Warning: This method is private and should not be called manually"""
+        if key is not None:
+            self.response_cache.set(key, response, latency=latency)
+
+    def _pack_documents(
+            self,
+            context_packer: ContextPacker,
+            query: str,
+            loader: Loader,
+            file_append_to_query: Optional[str],
+            files_to_rag: Optional[List[str]],
+            loader_options: dict,
+            prompt_options: PromptOptions) -> Tuple[str, List[dict]]:
+        """Warning: This method is private and should not be called manually
+           Packs the document contents into the context budget of the prompt
+
+        Returns:
+            Tuple[str, List[dict]]: The query (with the packed content of file_append_to_query) and the rag attachments
+        """
+        documents = []
+        if file_append_to_query is not None:
+            documents.append((
+                Util.get_file_name(file_path=file_append_to_query),
+                self.get_document_content(file_path=file_append_to_query, loader=loader, **loader_options)))
+        if files_to_rag is not None:
+            contents = [None] * len(files_to_rag)
+            for result in self._extract_documents(files_to_rag, loader=loader):
+                contents[result.index] = result.content
+            documents.extend(
+                (Util.get_file_name(file_path=file), content) for file, content in zip(files_to_rag, contents))
+
+        packed_documents = context_packer.pack(
+            query=query, documents=documents, prompt_options=prompt_options).documents
+        if file_append_to_query is not None:
+            query += f" {packed_documents[0].text}"
+            packed_documents = packed_documents[1:]
+
+        attachments = [
+            self._build_attachment(document.name, base64.b64encode(str.encode(document.text)).decode())
+            for document in packed_documents]
+        return query, attachments
+
+    def _to_prompt_job(self, job) -> PromptJob:
+        """Warning: This method is private and should not be called manually
+           Converts a batch entry (PromptJob or tuple) into a PromptJob and infers a missing loader
+
+        Raises:
+            ValueError: If the loader can not be inferred from the file extension
+
+        Returns:
+            PromptJob: The prompt job
+        """
+        if not isinstance(job, PromptJob):
+            job = PromptJob.from_tuple(tuple(job))
+        if job.files_to_rag and job.loader is None:
+            if job.template is not None and job.template.loader is not None:
+                job.loader = job.template.loader
+            else:
+                job.loader = self._loader_of(job.files_to_rag[0])
+        return job
+
+    def _loader_of(self, file_path: str) -> Loader:
+        """Warning: This method is private and should not be called manually
+           Infers the loader from the file extension
+
+        Raises:
+            ValueError: If the file extension is not supported
+        """
+        _, file_ext = Util.get_file_name_and_ext(file_path=file_path)
+        loader_and_mime_type = Util.get_loader_by_ext(file_ext=file_ext)
+        if loader_and_mime_type is None:
+            raise ValueError(
+                f"Error: Unsupported filetype:{file_ext} (file:{file_path})")
+        return loader_and_mime_type[0]
+
+    def _build_datasource_prompt_request(self, datasource_id: int, model_tag_id: int, query: str, prompt_options: PromptOptions = None) -> Tuple[str, dict]:
+        """Warning: This method is private and should not be called manually
+           Builds route and payload of a prompt on a datasource
+
+        Returns:
+            Tuple[str, dict]: route and prompt payload
+        """
+        if prompt_options is None:
+            prompt_options = PromptOptions()
+        prompt = Prompt(prompt=query, datasource_id=datasource_id)
+        prompt_dict = prompt.to_dict()
+        prompt_option_dict = prompt_options.to_dict()
+        prompt_dict['options'] = prompt_option_dict
+
+        route = f"{Route.PROMPT_WITH_DATASOURCE.value}/{self.model_registry.resolve(model_tag_id)}"
+        return route, prompt_dict
+
+    def _build_new_datasource_payload(self, name: str, summary: str, tags: List[str] = None, categories: List[str] = None) -> dict:
+        """Warning: This method is private and should not be called manually"""
+        return {
+            "name": name,
+            "summary": summary,
+            "tags": [] if tags is None else tags,
+            "categories": [] if categories is None else categories,
+            "assocContexts": [],
+            "media": []
+        }
+
+    def _append_documents(
+            self,
+            datasource: DataSource,
+            sources: List[str],
+            upload_body: Optional[Union[StreamedJsonBody, MultipartBody]] = None) -> DataSource:
+        """Warning: This method is private and should not be called manually
+           Appends the given files and urls as media entries to the datasource
+
+        Args:
+            datasource (DataSource): The datasource
+            sources (List[str]): list of file paths or urls
+            upload_body (Union[StreamedJsonBody, MultipartBody], optional): If set, the file contents
+                are not read but registered to be streamed by the body. Defaults to None.
+
+        Raises:
+            ValueError: If a file type is not supported
+
+        Returns:
+            DataSource: The datasource
+        """
+        encoded_files = {}
+        if upload_body is None:
+            file_paths = [
+                source.lower() for source in sources if not Util.validate_url(url=source.lower(), check_only=True)]
+            file_paths = [
+                file_path for file_path in file_paths
+                if Util.get_loader_by_ext(file_ext=Util.get_file_name_and_ext(file_path=file_path)[1]) is not None]
+            for result in self._extract_documents(file_paths, loader=Loader.BASE64_ONLY, encode_base64=True):
+                encoded_files[result.file_path] = result.content
+
+        for path_or_url in sources:
+            path_or_url = path_or_url.lower()
+            if Util.validate_url(url=path_or_url, check_only=True):
+                datasource.add_media(
+                    {"name": path_or_url, "mime_type": "text/x-uri"})
+                continue
+            filename, file_ext = Util.get_file_name_and_ext(
+                file_path=path_or_url)
+            loader, mime_type = Util.get_loader_by_ext(file_ext=file_ext)
+            if loader is None:
+                raise ValueError(
+                    f"Error: Unsupported filetype:{file_ext} (file:{filename})")
+
+            if isinstance(upload_body, MultipartBody):
+                datasource.add_media({
+                    "file": upload_body.add_file(file_path=path_or_url, filename=filename, mime_type=mime_type),
+                    "name": filename,
+                    "mime_type": mime_type,
+                    "size": os.path.getsize(path_or_url)})
+                continue
+            if upload_body is not None:
+                datasource.add_media({
+                    "base64": upload_body.file_placeholder(file_path=path_or_url),
+                    "name": filename,
+                    "mime_type": mime_type,
+                    "size": os.path.getsize(path_or_url)})
+                continue
+            content_base64 = encoded_files[path_or_url]
+            datasource.add_media({
+                "base64": content_base64,
+                "name": filename,
+                "mime_type": mime_type,
+                "size": Util.get_base64_size(content_base64)})
+        return datasource
+
+    def _build_update_payload(self, datasource: DataSource, delta: bool = False) -> dict:
+        """Warning: This method is private and should not be called manually
+
+        Args:
+            datasource (DataSource): The datasource to update
+            delta (bool, optional): Only include the fields changed since the datasource was fetched.
+                Unchanged media entries are referenced without their base64 body. Defaults to False.
+
+        Raises:
+            ValueError: If the media would be sent, but were not loaded (see DataSource.media_loaded)
+
+        Returns:
+            dict: The update payload (empty if nothing changed)
+        """
+        if self._needs_media(datasource, delta=delta):
+            # the media are replaced as a whole, a payload without the existing media deletes them
+            raise ValueError("Error: The media of the datasource were not loaded, fetch it with get_datasource_by_id")
+        data = {
+            "name": datasource.name,
+            "summary": datasource.summary,
+            "categories": datasource.categories,
+            "tags": datasource.tags,
+            "assocContexts": datasource.assoc_contexts,
+            "media": datasource.media}
+        if not delta or not datasource.is_tracked:
+            return data
+
+        changed_fields = datasource.changed_fields()
+        payload = {key: value for key, value in data.items() if key in changed_fields and key != "media"}
+        if "media" in changed_fields:
+            added = {id(media) for media in datasource.added_media()}
+            payload["media"] = [
+                media if id(media) in added else self._strip_media_body(media) for media in datasource.media]
+        return payload
+
+    def _parse_models(self, results: dict) -> List[AIModel]:
+        """Warning: This method is private and should not be called manually"""
+        models = AIModel.decode_many(results['Models'])
+        self.model_registry.load(models)
+        return models
+
+    def _parse_datasource(self, response: dict, include_media: bool = True) -> DataSource:
+        """Warning: This method is private and should not be called manually"""
+        # TODO THA 2024-12-13 Check if response has a valid datasource
+        source = response["datasource"]
+        data_source = DataSource.decode(source)
+        if not include_media and data_source.media is not None:
+            data_source.media = [self._strip_media_body(media) for media in data_source.media]
+            data_source.mark_clean()
+        return data_source
+
+    def _needs_media(self, datasource: DataSource, delta: bool = True) -> bool:
+        """Warning: This method is private and should not be called manually
+           Whether an update would send media which were never loaded (e.g. a datasource of the listing)"""
+        if datasource.media_loaded:
+            return False
+        return not delta or not datasource.is_tracked or "media" in datasource.changed_fields()
+
+    def _adds_media(self, datasource: DataSource) -> bool:
+        """Warning: This method is private and should not be called manually
+           Whether an update of the datasource uploads new media. Such a PUT is not idempotent
+           (a retry could add the files twice), so it is not retried"""
+        return bool(datasource.added_media())
+
+    def _strip_media_body(self, media: dict) -> dict:
+        """Warning: This method is private and should not be called manually
+           Returns a copy of the media entry without its base64 body"""
+        return {key: value for key, value in media.items() if key != "base64"}
+
+    def _parse_datasource_listing(self, response: dict) -> List[DataSource]:
+        """Warning: This method is private and should not be called manually
+           Builds (not hydrated) DataSource objects from the datasource listing"""
+        datasources = DataSource.decode_many(response["datasources"])
+        for datasource in datasources:
+            datasource.mark_media_unloaded()
+        return datasources
+
+    def _parse_new_datasource_id(self, response: dict) -> int:
+        """Warning: This method is private and should not be called manually"""
+        if "datasource" in response:
+            datasource = response["datasource"]
+            if "id" in datasource:
+                return datasource["id"]
+        return -1
+
+    def _timeout_for(self, method: Optional[str], timeout: Optional[Timeout] = None) -> Timeout:
+        """Warning: This method is private and should not be called manually
+           Get the timeout of a call: the per call timeout, the configured timeout of the method or the default"""
+        if timeout is not None:
+            return timeout
+        if method in self.timeouts:
+            return self.timeouts[method]
+        return Timeout(connect=self.connect_timeout, read=self.request_timeout)
+
+    def _coalesces(self, request_type: RequestType, route: str) -> bool:
+        """Warning: This method is private and should not be called manually
+           True if concurrent identical requests to the route share one request (GET only)"""
+        if request_type != RequestType.GET:
+            return False
+        return any(route == prefix or route.startswith(f"{prefix}/") for prefix in self.coalesce_routes)
+
+    def _build_headers(self, request_type: RequestType) -> dict:
+        """Warning: This method is private and should not be called manually"""
+        headers = {"accept": "application/json"}
+        headers.update(
+            {"Authorization": f"Bearer {self.credential.access.token}"})
+        if request_type != RequestType.GET:
+            headers.update({"Content-Type": "application/json"})
+        return headers
+
+    def _before_send(self, route: str) -> Tuple[float, bool]:
+        """Warning: This method is private and should not be called manually
+           Admits a request (circuit breaker) and takes a rate limit token.
+           The outcome has to be reported via _after_send, or _abandon_send if the request is not sent
+
+        Raises:
+            CircuitOpenError: If the circuit breaker is open
+
+        Returns:
+            Tuple[float, bool]: Seconds to wait before sending and whether the request is the circuit breaker probe
+        """
+        probe = False if self.circuit_breaker is None else self.circuit_breaker.before_call()
+        if self.rate_limiter is None:
+            return 0.0, probe
+        return self.rate_limiter.bucket(self._rate_limit_key(route)).reserve(), probe
+
+    def _abandon_send(self, probe: bool) -> None:
+        """Warning: This method is private and should not be called manually
+           Releases the admission of a request which failed before it was sent (rate limit deadline,
+           token refresh, serialization, cancellation), so the circuit breaker does not wait for its outcome"""
+        if probe and self.circuit_breaker is not None:
+            self.circuit_breaker.release()
+
+    def _after_send(self, route: str, status_code: Optional[int]) -> None:
+        """Warning: This method is private and should not be called manually
+           Feeds the outcome of a request (None on a transport error) to circuit breaker and rate limiter"""
+        if self.circuit_breaker is not None:
+            if status_code is None or status_code >= 500:
+                self.circuit_breaker.on_failure()
+            else:
+                self.circuit_breaker.on_success()
+        if self.rate_limiter is not None and status_code is not None:
+            bucket = self.rate_limiter.bucket(self._rate_limit_key(route))
+            if status_code == 429:
+                bucket.on_throttle()
+            elif status_code < 400:
+                bucket.on_success()
+
+    def _rate_limit_key(self, route: str) -> str:
+        """Warning: This method is private and should not be called manually"""
+        if self.rate_limiter.per_model_tag and route.startswith(f"{Route.PROMPT_WITH_DATASOURCE.value}/"):
+            return route
+        return self.credential.api_host
+
+    def _request_event(self, request_type: RequestType, route: str, attempt: int) -> Optional[RequestEvent]:
+        """Warning: This method is private and should not be called manually
+           Starts the metrics of a request attempt (None without instrumentation)"""
+        if self.instrumentation is None:
+            return None
+        model_tag = None
+        if route.startswith(f"{Route.PROMPT_WITH_DATASOURCE.value}/"):
+            segment = route[len(Route.PROMPT_WITH_DATASOURCE.value) + 1:].split("/", 1)[0]
+            model_tag = int(segment) if segment.isdigit() else None
+        return RequestEvent(
+            method=request_type.name, route=route, model_tag=model_tag, attempt=attempt, started_at=time.time())
+
+    def _emit_request(self, event: Optional[RequestEvent], start: float, error: Optional[Exception] = None) -> None:
+        """Warning: This method is private and should not be called manually
+           Finishes the metrics of a request attempt (started at perf_counter start) and emits them"""
+        if event is None:
+            return
+        event.latency = time.perf_counter() - start
+        event.error = error
+        emit(self.instrumentation, "on_request", event)
+
+    @staticmethod
+    def _capped_by_deadline(deadline: Optional[Deadline], timeout: Timeout, bounded: Timeout) -> bool:
+        """Warning: This method is private and should not be called manually
+           Whether a timeout of an attempt fired because the deadline capped it (bounded is the timeout of the attempt)"""
+        if deadline is None:
+            return False
+        return deadline.expired or (bounded.connect, bounded.read) != (timeout.connect, timeout.read)
+
+    def _raise_for_status(self, status_code: int, reason: str, retry_after: Optional[float] = None) -> None:
+        """Warning: This method is private and should not be called manually
+
+        Raises:
+            AIManRequestError: If the status code is not a success code (a RuntimeError)
+        """
+        if status_code not in [200, 201, 202]:
+            raise AIManRequestError(status_code, reason, retry_after=retry_after)
+
+
+__all__ = [
+    "AIManClientBase"
+]
@@ -0,0 +1,132 @@
+"""Module providing streamed prompt responses"""
+from typing import (
+    AsyncIterator,
+    Callable,
+    Iterator,
+    List,
+    Optional
+)
+from brandcompete.core.serialization import JsonSerializer, get_serializer
+
+
+class PromptStreamBase():
+    """Represents the transport independent part of a streamed prompt response.
+    Warning: This class should not be instantiated directly"""
+
+    def __init__(self, serializer: Optional[JsonSerializer] = None) -> None:
+        self._serializer = get_serializer() if serializer is None else serializer
+        self._parts: List[str] = []
+        self._last_chunk: dict = {}
+        self.message_content: Optional[dict] = None
+
+    @property
+    def text(self) -> str:
+        """The text received so far"""
+        return "".join(self._parts)
+
+    def _consume_line(self, line: bytes) -> Optional[str]:
+        """Warning: This method is private and should not be called manually
+           Parses one line of the stream (NDJSON or server sent event) into a token
+
+        Args:
+            line (bytes): A line of the response body
+
+        Returns:
+            Optional[str]: The token or None if the line does not carry one
+        """
+        line = line.strip()
+        if line.startswith(b"data:"):
+            line = line[5:].strip()
+        if not line or line == b"[DONE]":
+            return None
+        chunk = self._serializer.loads(line)
+        if isinstance(chunk, dict) and "messageContent" in chunk:
+            chunk = chunk["messageContent"]["data"]
+        if isinstance(chunk, str):
+            token = chunk
+            chunk = {}
+        elif "response" in chunk:
+            token = chunk["response"]
+        elif "message" in chunk and isinstance(chunk["message"], dict):
+            token = chunk["message"].get("content", "")
+        else:
+            token = chunk.get("content", "")
+        self._last_chunk = chunk
+        if token:
+            self._parts.append(token)
+        return token or None
+
+    def _finish(self) -> None:
+        """Warning: This method is private and should not be called manually
+           Aggregates the received tokens into the final message content"""
+        message_content = dict(self._last_chunk)
+        message_content["response"] = self.text
+        self.message_content = message_content
+
+
+class PromptStream(PromptStreamBase):
+    """Represents a streamed prompt response. Iterating yields the tokens as they arrive,
+    afterwards message_content holds the aggregated response"""
+
+    def __init__(self, response, serializer: Optional[JsonSerializer] = None) -> None:
+        super().__init__(serializer)
+        self._response = response
+
+    def __iter__(self) -> Iterator[str]:
+        try:
+            for line in self._response.iter_lines(chunk_size=None):
+                token = self._consume_line(line)
+                if token is not None:
+                    yield token
+            self._finish()
+        finally:
+            self.close()
+
+    def __enter__(self) -> "PromptStream":
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback) -> None:
+        self.close()
+
+    def close(self) -> None:
+        """Close the underlying response (returns the connection to the pool)"""
+        self._response.close()
+
+
+class AsyncPromptStream(PromptStreamBase):
+    """Represents a streamed prompt response of the async client. Iterating (async for) yields the
+    tokens as they arrive, afterwards message_content holds the aggregated response"""
+
+    def __init__(self, response, on_close: Optional[Callable[[], None]] = None, serializer: Optional[JsonSerializer] = None) -> None:
+        super().__init__(serializer)
+        self._response = response
+        self._on_close = on_close
+
+    async def __aiter__(self) -> AsyncIterator[str]:
+        try:
+            async for line in self._response.content:
+                token = self._consume_line(line)
+                if token is not None:
+                    yield token
+            self._finish()
+        finally:
+            self.close()
+
+    async def __aenter__(self) -> "AsyncPromptStream":
+        return self
+
+    async def __aexit__(self, exc_type, exc_value, traceback) -> None:
+        self.close()
+
+    def close(self) -> None:
+        """Release the underlying response (returns the connection to the pool)"""
+        self._response.release()
+        if self._on_close is not None:
+            self._on_close()
+            self._on_close = None
+
+
+__all__ = [
+    "PromptStream",
+    "AsyncPromptStream"
+]
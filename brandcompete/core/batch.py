@@ -0,0 +1,61 @@
+"""Module providing the jobs and results of prompt batches (see AIManServiceClient.prompt_many)"""
+from dataclasses import dataclass
+from typing import (
+    List,
+    Optional
+)
+from brandcompete.core.classes import Loader, PromptOptions
+from brandcompete.core.templates import PromptTemplate
+
+
+@dataclass
+class PromptJob:
+    """Represents a single prompt of a batch (with a template, model_tag and prompt_options are ignored)"""
+    model_tag: int = 0
+    query: str = ""
+    prompt_options: Optional[PromptOptions] = None
+    files_to_rag: Optional[List[str]] = None
+    loader: Optional[Loader] = None
+    template: Optional[PromptTemplate] = None
+
+    def to_kwargs(self) -> dict:
+        """Parsing a PromptJob Instance to the keyword arguments of a prompt"""
+        kwargs = {"model_tag": self.model_tag, "query": self.query}
+        if self.prompt_options is not None:
+            kwargs["prompt_options"] = self.prompt_options
+        if self.files_to_rag:
+            kwargs["files_to_rag"] = self.files_to_rag
+        if self.loader is not None:
+            kwargs["loader"] = self.loader
+        return kwargs
+
+    @classmethod
+    def from_tuple(cls, values: tuple):
+        """Parsing a (model_tag, query, prompt_options, files_to_rag) tuple to a PromptJob Instance"""
+        job = cls()
+        job.model_tag = values[0]
+        job.query = values[1]
+        job.prompt_options = None if len(values) < 3 else values[2]
+        job.files_to_rag = None if len(values) < 4 else values[3]
+        job.loader = None if len(values) < 5 else values[4]
+        return job
+
+
+@dataclass
+class PromptResult:
+    """Represents the outcome of a single prompt of a batch"""
+    index: int = -1
+    job: Optional[PromptJob] = None
+    response: Optional[dict] = None
+    error: Optional[Exception] = None
+
+    @property
+    def ok(self) -> bool:
+        """Whether the prompt was successful"""
+        return self.error is None
+
+
+__all__ = [
+    "PromptJob",
+    "PromptResult"
+]
@@ -0,0 +1,161 @@
+"""Module providing a content addressed cache for extracted documents"""
+import hashlib
+import os
+import threading
+from collections import OrderedDict
+from typing import (
+    Optional,
+    Union
+)
+from brandcompete.core.classes import CacheStats, Loader
+
+CacheValue = Union[str, bytes]
+
+
+class DocumentCache:
+    """Represents a two level (in-memory + optional on-disk) LRU cache for extracted
+    document text and base64 payloads, keyed by file identity and loader"""
+
+    def __init__(
+            self,
+            max_memory_bytes: int = 64 * 1024 * 1024,
+            directory: Optional[str] = None,
+            max_disk_bytes: int = 1024 * 1024 * 1024,
+            hash_content: bool = False) -> None:
+        """Create a document cache
+
+        Args:
+            max_memory_bytes (int, optional): Size limit of the in-memory level. Defaults to 64 MiB.
+            directory (str, optional): Directory of the on-disk level. Defaults to None (memory only).
+            max_disk_bytes (int, optional): Size limit of the on-disk level. Defaults to 1 GiB.
+            hash_content (bool, optional): Key by a hash of the file content instead of
+                path, modification time and size. Defaults to False.
+        """
+        self.max_memory_bytes = max_memory_bytes
+        self.directory = directory
+        self.max_disk_bytes = max_disk_bytes
+        self.hash_content = hash_content
+        self.stats = CacheStats()
+        self._memory: "OrderedDict[str, CacheValue]" = OrderedDict()
+        self._disk: "OrderedDict[str, int]" = OrderedDict()
+        self._lock = threading.Lock()
+        if directory is not None:
+            os.makedirs(directory, exist_ok=True)
+            entries = []
+            for name in os.listdir(directory):
+                if name.endswith(".tmp"):
+                    continue
+                stat = os.stat(os.path.join(directory, name))
+                entries.append((stat.st_mtime, name, stat.st_size))
+            for _, name, size in sorted(entries):
+                self._disk[name] = size
+                self.stats.disk_bytes += size
+
+    def key(self, file_path: str, loader: Loader, kind: str = "content") -> str:
+        """Build the cache key of a document
+
+        Args:
+            file_path (str): The file path
+            loader (Loader): The loader used to parse the file
+            kind (str, optional): The kind of the cached value (content or base64). Defaults to "content".
+
+        Returns:
+            str: The cache key
+        """
+        digest = hashlib.sha256()
+        if self.hash_content:
+            with open(file_path, "rb") as file:
+                for chunk in iter(lambda: file.read(1024 * 1024), b""):
+                    digest.update(chunk)
+        else:
+            stat = os.stat(file_path)
+            digest.update(f"{os.path.abspath(file_path)}|{stat.st_mtime_ns}|{stat.st_size}".encode())
+        digest.update(f"|{None if loader is None else loader.value}|{kind}".encode())
+        return digest.hexdigest()
+
+    def get(self, key: str) -> Optional[CacheValue]:
+        """Get a cached value (None on a miss)"""
+        with self._lock:
+            if key in self._memory:
+                self._memory.move_to_end(key)
+                self.stats.hits += 1
+                return self._memory[key]
+            if key not in self._disk:
+                self.stats.misses += 1
+                return None
+            self._disk.move_to_end(key)
+        path = os.path.join(self.directory, key)
+        try:
+            with open(path, "rb") as file:
+                raw = file.read()
+            os.utime(path)
+        except OSError:
+            with self._lock:
+                self.stats.misses += 1
+            return None
+        value = raw[1:].decode('utf-8') if raw[:1] == b"s" else raw[1:]
+        with self._lock:
+            self.stats.hits += 1
+            self.stats.disk_hits += 1
+            self._store_in_memory(key, value)
+        return value
+
+    def set(self, key: str, value: CacheValue) -> None:
+        """Cache a value (str or bytes)"""
+        if value is None:
+            return
+        with self._lock:
+            self._store_in_memory(key, value)
+        if self.directory is None:
+            return
+        raw = b"s" + value.encode('utf-8') if isinstance(value, str) else b"b" + value
+        if len(raw) > self.max_disk_bytes:
+            return
+        path = os.path.join(self.directory, key)
+        with open(f"{path}.{threading.get_ident()}.tmp", "wb") as file:
+            file.write(raw)
+        os.replace(f"{path}.{threading.get_ident()}.tmp", path)
+        with self._lock:
+            self.stats.disk_bytes += len(raw) - self._disk.pop(key, 0)
+            self._disk[key] = len(raw)
+            while self.stats.disk_bytes > self.max_disk_bytes and self._disk:
+                old_key, size = self._disk.popitem(last=False)
+                self.stats.disk_bytes -= size
+                self.stats.evictions += 1
+                try:
+                    os.remove(os.path.join(self.directory, old_key))
+                except OSError:
+                    pass
+
+    def clear(self) -> None:
+        """Remove all cached values (both levels)"""
+        with self._lock:
+            self._memory.clear()
+            self.stats.memory_bytes = 0
+            if self.directory is not None:
+                for key in self._disk:
+                    try:
+                        os.remove(os.path.join(self.directory, key))
+                    except OSError:
+                        pass
+            self._disk.clear()
+            self.stats.disk_bytes = 0
+
+    def _store_in_memory(self, key: str, value: CacheValue) -> None:
+        """Warning: This method is private and should not be called manually (lock must be held)"""
+        size = len(value)
+        if size > self.max_memory_bytes:
+            return
+        if key in self._memory:
+            self.stats.memory_bytes -= len(self._memory.pop(key))
+        self._memory[key] = value
+        self.stats.memory_bytes += size
+        while self.stats.memory_bytes > self.max_memory_bytes:
+            _, old_value = self._memory.popitem(last=False)
+            self.stats.memory_bytes -= len(old_value)
+            self.stats.evictions += 1
+
+
+__all__ = [
+    "DocumentCache"
+]
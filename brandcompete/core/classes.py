@@ -1,12 +1,24 @@
 """Module providing different dataclasses"""
-from dataclasses import dataclass
+from dataclasses import dataclass, field
 from enum import Enum
 from typing import List, Optional
-
-
+from brandcompete.core.codecs import KEEP, Codable, codec, slotted
+
+
+@codec((
+    ("id",                      "id",                   0),
+    ("uuid",                    "uuId",                 ""),
+    ("name",                    "name",                 ""),
+    ("short_description",       "shortDescription",     ""),
+    ("long_description",        "longDescription",      ""),
+    ("default_model_tag_id",    "defaultModelTagId",    0),
+    ("amount_of_pulls",         "amountOfPulls",        ""),
+    ("amount_of_tags",          "amountOfTags",         0),
+    ("required_memory",         "requiredMemory",       ""),
+    ("size",                    "size",                 0)))
+@slotted
 @dataclass
-class AIModel:
-
+class AIModel(Codable):
     """Represents a AIModel instance"""
     id: int = -1
     uuid: str = ""
@@ -20,37 +32,6 @@ class AIModel:
     size: int = -1
 
 
-    def to_dict(self):
-        """Parsing a AIModel Instance to a dict"""
-        return {
-            "id": self.id,
-            "uuId": self.uuid,
-            "name": self.name,
-            "shortDescription": self.short_description,
-            "longDescription": self.long_description,
-            "defaultModelTagId": self.default_model_tag_id,
-            "amountOfPulls": self.amount_of_pulls,
-            "amountOfTags": self.amount_of_tags,
-            "requiredMemory": self.required_memory,
-            "size": self.size
-        }
-
-
-    def from_dict(self, values: dict):
-        """Parsing a dict to a AIModel Instance"""
-        self.id = 0 if "id" not in values else values["id"]
-        self.uuid = "" if "uuId" not in values else values["uuId"]
-        self.name = "" if "name" not in values else values["name"]
-        self.short_description = "" if "shortDescription" not in values else values["shortDescription"]
-        self.long_description = "" if "longDescription" not in values else values["longDescription"]
-        self.default_model_tag_id = 0 if "defaultModelTagId" not in values else values["defaultModelTagId"]
-        self.amount_of_pulls = "" if "amountOfPulls" not in values else values["amountOfPulls"]
-        self.amount_of_tags = 0 if "amountOfTags" not in values else values["amountOfTags"]
-        self.required_memory = "" if "requiredMemory" not in values else values["requiredMemory"]
-        self.size = 0 if "size" not in values else values["size"]
-        return self
-
-
 @dataclass
 class Project:
     """Represents an aiman project"""
@@ -86,24 +67,41 @@ class Query:
     id: int
     uuid: str
 
-    @classmethod
-    def to_dict(cls):
-        """Parsing a Projcet Instance to a dict"""
+    def to_dict(self):
+        """Parsing a Query Instance to a dict"""
         return {
-            "id":   cls.id,
-            "uuId": cls.uuid
+            "id":   self.id,
+            "uuId": self.uuid
         }
 
     @classmethod
     def from_dict(cls, values: dict):
-        """Parsing a dict to a Projcet Instance"""
-        cls.id = values["id"]
-        cls.uuid = values["uuId"]
-        return cls
-
-
+        """Parsing a dict to a new Query Instance"""
+        return cls(id=values["id"], uuid=values["uuId"])
+
+
+@codec((
+    ("mirostat",        "mirostat",         0),
+    ("mirostat_eta",    "mirostat_eta",     100),
+    ("mirostat_tau",    "mirostat_tau",     5),
+    ("num_ctx",         "num_ctx",          4096),
+    ("num_gqa",         "num_gqa",          8),
+    ("num_gpu",         "num_gpu",          0),
+    ("num_thread",      "num_thread",       0),
+    ("repeat_last_n",   "repeat_last_n",    64),
+    ("repeat_penalty",  "repeat_penalty",   1.1),
+    ("temperature",     "temperature",      0.8),
+    ("seed",            "seed",             0),
+    ("stop",            "stop",             None),
+    ("tfs_z",           "tfs_z",            1),
+    ("num_predict",     "num_predict",      2048),
+    ("top_k",           "top_k",            40),
+    ("top_p",           "top_p",            0.9),
+    ("raw",             "raw",              False),
+    ("keep_context",    "keep_context",     True)))
+@slotted
 @dataclass
-class PromptOptions:
+class PromptOptions(Codable):
     """Represents prompt options"""
     mirostat: int = 0
     mirostat_eta: float = 0.1
@@ -116,7 +114,7 @@ class PromptOptions:
     repeat_penalty: float = 1.1
     temperature: float = 0.8
     seed: int = 0
-    stop = None
+    stop: Optional[List[str]] = None
     tfs_z: int = 1
     num_predict: int = 2048
     top_k: int = 40
@@ -124,54 +122,23 @@ class PromptOptions:
     raw: bool = False
     keep_context: bool = True
 
-    def to_dict(self):
-        """Parsing a Projcet Instance to a dict"""
-        return {
-            "mirostat":         self.mirostat,
-            "mirostat_eta":     self.mirostat_eta,
-            "mirostat_tau":     self.mirostat_tau,
-            "num_ctx":          self.num_ctx,
-            "num_gqa":          self.num_gqa,
-            "num_gpu":          self.num_gpu,
-            "num_thread":       self.num_thread,
-            "repeat_last_n":    self.repeat_last_n,
-            "repeat_penalty":   self.repeat_penalty,
-            "temperature":      self.temperature,
-            "seed":             self.seed,
-            "stop":             self.stop,
-            "tfs_z":            self.tfs_z,
-            "num_predict":      self.num_predict,
-            "top_k":            self.top_k,
-            "top_p":            self.top_p,
-            "raw":              self.raw,
-            "keep_context":     self.keep_context
-        }
-
-    def from_dict(self, values: dict):
-        """Parsing a dict to a Projcet Instance"""
-        self.mirostat = 0 if "mirostat" not in values else values["mirostat"]
-        self.mirostat_eta = 100 if "mirostat_eta" not in values else values["mirostat_eta"]
-        self.mirostat_tau = 5 if "mirostat_tau" not in values else values["mirostat_tau"]
-        self.num_ctx = 4096 if "num_ctx" not in values else values["num_ctx"]
-        self.num_gqa = 8 if "num_gqa" not in values else values["num_gqa"]
-        self.num_gpu = 0 if "num_gpu" not in values else values["num_gpu"]
-        self.num_thread = 0 if "num_thread" not in values else values["num_thread"]
-        self.repeat_last_n = 64 if "repeat_last_n" not in values else values["repeat_last_n"]
-        self.repeat_penalty = 1.1 if "repeat_penalty" not in values else values["repeat_penalty"]
-        self.temperature = 0.8 if "temperature" not in values else values["temperature"]
-        self.seed = 0 if "seed" not in values else values["seed"]
-        self.stop = None if "stop" not in values else values["stop"]
-        self.tfs_z = 1 if "tfs_z" not in values else values["tfs_z"]
-        self.num_predict = 2048 if "num_predict" not in values else values["num_predict"]
-        self.top_k = 40 if "top_k" not in values else values["top_k"]
-        self.top_p = 0.9 if "top_p" not in values else values["top_p"]
-        self.raw = False if "raw" not in values else values["raw"]
-        self.keep_context = True if "keep_context" not in values else values["keep_context"]
-        return self
-
 
+@codec((
+    ("prompt",          "prompt",       ""),
+    ("model_tag_id",    "modelTagId",   0),
+    ("raw",             "raw",          False),
+    ("stream",          "stream",       False),
+    ("project_id",      "projectId",    False),
+    ("project_tab_id",  "projectTabId", 0),
+    ("user_id",         "userId",       0),
+    ("verbose",         "verbose",      True),
+    ("attachments",     "attachments",  None),
+    ("keep_context",    "keepContext",  True),
+    ("keep_alive",      "keepAlive",    "5m"),
+    ("datasource_id",   "datasourceId", 0)))
+@slotted
 @dataclass
-class Prompt:
+class Prompt(Codable):
     """Represents a prompt"""
     prompt: str = ""
     model_tag_id: int = 0
@@ -186,42 +153,21 @@ class Prompt:
     keep_alive: str = "5m"
     datasource_id: int = 0
 
-    def to_dict(self):
-        """Parsing a Prompt Instance to a dict"""
-        return {
-            "prompt":       self.prompt,
-            "modelTagId":   self.model_tag_id,
-            "raw":          self.raw,
-            "stream":       self.stream,
-            "projectId":    self.project_id,
-            "projectTabId": self.project_tab_id,
-            "userId":       self.user_id,
-            "verbose":      self.verbose,
-            "attachments":  self.attachments,
-            "keepContext":  self.keep_context,
-            "keepAlive":    self.keep_alive,
-            "datasourceId": self.datasource_id
-        }
-
-    def from_dict(self, values: dict):
-        """Parsing a dict to a Prompt Instance"""
-        self.prompt = "" if "prompt" not in values else values["prompt"]
-        self.model_tag_id = 0 if "modelTagId" not in values else values["modelTagId"]
-        self.raw = False if "raw" not in values else values["raw"]
-        self.stream = False if "stream" not in values else values["stream"]
-        self.project_id = False if "projectId" not in values else values["projectId"]
-        self.project_tab_id = 0 if "projectTabId" not in values else values["projectTabId"]
-        self.user_id = 0 if "userId" not in values else values["userId"]
-        self.verbose = True if "verbose" not in values else values["verbose"]
-        self.attachments = None if "attachments" not in values else values["attachments"]
-        self.keep_context = True if "keepContext" not in values else values["keepContext"]
-        self.keep_alive = "5m" if "keepAlive" not in values else values["keepAlive"]
-        self.datasource_id = 0 if "datasourceId" not in values else values["datasourceId"]
-        return self
-
 
+@codec((
+    ("name",            "name",             ""),
+    ("summary",         "summary",          ""),
+    ("id",              "id",               -1),
+    ("categories",      "categories",       None),
+    ("tags",            "tags",             None),
+    ("assoc_contexts",  "assocContexts",    None),
+    ("media",           "media",            None),
+    ("status",          "status",           -1),
+    ("media_count",     "mediaCount",       -1),
+    ("owner_id",        "ownerId",          -1)), on_decode="mark_clean")
+@slotted
 @dataclass
-class DataSource:
+class DataSource(Codable):
     """Represents a prompt datasource (raging)"""
     name: str = ""
     summary: str = ""
@@ -233,35 +179,98 @@ class DataSource:
     status: Optional[int] = -1
     media_count: Optional[int] = -1
     owner_id: Optional[int] = -1
+    _snapshot: Optional[dict] = field(default=None, init=False, repr=False, compare=False)
+    _media_loaded: bool = field(default=True, init=False, repr=False, compare=False)
 
-    def to_dict(self):
-        """Parsing a DataSource Instance to a dict"""
-        return {
+    def mark_clean(self) -> None:
+        """Remember the current state as the last known state of the api (used to track changes)"""
+        self._snapshot = {
+            "name":             self.name,
+            "summary":          self.summary,
+            "categories":       None if self.categories is None else list(self.categories),
+            "tags":             None if self.tags is None else list(self.tags),
+            "assocContexts":    None if self.assoc_contexts is None else list(self.assoc_contexts),
+            "media":            None if self.media is None else list(self.media)
+        }
+
+    @property
+    def is_tracked(self) -> bool:
+        """Whether the datasource knows its last api state (fetched or updated)"""
+        return self._snapshot is not None
+
+    @property
+    def media_loaded(self) -> bool:
+        """Whether the media list holds the media of the api (False for a datasource of the listing)"""
+        return self._media_loaded
+
+    def mark_media_unloaded(self) -> None:
+        """Remember that the media of the datasource were not loaded (media is not the api state)"""
+        self._media_loaded = False
+
+    def load_media(self, media: Optional[list]) -> None:
+        """Set the media loaded from the api as last known state, keeping the entries added since
+
+        Args:
+            media (list, optional): The media entries of the api
+        """
+        added = self.added_media()
+        self.media = list(media or [])
+        if self._snapshot is not None:
+            self._snapshot["media"] = list(self.media)
+        self.media.extend(added)
+        self._media_loaded = True
+
+    def add_media(self, media: dict) -> None:
+        """Add a media entry (e.g. {"name", "mime_type", "base64", "size"})"""
+        if self.media is None:
+            self.media = []
+        self.media.append(media)
+
+    def remove_media(self, media_id_or_name) -> bool:
+        """Remove all media entries with the given id or name
+
+        Args:
+            media_id_or_name (int | str): The media id or name
+
+        Returns:
+            bool: Whether an entry was removed
+        """
+        if self.media is None:
+            return False
+        count = len(self.media)
+        self.media = [
+            media for media in self.media
+            if media.get("id") != media_id_or_name and media.get("name") != media_id_or_name]
+        return len(self.media) != count
+
+    def added_media(self) -> list:
+        """Media entries added since the datasource was fetched"""
+        known = set() if not self.is_tracked or self._snapshot["media"] is None else {
+            id(media) for media in self._snapshot["media"]}
+        return [media for media in (self.media or []) if id(media) not in known]
+
+    def removed_media(self) -> list:
+        """Media entries removed since the datasource was fetched"""
+        if not self.is_tracked or self._snapshot["media"] is None:
+            return []
+        current = {id(media) for media in (self.media or [])}
+        return [media for media in self._snapshot["media"] if id(media) not in current]
+
+    def changed_fields(self) -> List[str]:
+        """Api field names changed since the datasource was fetched (all fields if untracked)"""
+        current = {
             "name":             self.name,
             "summary":          self.summary,
-            "id":               self.categories,
             "categories":       self.categories,
             "tags":             self.tags,
-            "assocContexts":    self.assoc_contexts,
-            "media":            self.media,
-            "status":           self.status,
-            "mediaCount":       self.media_count,
-            "ownerId":          self.owner_id
+            "assocContexts":    self.assoc_contexts
         }
-
-    def from_dict(self, values: dict):
-        """Parsing a dict to a DataSource Instance"""
-        self.name = values["name"]
-        self.summary = values["summary"]
-        self.id = values["id"]
-        self.categories = values["categories"]
-        self.tags = values["tags"]
-        self.assoc_contexts = values["assocContexts"]
-        self.media = values["media"]
-        self.status = values["status"]
-        self.media_count = values["mediaCount"]
-        self.owner_id = values["ownerId"]
-        return self
+        if not self.is_tracked:
+            return list(current.keys()) + ["media"]
+        changed = [key for key, value in current.items() if value != self._snapshot[key]]
+        if self.added_media() or self.removed_media():
+            changed.append("media")
+        return changed
 
 
 @dataclass
@@ -279,36 +288,145 @@ class Media:
         return self
 
 
+@codec((
+    ("base64",      "base64",       KEEP),
+    ("name",        "name",         KEEP),
+    ("size",        "size",         KEEP),
+    ("mime_type",   "mime_type",    KEEP)))
+@slotted
 @dataclass
-class Attachment:
+class Attachment(Codable):
     """Represents an prompt attachment"""
     name: str = ""
     base64: str = ""
     size: int = 0
     mime_type: str = ""
 
-    def to_dict(self):
-        """Parsing a Media Instance to a dict"""
-        return {
-            "base64":   self.base64,
-            "name":     self.name,
-            "size":     self.size,
-            "mime_type":self.mime_type
-        }
 
-    def from_dict(self, values: dict):
-        """Parsing a dict to a Media Instance"""
-        if values == {}:
+@dataclass
+class ExtractionResult:
+    """Represents the outcome of a document extraction"""
+    file_path: str = ""
+    loader: Optional["Loader"] = None
+    content: Optional[object] = None
+    error: Optional[Exception] = None
+    elapsed: float = 0.0
+    index: int = -1
+
+    @property
+    def ok(self) -> bool:
+        """Whether the extraction was successful"""
+        return self.error is None
+
+
+@dataclass
+class CacheStats:
+    """Represents the statistics of a cache"""
+    hits: int = 0
+    misses: int = 0
+    disk_hits: int = 0
+    evictions: int = 0
+    memory_bytes: int = 0
+    disk_bytes: int = 0
+
+    @property
+    def hit_rate(self) -> float:
+        """Share of lookups served from the cache"""
+        lookups = self.hits + self.misses
+        return 0.0 if lookups == 0 else self.hits / lookups
+
+
+@dataclass
+class ResponseCacheStats:
+    """Represents the statistics of a response cache"""
+    hits: int = 0
+    misses: int = 0
+    saved_seconds: float = 0.0
+
+    @property
+    def hit_rate(self) -> float:
+        """Share of lookups served from the cache"""
+        lookups = self.hits + self.misses
+        return 0.0 if lookups == 0 else self.hits / lookups
+
+
+@dataclass
+class RequestEvent:
+    """Represents the metrics of a single request attempt (see Instrumentation).
+    Durations are in seconds (queue_wait: rate limit and concurrency limit, time_to_first_byte and
+    latency: from the call of the attempt), started_at is unix time, attempt is zero based (retries before it)"""
+    method: str = ""
+    route: str = ""
+    model_tag: Optional[int] = None
+    status_code: Optional[int] = None
+    attempt: int = 0
+    request_bytes: int = 0
+    response_bytes: int = 0
+    queue_wait: float = 0.0
+    time_to_first_byte: Optional[float] = None
+    latency: float = 0.0
+    started_at: float = 0.0
+    error: Optional[Exception] = None
+
+
+@dataclass
+class TokenEvent:
+    """Represents the metrics of a login or token refresh (see Instrumentation).
+    kind is "login" or "refresh", latency in seconds, started_at is unix time"""
+    kind: str = ""
+    status_code: Optional[int] = None
+    latency: float = 0.0
+    started_at: float = 0.0
+    error: Optional[Exception] = None
+
+
+@dataclass
+class PackedDocument:
+    """Represents the part of a document packed into the context of a prompt"""
+    name: str = ""
+    text: str = ""
+    tokens: int = 0
+    included_chunks: int = 0
+    total_chunks: int = 0
+
+    @property
+    def complete(self) -> bool:
+        """Whether the whole document was packed"""
+        return self.included_chunks == self.total_chunks
+
+
+@dataclass
+class PackResult:
+    """Represents the outcome of packing documents into the context budget of a prompt"""
+    documents: List[PackedDocument] = field(default_factory=list)
+    budget_tokens: int = 0
+    used_tokens: int = 0
+
+    @property
+    def dropped_chunks(self) -> int:
+        """Number of chunks left out because of the budget"""
+        return sum(document.total_chunks - document.included_chunks for document in self.documents)
+
+
+@dataclass
+class Timeout:
+    """Represents the timeouts of a request in seconds (None disables a limit).
+    connect limits establishing the connection, read the wait for the next bytes of the
+    response (a long generation which is still sending is not cut off) and total the whole request.
+    total is checked while the response body is read; until the response headers arrive the
+    connect and read timeouts (capped at the remaining time) apply"""
+    connect: Optional[float] = 10.0
+    read: Optional[float] = 200.0
+    total: Optional[float] = None
+
+    def bounded(self, seconds: Optional[float]) -> "Timeout":
+        """Get a copy with every limit capped at seconds (e.g. the remaining time of a deadline)"""
+        if seconds is None:
             return self
-        if "name" in values:
-            self.name = values["name"]
-        if "base64" in values:
-            self.base64 = values["base64"]
-        if "size" in values:
-            self.size = values["size"]
-        if "mime_type" in values:
-            self.mime_type = values["mime_type"]
-        return self
+        return Timeout(
+            connect=seconds if self.connect is None else min(self.connect, seconds),
+            read=seconds if self.read is None else min(self.read, seconds),
+            total=seconds if self.total is None else min(self.total, seconds))
 
 
 class Route(Enum):
@@ -339,12 +457,27 @@ class Loader(Enum):
     URL = "url"
     IMAGE = "img"
 
+class UploadMode(Enum):
+    """Enumeration of the transports of files and attachments"""
+    BASE64 = "base64"
+    MULTIPART = "multipart"
+    AUTO = "auto"
+
 
 __all__ = [
     "AIModel",
     "Project",
     "Query",
+    "ExtractionResult",
+    "CacheStats",
+    "ResponseCacheStats",
+    "RequestEvent",
+    "TokenEvent",
+    "Timeout",
+    "PackedDocument",
+    "PackResult",
     "Route",
     "Prompt",
-    "RequestType"
+    "RequestType",
+    "UploadMode"
 ]
@@ -0,0 +1,231 @@
+"""Module providing slotted dataclasses and their table driven dict codecs"""
+import functools
+import keyword
+from dataclasses import MISSING, fields, is_dataclass
+from typing import (
+    Any,
+    Callable,
+    Dict,
+    Iterable,
+    List,
+    Optional,
+    Sequence,
+    Tuple
+)
+
+
+class _Keep:
+    """Warning: This class is private and should not be instantiated manually"""
+
+    def __repr__(self) -> str:
+        return "KEEP"
+
+
+KEEP = _Keep()
+"""Default of a codec field which keeps the current value (from_dict) or the field default (decode)
+if the key is missing"""
+
+_SCALARS = (type(None), bool, int, float, str)
+
+
+def slotted(cls: type) -> type:
+    """Recreate a dataclass with __slots__ (no per instance __dict__), like dataclass(slots=True)
+    of Python 3.10+. Apply it on top of @dataclass
+
+    Args:
+        cls (type): The dataclass
+
+    Raises:
+        TypeError: If cls is no dataclass or already defines __slots__
+
+    Returns:
+        type: The slotted class
+    """
+    if not is_dataclass(cls) or "__slots__" in cls.__dict__:
+        raise TypeError(f"Error: {cls.__name__} has to be a dataclass without __slots__")
+    names = tuple(field.name for field in fields(cls))
+    namespace = dict(cls.__dict__)
+    namespace["__slots__"] = names
+    for name in names + ("__dict__", "__weakref__"):
+        # the defaults live on in the generated __init__
+        namespace.pop(name, None)
+    unset = {field.name: field.default for field in fields(cls) if not field.init and field.default is not MISSING}
+    if unset:
+        # __init__ leaves these to the class attribute, which the slot replaces
+        namespace["__init__"] = _init_unset(cls.__init__, unset)
+    slotted_cls = type(cls)(cls.__name__, cls.__bases__, namespace)
+    slotted_cls.__qualname__ = cls.__qualname__
+    return slotted_cls
+
+
+def _init_unset(init: Callable, defaults: Dict[str, Any]) -> Callable:
+    """Warning: This function is private and should not be called manually
+       Wraps a dataclass __init__ to set the defaults of the init=False fields"""
+    @functools.wraps(init)
+    def __init__(self, *args, **kwargs):
+        for name, value in defaults.items():
+            object.__setattr__(self, name, value)
+        init(self, *args, **kwargs)
+    return __init__
+
+
+class Codec:
+    """Represents the dict encoder and decoder of a dataclass, generated from a table of
+    (attribute, key, default) entries. The table is validated once; decoding is a single
+    dict lookup per field without branching"""
+
+    def __init__(self, cls: type, table: Sequence[Tuple[str, str, Any]], on_decode: Optional[str] = None) -> None:
+        """Create a codec
+
+        Args:
+            cls (type): The dataclass
+            table (Sequence[Tuple[str, str, Any]]): (attribute, api key, default if the key is missing) per field.
+                The default has to be a scalar (None, bool, int, float, str) or KEEP.
+            on_decode (str, optional): Name of a method called on every decoded instance. Defaults to None.
+
+        Raises:
+            ValueError: If the table does not match the dataclass
+        """
+        self.cls = cls
+        self.table = tuple(table)
+        self.on_decode = on_decode
+        self._validate()
+        self.decode: Callable[[dict], Any] = self._compile_decode()
+        self.update: Callable[[Any, dict], Any] = self._compile_update()
+        self.encode: Callable[[Any], dict] = self._compile_encode()
+
+    def decode_many(self, items: Iterable[dict]) -> List[Any]:
+        """Decode a list of dicts
+
+        Args:
+            items (Iterable[dict]): The dicts (e.g. a response listing)
+
+        Returns:
+            List[Any]: The instances
+        """
+        decode = self.decode
+        return [decode(values) for values in items]
+
+    def _validate(self) -> None:
+        """Warning: This method is private and should not be called manually"""
+        if not is_dataclass(self.cls):
+            raise ValueError(f"Error: {self.cls.__name__} is no dataclass")
+        defaults = {field.name: field.default for field in fields(self.cls)}
+        attributes = set()
+        keys = set()
+        for attribute, key, default in self.table:
+            if attribute not in defaults or keyword.iskeyword(attribute):
+                raise ValueError(f"Error: {attribute} is no field of {self.cls.__name__}")
+            if not isinstance(key, str):
+                raise ValueError(f"Error: Key of {attribute} has to be a str")
+            if attribute in attributes or key in keys:
+                raise ValueError(f"Error: Duplicate field {attribute} ({key}) in the codec of {self.cls.__name__}")
+            if default is not KEEP and type(default) not in _SCALARS:
+                raise ValueError(f"Error: Default of {attribute} has to be a scalar or KEEP")
+            attributes.add(attribute)
+            keys.add(key)
+        for attribute, default in defaults.items():
+            if default is MISSING and (attribute not in attributes or self._field_default(attribute) is KEEP):
+                raise ValueError(f"Error: Field {attribute} of {self.cls.__name__} needs a default (no factory)")
+        if hasattr(self.cls, "__post_init__"):
+            raise ValueError(f"Error: {self.cls.__name__} defines __post_init__, use on_decode instead")
+        if self.on_decode is not None and not callable(getattr(self.cls, self.on_decode, None)):
+            raise ValueError(f"Error: {self.cls.__name__} has no method {self.on_decode}")
+
+    def _field_default(self, attribute: str) -> Any:
+        """Warning: This method is private and should not be called manually"""
+        return next(default for name, _, default in self.table if name == attribute)
+
+    def _compile(self, name: str, lines: List[str]) -> Callable:
+        """Warning: This method is private and should not be called manually
+           Compiles a generated function (the defaults are passed as globals _d<index> and _f<name>)"""
+        namespace: Dict[str, Any] = {"_cls": self.cls, "_new": object.__new__}
+        namespace.update({f"_d{index}": entry[2] for index, entry in enumerate(self.table)})
+        namespace.update({f"_f_{field.name}": field.default for field in fields(self.cls)})
+        exec("\n".join(lines), namespace)  # pylint: disable=exec-used
+        function = namespace[name]
+        function.__qualname__ = f"{self.cls.__name__}.{name}"
+        return function
+
+    def _compile_decode(self) -> Callable[[dict], Any]:
+        """Warning: This method is private and should not be called manually
+           The instance is created without calling __init__, every field is assigned once"""
+        lines = ["def decode(values):", "    _get = values.get", "    obj = _new(_cls)"]
+        table = {attribute: (index, key, default) for index, (attribute, key, default) in enumerate(self.table)}
+        for field in fields(self.cls):
+            if field.name not in table:
+                lines.append(f"    obj.{field.name} = _f_{field.name}")
+                continue
+            index, key, default = table[field.name]
+            fallback = f"_f_{field.name}" if default is KEEP else f"_d{index}"
+            lines.append(f"    obj.{field.name} = _get({key!r}, {fallback})")
+        if self.on_decode is not None:
+            lines.append(f"    obj.{self.on_decode}()")
+        lines.append("    return obj")
+        return self._compile("decode", lines)
+
+    def _compile_update(self) -> Callable[[Any, dict], Any]:
+        """Warning: This method is private and should not be called manually"""
+        lines = ["def update(obj, values):", "    _get = values.get"]
+        for index, (attribute, key, default) in enumerate(self.table):
+            fallback = f"obj.{attribute}" if default is KEEP else f"_d{index}"
+            lines.append(f"    obj.{attribute} = _get({key!r}, {fallback})")
+        if self.on_decode is not None:
+            lines.append(f"    obj.{self.on_decode}()")
+        lines.append("    return obj")
+        return self._compile("update", lines)
+
+    def _compile_encode(self) -> Callable[[Any], dict]:
+        """Warning: This method is private and should not be called manually"""
+        items = ", ".join(f"{key!r}: obj.{attribute}" for attribute, key, _ in self.table)
+        return self._compile("encode", ["def encode(obj):", f"    return {{{items}}}"])
+
+
+def codec(table: Sequence[Tuple[str, str, Any]], on_decode: Optional[str] = None) -> Callable[[type], type]:
+    """Class decorator attaching a Codec (see Codec) to a Codable dataclass. Apply it on top of @slotted
+
+    Args:
+        table (Sequence[Tuple[str, str, Any]]): (attribute, api key, default if the key is missing) per field
+        on_decode (str, optional): Name of a method called on every decoded instance. Defaults to None.
+    """
+    def attach(cls: type) -> type:
+        cls._codec = Codec(cls, table, on_decode)
+        return cls
+    return attach
+
+
+class Codable:
+    """Represents the dict conversion of a dataclass with a codec (see codec)"""
+    __slots__ = ()
+    _codec: Codec
+
+    def to_dict(self) -> dict:
+        """Parsing the instance to a dict (api keys)"""
+        return self._codec.encode(self)
+
+    def from_dict(self, values: dict):
+        """Parsing a dict (api keys) into the instance
+
+        Returns:
+            The instance
+        """
+        return self._codec.update(self, values)
+
+    @classmethod
+    def decode(cls, values: dict):
+        """Parsing a dict (api keys) to a new instance"""
+        return cls._codec.decode(values)
+
+    @classmethod
+    def decode_many(cls, items: Iterable[dict]) -> list:
+        """Parsing a list of dicts (api keys) to new instances"""
+        return cls._codec.decode_many(items)
+
+
+__all__ = [
+    "KEEP",
+    "Codable",
+    "Codec",
+    "codec",
+    "slotted"
+]
@@ -1,10 +1,15 @@
 """Module providing a Token Credential"""
 import json
-from typing import NamedTuple
+import threading
+import time
+from typing import NamedTuple, Optional
 import jwt
 import requests
 from brandcompete.core.util import Util
-from brandcompete.core.classes import Route
+from brandcompete.core.classes import Route, Timeout, TokenEvent
+from brandcompete.core.exceptions import AIManRequestError
+from brandcompete.core.instrumentation import Instrumentation, emit
+from brandcompete.core.session import SessionFactory
 class AccessToken(NamedTuple):
     """Represents an OAuth access token"""
     token: str
@@ -18,23 +23,60 @@ AccessToken.expires_on.__doc__ = """The token's expiration time in Unix time."""
 
 class TokenCredential():
     """Represents an token credential"""
-    api_host:str = None
-    def __init__(self, api_host_url:str, user_name:str, password:str, auto_refresh_token = True) -> None:
+    def __init__(self, api_host_url:str, user_name:str, password:str, auto_refresh_token = True, session: Optional[requests.Session] = None, refresh_skew: int = 60, timeout: Optional[Timeout] = None, instrumentation: Optional[Instrumentation] = None, allow_insecure_http: bool = False) -> None:
+        """Login and create a token credential
+
+        Args:
+            api_host_url (str): The API-Host example: https://aiman-api.brandcompete.com
+            user_name (str): The Username to login
+            password (str): The User related password
+            auto_refresh_token (bool, optional): Refresh the token automatically. Defaults to True.
+            session (requests.Session, optional): Session used for the token requests. Defaults to None.
+            refresh_skew (int, optional): Seconds before the expiry in which the token is
+                refreshed in the background. Defaults to 60.
+            timeout (Timeout, optional): Timeout of the login and refresh requests. Defaults to None
+                (connect 10 seconds, read 120 seconds).
+            instrumentation (Instrumentation, optional): Receives the metrics of the login and the
+                token refreshes (on_token). Defaults to None (the instrumentation of the first client using the credential).
+            allow_insecure_http (bool, optional): Keep a plain http API-Host instead of upgrading it to https
+                (e.g. a local test server). Never use it for a remote host. Defaults to False.
+        """
         self.auto_refresh_token = auto_refresh_token
-        self.api_host = Util.validate_url(api_host_url)
-        self.access = self.get_token(api_host_url=api_host_url, user_name=user_name, password=password)
+        self.refresh_skew = refresh_skew
+        self.timeout = Timeout(connect=10, read=120) if timeout is None else timeout
+        self.instrumentation = instrumentation
+        self.api_host = Util.validate_url(api_host_url, allow_http=allow_insecure_http)
+        self._refresh_lock = threading.Lock()
+        self._owns_session = session is None
+        self.session = SessionFactory.create() if session is None else session
+        event = TokenEvent(kind="login", started_at=time.time())
+        start = time.perf_counter()
+        try:
+            self.access = self.get_token(api_host_url=self.api_host, user_name=user_name, password=password, session=self.session, timeout=self.timeout, allow_insecure_http=allow_insecure_http)
+        except Exception as e:
+            event.error = e
+            event.status_code = getattr(e, "status_code", None)
+            raise
+        else:
+            event.status_code = 200
+        finally:
+            event.latency = time.perf_counter() - start
+            emit(self.instrumentation, "on_token", event)
 
     @classmethod
-    def get_token(cls, api_host_url:str, user_name:str, password:str) -> AccessToken:
+    def get_token(cls, api_host_url:str, user_name:str, password:str, session: Optional[requests.Session] = None, timeout: Optional[Timeout] = None, allow_insecure_http: bool = False) -> AccessToken:
         """Generate an AccessToken 
 
         Args:
             api_host_url (str): The API-Host example: https://aiman-api.brandcompete.com
             user_name (str): The Username to login
             password (str): The User related password
+            session (requests.Session, optional): Session used for the login request. Defaults to None.
+            timeout (Timeout, optional): Timeout of the login request. Defaults to None (connect 10 seconds, read 120 seconds).
+            allow_insecure_http (bool, optional): Keep a plain http API-Host instead of upgrading it to https. Defaults to False.
 
         Raises:
-            Exception: Raise if login was not successfully
+            AIManRequestError: Raise if login was not successfully (a RuntimeError)
 
         Returns:
             AccessToken: AccessToken instance with expiration time in Unix time
@@ -44,31 +86,138 @@ class TokenCredential():
                 "accept": "application/json", 
                 "Content-Type": "application/json"
                 }
-        base_url = Util.validate_url(api_host_url)
+        base_url = Util.validate_url(api_host_url, allow_http=allow_insecure_http)
         url = f"{base_url}{Route.AUTH.value}"
-        response = requests.post(url=url, headers=headers, json=data, allow_redirects=True, timeout=120)
+        http = requests if session is None else session
+        timeout = Timeout(connect=10, read=120) if timeout is None else timeout
+        response = http.post(url=url, headers=headers, json=data, allow_redirects=True, timeout=(timeout.connect, timeout.read))
         if response.status_code != 200:
-            raise RuntimeError(f"[{response.status_code}] Reason: {response.reason}")
+            raise AIManRequestError(response.status_code, response.reason)
 
         return cls._to_access_token_object(response=response)
 
-    @classmethod
-    def refresh_access_token(cls) -> AccessToken:
+    def refresh_access_token(self) -> AccessToken:
         """Refreshing an existing AccessToken object
 
         Raises:
-            Exception: Raise if refresh was not successfully
+            AIManRequestError: Raise if refresh was not successfully (a RuntimeError)
 
         Returns:
             AccessToken: AccessToken instance with expiration time in Unix time
         """
         data = {}
-        response = requests.post(url=f"{cls.api_host}{Route.AUTH_REFRESH.value}", json=data, allow_redirects=True, timeout=120)
-        if response.status_code != 200:
-            raise RuntimeError(f"[{response.status_code}] Reason: {response.reason}")
+        event = TokenEvent(kind="refresh", started_at=time.time())
+        start = time.perf_counter()
+        try:
+            response = self.session.post(url=f"{self.api_host}{Route.AUTH_REFRESH.value}", json=data, allow_redirects=True, timeout=(self.timeout.connect, self.timeout.read))
+            event.status_code = response.status_code
+            if response.status_code != 200:
+                raise AIManRequestError(response.status_code, response.reason)
+            self.access = self._to_access_token_object(response=response)
+        except Exception as e:
+            event.error = e
+            raise
+        finally:
+            event.latency = time.perf_counter() - start
+            emit(self.instrumentation, "on_token", event)
+        return self.access
+
+    def ensure_valid_token(self) -> AccessToken:
+        """Get a valid AccessToken (if auto refresh is enabled)
+
+        An expired token is refreshed exactly once, even if many threads notice the expiry
+        at the same time (all of them wait for the one refresh). A token about to expire
+        (see refresh_skew) is refreshed in the background while the current one is still used.
+
+        Returns:
+            AccessToken: The current AccessToken
+        """
+        access = self.access
+        if not self.auto_refresh_token:
+            return access
+        if Util.is_token_expired(access.expires_on):
+            with self._refresh_lock:
+                if self.access is access:
+                    self.refresh_access_token()
+            return self.access
+        if self.expires_soon(access) and self._refresh_lock.acquire(blocking=False):
+            threading.Thread(target=self._refresh_in_background, args=(access,), daemon=True).start()
+        return access
+
+    def expires_soon(self, access: Optional[AccessToken] = None) -> bool:
+        """Whether the token expires within the refresh skew
+
+        Args:
+            access (AccessToken, optional): The token to check. Defaults to the current token.
+
+        Returns:
+            bool: expires soon (true or false)
+        """
+        access = self.access if access is None else access
+        return Util.is_token_expired(access.expires_on - self.refresh_skew)
+
+    def _refresh_in_background(self, access: AccessToken) -> None:
+        """Warning: This method should not called externally
+           Refreshes the token, the refresh lock must be acquired by the caller"""
+        try:
+            if self.access is access:
+                self.refresh_access_token()
+        except Exception:  # pylint: disable=broad-exception-caught
+            # the token is still valid, a failed refresh is repeated in the foreground once it expired
+            pass
+        finally:
+            self._refresh_lock.release()
+
+    async def refresh_access_token_async(self, session) -> AccessToken:
+        """Refreshing an existing AccessToken object without blocking the event loop
+
+        Args:
+            session (aiohttp.ClientSession): The async session to send the refresh request with
+
+        Raises:
+            AIManRequestError: Raise if refresh was not successfully (a RuntimeError)
+
+        Returns:
+            AccessToken: AccessToken instance with expiration time in Unix time
+        """
+        import aiohttp  # pylint: disable=import-outside-toplevel
+        data = {}
+        timeout = aiohttp.ClientTimeout(sock_connect=self.timeout.connect, sock_read=self.timeout.read)
+        event = TokenEvent(kind="refresh", started_at=time.time())
+        start = time.perf_counter()
+        try:
+            async with session.post(f"{self.api_host}{Route.AUTH_REFRESH.value}", json=data, allow_redirects=True, timeout=timeout) as response:
+                content = await response.read()
+                event.status_code = response.status
+                if response.status != 200:
+                    raise AIManRequestError(response.status, response.reason)
+            self.access = self._parse_access_token(content=content)
+        except Exception as e:
+            event.error = e
+            raise
+        finally:
+            event.latency = time.perf_counter() - start
+            emit(self.instrumentation, "on_token", event)
+        return self.access
+
+    def use_session(self, session: requests.Session) -> None:
+        """Share an (externally owned) session, e.g. the connection pool of a service client
 
-        cls.access = cls._to_access_token_object(response=response)
-        return cls.access
+        Args:
+            session (requests.Session): The session to use for all further token requests
+        """
+        if session is self.session:
+            return
+        if self._owns_session:
+            session.cookies.update(self.session.cookies)
+            self.session.close()
+        self.session = session
+        self._owns_session = False
+
+    def close(self) -> None:
+        """Close the underlying session (only if it is owned by the credential)"""
+        if self._owns_session:
+            self.session.close()
 
     @classmethod
     def _to_access_token_object(cls, response:requests.Response ) -> AccessToken:
@@ -81,7 +230,20 @@ class TokenCredential():
         Returns:
             AccessToken: AccessToken instance with expiration time in Unix time
         """
-        content = json.loads(response.content.decode('utf-8')) 
+        return cls._parse_access_token(content=response.content)
+
+    @classmethod
+    def _parse_access_token(cls, content: bytes) -> AccessToken:
+        """Warning: This method should not called externally
+           Converts the body of an api authentication response into an AccessToken instance
+
+        Args:
+            content (bytes): api authentication response body
+
+        Returns:
+            AccessToken: AccessToken instance with expiration time in Unix time
+        """
+        content = json.loads(content.decode('utf-8'))
         token = content['messageContent']['data']['access_token']
         refresh_token = content['messageContent']['data']['refresh_token']
         expires_on = int(jwt.decode(jwt=token, options={"verify_signature": False},algorithms=["HS256"])['exp'])
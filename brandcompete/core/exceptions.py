@@ -0,0 +1,37 @@
+"""Module providing the exceptions raised by the service clients"""
+from typing import Optional
+
+
+class AIManRequestError(RuntimeError):
+    """Represents an error response of the api (a RuntimeError, as raised by the clients before)"""
+
+    def __init__(self, status_code: int, reason: str, retry_after: Optional[float] = None) -> None:
+        """Create a request error
+
+        Args:
+            status_code (int): The http status code
+            reason (str): The reason phrase
+            retry_after (float, optional): Seconds to wait as requested by the Retry-After header. Defaults to None.
+        """
+        super().__init__(f"[{status_code}] Reason: {reason}")
+        self.status_code = status_code
+        self.reason = reason
+        self.retry_after = retry_after
+
+
+class CircuitOpenError(AIManRequestError):
+    """Represents a request rejected without being sent, because the circuit breaker is open"""
+
+    def __init__(self, retry_after: float) -> None:
+        super().__init__(503, "Circuit breaker open (host failing)", retry_after=retry_after)
+
+
+class DeadlineExceededError(TimeoutError):
+    """Represents a call aborted because its deadline passed"""
+
+
+__all__ = [
+    "AIManRequestError",
+    "CircuitOpenError",
+    "DeadlineExceededError"
+]
@@ -0,0 +1,115 @@
+"""Module providing a parallel document extraction pipeline"""
+import base64
+import time
+from concurrent.futures import (
+    Executor,
+    ProcessPoolExecutor,
+    ThreadPoolExecutor,
+    as_completed
+)
+from typing import (
+    Callable,
+    Iterator,
+    List,
+    Optional
+)
+from brandcompete.core.classes import ExtractionResult, Loader
+from brandcompete.core.loaders import load_document
+
+
+def extract_document(file_path: str, loader: Loader, encode_base64: bool = False) -> ExtractionResult:
+    """Parse (and optionally base64 encode) a single document and measure the time it takes
+
+    Args:
+        file_path (str): The absolute file path
+        loader (Loader): Loader to use for parsing content
+        encode_base64 (bool, optional): Base64 encode the content. Defaults to False.
+
+    Returns:
+        ExtractionResult: The content or the error
+    """
+    result = ExtractionResult(file_path=file_path, loader=loader)
+    start = time.perf_counter()
+    try:
+        content = load_document(file_path=file_path, loader=loader)
+        if encode_base64 and content is not None:
+            if isinstance(content, str):
+                content = str.encode(content)
+            content = base64.b64encode(content).decode()
+        result.content = content
+    except Exception as e:  # pylint: disable=broad-exception-caught
+        result.error = e
+    result.elapsed = time.perf_counter() - start
+    return result
+
+
+class DocumentExtractor:
+    """Represents an extraction engine parsing documents in parallel (process pool by default)"""
+
+    def __init__(
+            self,
+            max_workers: Optional[int] = None,
+            use_processes: bool = True,
+            on_result: Optional[Callable[[ExtractionResult], None]] = None) -> None:
+        """Create an extractor. The worker pool is started on first use and reused
+
+        Args:
+            max_workers (int, optional): Number of workers. Defaults to None (number of CPUs).
+            use_processes (bool, optional): Parse in worker processes (CPU bound loaders like PDF, EXCEL)
+                or in threads. Defaults to True.
+            on_result (Callable[[ExtractionResult], None], optional): Called for every finished
+                document, e.g. to collect the per file timing. Defaults to None.
+        """
+        self.max_workers = max_workers
+        self.use_processes = use_processes
+        self.on_result = on_result
+        self._executor: Optional[Executor] = None
+
+    def __enter__(self) -> "DocumentExtractor":
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback) -> None:
+        self.close()
+
+    def close(self) -> None:
+        """Shut the worker pool down"""
+        if self._executor is not None:
+            self._executor.shutdown()
+            self._executor = None
+
+    def extract(self, file_paths: List[str], loader: Loader, encode_base64: bool = False) -> Iterator[ExtractionResult]:
+        """Parse the documents in parallel
+
+        Args:
+            file_paths (List[str]): The absolute file paths
+            loader (Loader): Loader to use for parsing content
+            encode_base64 (bool, optional): Base64 encode the contents in the workers. Defaults to False.
+
+        Yields:
+            Iterator[ExtractionResult]: The results in completion order (see ExtractionResult.index)
+        """
+        executor = self._get_executor()
+        futures = {}
+        for index, file_path in enumerate(file_paths):
+            futures[executor.submit(extract_document, file_path, loader, encode_base64)] = index
+        for future in as_completed(futures):
+            result = future.result()
+            result.index = futures[future]
+            if self.on_result is not None:
+                self.on_result(result)
+            yield result
+
+    def _get_executor(self) -> Executor:
+        """Warning: This method is private and should not be called manually"""
+        if self._executor is None:
+            if self.use_processes:
+                self._executor = ProcessPoolExecutor(max_workers=self.max_workers)
+            else:
+                self._executor = ThreadPoolExecutor(max_workers=self.max_workers)
+        return self._executor
+
+
+__all__ = [
+    "DocumentExtractor",
+    "extract_document"
+]
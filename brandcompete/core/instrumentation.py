@@ -0,0 +1,152 @@
+"""Module providing the instrumentation hooks of the service clients and an OpenTelemetry adapter"""
+import re
+from typing import (
+    Any,
+    Optional
+)
+from brandcompete.core.classes import ExtractionResult, RequestEvent, TokenEvent
+
+
+class Instrumentation:
+    """Represents the receiver of the metrics of the clients and the token credential.
+    Override the hooks you need, the default hooks do nothing.
+
+    Hooks are called synchronously on the request path (from worker threads as well) and should
+    return quickly. Errors raised by a hook are ignored"""
+
+    def on_request(self, event: RequestEvent) -> None:
+        """Called after every request attempt (including failed and retried attempts)
+
+        Args:
+            event (RequestEvent): The metrics of the attempt
+        """
+
+    def on_token(self, event: TokenEvent) -> None:
+        """Called after every login and token refresh
+
+        Args:
+            event (TokenEvent): The metrics of the token request
+        """
+
+    def on_extraction(self, result: ExtractionResult) -> None:
+        """Called after every document extraction (not for document cache hits)
+
+        Args:
+            result (ExtractionResult): The extraction (loader and elapsed seconds)
+        """
+
+
+def emit(instrumentation: Optional[Instrumentation], hook: str, event: Any) -> None:
+    """Call a hook of an (optional) instrumentation, ignoring errors raised by the hook
+
+    Args:
+        instrumentation (Instrumentation, optional): The instrumentation
+        hook (str): The hook name, e.g. "on_request"
+        event (Any): The event
+    """
+    if instrumentation is None:
+        return
+    try:
+        getattr(instrumentation, hook)(event)
+    except Exception:  # pylint: disable=broad-exception-caught
+        # instrumentation must never break a request
+        pass
+
+
+class OpenTelemetryInstrumentation(Instrumentation):
+    """Represents an instrumentation recording OpenTelemetry metrics (and client spans) of the events.
+    Requires opentelemetry-api (pip install AI-Manager-Python-SDK[otel])
+
+    Ids in routes are replaced by {id}, the model tag is recorded as attribute aiman.model_tag."""
+
+    def __init__(self, meter_provider=None, tracer_provider=None, traces: bool = True) -> None:
+        """Create an OpenTelemetry instrumentation
+
+        Args:
+            meter_provider (MeterProvider, optional): Defaults to None (the global meter provider).
+            tracer_provider (TracerProvider, optional): Defaults to None (the global tracer provider).
+            traces (bool, optional): Record a span per request attempt and token request. Defaults to True.
+
+        Raises:
+            ImportError: If opentelemetry-api is not installed
+        """
+        try:
+            # pylint: disable=import-outside-toplevel
+            from opentelemetry import metrics, trace
+            from opentelemetry.trace import SpanKind, Status, StatusCode
+        except ImportError as e:
+            raise ImportError(
+                "Error: opentelemetry-api is required. Install it via: pip install AI-Manager-Python-SDK[otel]") from e
+        self._span_kind = SpanKind.CLIENT
+        self._error_status = Status(StatusCode.ERROR)
+        self._tracer = trace.get_tracer("brandcompete.aiman", tracer_provider=tracer_provider) if traces else None
+        meter = metrics.get_meter("brandcompete.aiman", meter_provider=meter_provider)
+        self._duration = meter.create_histogram(
+            "aiman.client.request.duration", unit="s", description="Latency of a request attempt")
+        self._time_to_first_byte = meter.create_histogram(
+            "aiman.client.request.time_to_first_byte", unit="s", description="Time until the response headers arrived")
+        self._queue_wait = meter.create_histogram(
+            "aiman.client.request.queue_wait", unit="s", description="Wait for the rate limit and the concurrency limit")
+        self._request_size = meter.create_histogram(
+            "aiman.client.request.body.size", unit="By", description="Size of the request body")
+        self._response_size = meter.create_histogram(
+            "aiman.client.response.body.size", unit="By", description="Size of the response body")
+        self._retries = meter.create_counter(
+            "aiman.client.request.retries", description="Retried request attempts")
+        self._token_duration = meter.create_histogram(
+            "aiman.client.token.duration", unit="s", description="Latency of logins and token refreshes")
+        self._extraction_duration = meter.create_histogram(
+            "aiman.document.extraction.duration", unit="s", description="Document extraction time per loader")
+
+    def on_request(self, event: RequestEvent) -> None:
+        route = re.sub(r"/\d+", "/{id}", event.route)
+        attributes = {"http.request.method": event.method, "aiman.route": route}
+        if event.model_tag is not None:
+            attributes["aiman.model_tag"] = event.model_tag
+        if event.status_code is not None:
+            attributes["http.response.status_code"] = event.status_code
+        if event.error is not None:
+            attributes["error.type"] = type(event.error).__name__
+        self._duration.record(event.latency, attributes=attributes)
+        self._queue_wait.record(event.queue_wait, attributes=attributes)
+        self._request_size.record(event.request_bytes, attributes=attributes)
+        self._response_size.record(event.response_bytes, attributes=attributes)
+        if event.time_to_first_byte is not None:
+            self._time_to_first_byte.record(event.time_to_first_byte, attributes=attributes)
+        if event.attempt > 0:
+            self._retries.add(1, attributes=attributes)
+        self._record_span(f"{event.method} {route}", dict(attributes, **{"aiman.attempt": event.attempt}), event)
+
+    def on_token(self, event: TokenEvent) -> None:
+        attributes = {"aiman.token.kind": event.kind}
+        if event.status_code is not None:
+            attributes["http.response.status_code"] = event.status_code
+        if event.error is not None:
+            attributes["error.type"] = type(event.error).__name__
+        self._token_duration.record(event.latency, attributes=attributes)
+        self._record_span(f"aiman token {event.kind}", attributes, event)
+
+    def on_extraction(self, result: ExtractionResult) -> None:
+        attributes = {"aiman.loader": "" if result.loader is None else result.loader.name}
+        if result.error is not None:
+            attributes["error.type"] = type(result.error).__name__
+        self._extraction_duration.record(result.elapsed, attributes=attributes)
+
+    def _record_span(self, name: str, attributes: dict, event) -> None:
+        """Warning: This method is private and should not be called manually
+           Records a finished span from the start time and latency of an event"""
+        if self._tracer is None:
+            return
+        start_time = int(event.started_at * 1e9)
+        span = self._tracer.start_span(name, kind=self._span_kind, attributes=attributes, start_time=start_time)
+        if event.error is not None:
+            span.record_exception(event.error)
+            span.set_status(self._error_status)
+        span.end(end_time=start_time + int(event.latency * 1e9))
+
+
+__all__ = [
+    "Instrumentation",
+    "OpenTelemetryInstrumentation",
+    "emit"
+]
@@ -0,0 +1,201 @@
+"""Module providing the document content loaders.
+
+The parsing libraries are optional extras and imported on the first use of their loader,
+so importing the clients stays fast for processes which never parse documents"""
+import csv
+import importlib
+import io
+from types import ModuleType
+from typing import (
+    Iterable,
+    Iterator,
+    List,
+    Optional,
+    Union
+)
+from brandcompete.core.classes import Loader
+
+
+def _import_optional(module: str, extra: str) -> ModuleType:
+    """Warning: This function is private and should not be called externally
+       Imports the parsing library of a loader (once, later calls are served from sys.modules)
+
+    Raises:
+        ImportError: If the library is not installed
+    """
+    try:
+        return importlib.import_module(module)
+    except ImportError as e:
+        raise ImportError(
+            f"Error: {module} is required for this loader. Install it via: pip install AI-Manager-Python-SDK[{extra}]") from e
+
+
+def iter_pdf_pages(file_path: str, pages: Optional[Iterable[int]] = None, max_chars: Optional[int] = None) -> Iterator[str]:
+    """Extract the text of a PDF page by page. Pages are only parsed when the generator is advanced
+
+    Args:
+        file_path (str): The absolute file path
+        pages (Iterable[int], optional): Zero based page numbers to extract, e.g. range(0, 10). Defaults to None (all pages).
+        max_chars (int, optional): Stop once this many characters are extracted (the last page is cut). Defaults to None.
+
+    Yields:
+        Iterator[str]: The text of every page
+    """
+    pdf_reader = _import_optional("PyPDF2", "pdf").PdfReader(file_path)
+    page_count = len(pdf_reader.pages)
+    remaining = max_chars
+    for index in (range(page_count) if pages is None else pages):
+        if index < 0 or index >= page_count:
+            continue
+        if remaining is not None and remaining <= 0:
+            return
+        text = pdf_reader.pages[index].extract_text() or ""
+        if remaining is not None:
+            text = text[:remaining]
+            remaining -= len(text)
+        yield text
+
+
+def iter_tabular_text(
+        file_path: str,
+        loader: Loader,
+        usecols: Optional[List[Union[int, str]]] = None,
+        nrows: Optional[int] = None,
+        sheet_name: Optional[Union[int, str]] = None,
+        chunk_size: int = 10000,
+        max_chars: Optional[int] = None) -> Iterator[str]:
+    """Convert a CSV or XLSX file into tab separated text chunk by chunk (flat memory usage).
+    CSV files are read in chunks, XLSX files with a read-only row iterator
+
+    Args:
+        file_path (str): The absolute file path
+        loader (Loader): Loader.CSV or Loader.EXCEL
+        usecols (List[Union[int, str]], optional): Column names or indices to keep. Defaults to None (all columns).
+        nrows (int, optional): Max. number of data rows. Defaults to None (all rows).
+        sheet_name (Union[int, str], optional): Sheet name or index (EXCEL only). Defaults to None (first sheet).
+        chunk_size (int, optional): Number of rows per chunk. Defaults to 10000.
+        max_chars (int, optional): Stop once this many characters are produced (the last chunk is cut). Defaults to None.
+
+    Raises:
+        ValueError: If the loader is not a tabular loader
+
+    Yields:
+        Iterator[str]: Tab separated text (the first chunk starts with the header)
+    """
+    if loader == Loader.CSV:
+        chunks = _iter_csv_chunks(file_path, usecols=usecols, nrows=nrows, chunk_size=chunk_size)
+    elif loader == Loader.EXCEL:
+        chunks = _iter_excel_chunks(
+            file_path, usecols=usecols, nrows=nrows, sheet_name=sheet_name, chunk_size=chunk_size)
+    else:
+        raise ValueError(f"Error: {loader} is not a tabular loader")
+
+    remaining = max_chars
+    for chunk in chunks:
+        if remaining is not None:
+            chunk = chunk[:remaining]
+            remaining -= len(chunk)
+        yield chunk
+        if remaining is not None and remaining <= 0:
+            chunks.close()
+            return
+
+
+def _iter_csv_chunks(file_path: str, usecols, nrows, chunk_size: int) -> Iterator[str]:
+    """Warning: This function is private and should not be called externally"""
+    pandas = _import_optional("pandas", "csv")
+    with pandas.read_csv(file_path, usecols=usecols, nrows=nrows, chunksize=chunk_size) as reader:
+        for index, df in enumerate(reader):
+            yield df.to_csv(sep='\t', index=False, header=index == 0)
+
+
+def _iter_excel_chunks(file_path: str, usecols, nrows, sheet_name, chunk_size: int) -> Iterator[str]:
+    """Warning: This function is private and should not be called externally"""
+    workbook = _import_optional("openpyxl", "excel").load_workbook(file_path, read_only=True, data_only=True)
+    try:
+        if sheet_name is None:
+            sheet = workbook.worksheets[0]
+        elif isinstance(sheet_name, int):
+            sheet = workbook.worksheets[sheet_name]
+        else:
+            sheet = workbook[sheet_name]
+        rows = sheet.iter_rows(values_only=True)
+        header = next(rows, None)
+        if header is None:
+            return
+        columns = list(range(len(header)))
+        if usecols is not None:
+            columns = [
+                index for index, name in enumerate(header) if index in usecols or name in usecols]
+        buffer = io.StringIO()
+        writer = csv.writer(buffer, delimiter='\t', lineterminator='\n')
+        writer.writerow(["" if header[index] is None else header[index] for index in columns])
+        count = 0
+        for row in rows:
+            if nrows is not None and count >= nrows:
+                break
+            writer.writerow(["" if index >= len(row) or row[index] is None else row[index] for index in columns])
+            count += 1
+            if count % chunk_size == 0:
+                yield buffer.getvalue()
+                buffer.seek(0)
+                buffer.truncate()
+        if buffer.tell() > 0:
+            yield buffer.getvalue()
+    finally:
+        workbook.close()
+
+
+def load_document(
+        file_path: str,
+        loader: Loader = None,
+        pages: Optional[Iterable[int]] = None,
+        max_chars: Optional[int] = None,
+        usecols: Optional[List[Union[int, str]]] = None,
+        nrows: Optional[int] = None,
+        sheet_name: Optional[Union[int, str]] = None) -> Optional[str]:
+    """Parsing document content
+
+    Args:
+        file_path (str): The absolute file path
+        loader (Loader, optional): Loader to use for parsing content. Defaults to None.
+        pages (Iterable[int], optional): Zero based page numbers to extract (PDF only). Defaults to None (all pages).
+        max_chars (int, optional): Stop extracting after this many characters (PDF, CSV and EXCEL). Defaults to None.
+        usecols (List[Union[int, str]], optional): Column names or indices to keep (CSV and EXCEL). Defaults to None.
+        nrows (int, optional): Max. number of data rows (CSV and EXCEL). Defaults to None.
+        sheet_name (Union[int, str], optional): Sheet name or index (EXCEL only). Defaults to None (first sheet).
+
+    Returns:
+        str: None or string (bytes for Loader.BASE64_ONLY and Loader.IMAGE)
+    """
+    if loader == Loader.BASE64_ONLY:
+        with open(file_path, "rb") as rag_file:
+            return rag_file.read()
+    if loader in (Loader.EXCEL, Loader.CSV):
+        return "".join(iter_tabular_text(
+            file_path=file_path,
+            loader=loader,
+            usecols=usecols,
+            nrows=nrows,
+            sheet_name=sheet_name,
+            max_chars=max_chars))
+
+    if loader == Loader.IMAGE:
+        with open(file_path, "rb") as image_file:
+            return image_file.read()
+
+    if loader == Loader.PDF:
+        return "\n".join(iter_pdf_pages(file_path=file_path, pages=pages, max_chars=max_chars))
+
+    if loader == Loader.DOCX:
+        text = _import_optional("docx2txt", "docx").process(file_path)
+        return text
+
+    return None
+
+
+__all__ = [
+    "iter_pdf_pages",
+    "iter_tabular_text",
+    "load_document"
+]
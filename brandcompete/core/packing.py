@@ -0,0 +1,156 @@
+"""Module providing token budget aware packing of documents into the prompt context"""
+import math
+from typing import (
+    Callable,
+    List,
+    Optional,
+    Tuple
+)
+from brandcompete.core.classes import PackedDocument, PackResult, PromptOptions
+
+
+class CharTokenizer:
+    """Represents a fast, character based token estimate (no tokenizer model required)"""
+
+    def __init__(self, chars_per_token: float = 4.0) -> None:
+        self.chars_per_token = chars_per_token
+
+    def __call__(self, text: str) -> int:
+        return math.ceil(len(text) / self.chars_per_token)
+
+
+class ContextPacker:
+    """Represents a packing stage, filling the context budget of a prompt
+    (num_ctx - num_predict - query) with document chunks.
+
+    Documents are split into chunks at line boundaries. Chunks are taken in a fixed order
+    (document by document, or round robin over the documents if balanced), so the same input
+    always leads to the same packed context. Chunks exceeding the budget are dropped and
+    replaced by a short omission marker."""
+
+    def __init__(
+            self,
+            tokenizer: Optional[Callable[[str], int]] = None,
+            chunk_tokens: int = 256,
+            reserve_tokens: int = 0,
+            balanced: bool = False,
+            overflow_marker: Optional[str] = "\n[... {omitted} of {total} parts omitted ...]\n",
+            on_pack: Optional[Callable[[PackResult], None]] = None) -> None:
+        """Create a context packer
+
+        Args:
+            tokenizer (Callable[[str], int], optional): Counts the tokens of a text. Defaults to CharTokenizer().
+            chunk_tokens (int, optional): Target size of a chunk in tokens. Defaults to 256.
+            reserve_tokens (int, optional): Tokens kept free in addition to num_predict (e.g. for a system prompt). Defaults to 0.
+            balanced (bool, optional): Take the chunks round robin over the documents instead of
+                document by document. Defaults to False.
+            overflow_marker (str, optional): Appended to a document with dropped chunks ({omitted} and {total}
+                are replaced). None drops silently. Defaults to a short omission note.
+            on_pack (Callable[[PackResult], None], optional): Called with the result of every packing. Defaults to None.
+        """
+        self.tokenizer = CharTokenizer() if tokenizer is None else tokenizer
+        self.chunk_tokens = chunk_tokens
+        self.reserve_tokens = reserve_tokens
+        self.balanced = balanced
+        self.overflow_marker = overflow_marker
+        self.on_pack = on_pack
+
+    def budget(self, query: str, prompt_options: Optional[PromptOptions] = None) -> int:
+        """Get the number of tokens available for documents
+
+        Args:
+            query (str): The query of the prompt
+            prompt_options (PromptOptions, optional): Prompt options (num_ctx, num_predict). Defaults to None.
+
+        Returns:
+            int: The token budget (>= 0)
+        """
+        prompt_options = PromptOptions() if prompt_options is None else prompt_options
+        budget = prompt_options.num_ctx - prompt_options.num_predict - self.reserve_tokens - self.tokenizer(query)
+        return max(0, budget)
+
+    def chunk(self, text: str) -> List[Tuple[str, int]]:
+        """Split a text into chunks of about chunk_tokens tokens (at line boundaries if possible)
+
+        Args:
+            text (str): The text
+
+        Returns:
+            List[Tuple[str, int]]: The chunks with their token counts
+        """
+        chunks = []
+        lines: List[str] = []
+        tokens = 0
+        for line in text.splitlines(keepends=True):
+            line_tokens = self.tokenizer(line)
+            if line_tokens > self.chunk_tokens:
+                if lines:
+                    chunks.append(("".join(lines), tokens))
+                    lines, tokens = [], 0
+                step = max(1, len(line) * self.chunk_tokens // line_tokens)
+                for start in range(0, len(line), step):
+                    part = line[start:start + step]
+                    chunks.append((part, self.tokenizer(part)))
+                continue
+            if tokens + line_tokens > self.chunk_tokens and lines:
+                chunks.append(("".join(lines), tokens))
+                lines, tokens = [], 0
+            lines.append(line)
+            tokens += line_tokens
+        if lines:
+            chunks.append(("".join(lines), tokens))
+        return chunks
+
+    def pack(self, query: str, documents: List[Tuple[str, str]], prompt_options: Optional[PromptOptions] = None) -> PackResult:
+        """Pack the documents into the context budget of a prompt
+
+        Args:
+            query (str): The query of the prompt
+            documents (List[Tuple[str, str]]): (name, text) of every document
+            prompt_options (PromptOptions, optional): Prompt options (num_ctx, num_predict). Defaults to None.
+
+        Returns:
+            PackResult: The packed documents and the token usage
+        """
+        result = PackResult(budget_tokens=self.budget(query=query, prompt_options=prompt_options))
+        chunked = [self.chunk(text or "") for _, text in documents]
+        included: List[List[str]] = [[] for _ in documents]
+        for name, chunks in zip(documents, chunked):
+            result.documents.append(PackedDocument(name=name[0], total_chunks=len(chunks)))
+
+        if self.balanced:
+            order = []
+            for position in range(max([len(chunks) for chunks in chunked], default=0)):
+                order.extend(
+                    (index, position) for index, chunks in enumerate(chunked) if position < len(chunks))
+        else:
+            order = [(index, position) for index, chunks in enumerate(chunked) for position in range(len(chunks))]
+
+        full = set()
+        for index, position in order:
+            if index in full:
+                continue
+            text, tokens = chunked[index][position]
+            if result.used_tokens + tokens > result.budget_tokens:
+                # keep the chunks of a document contiguous, a gap would tear the text apart
+                full.add(index)
+                continue
+            included[index].append(text)
+            result.used_tokens += tokens
+            result.documents[index].included_chunks += 1
+            result.documents[index].tokens += tokens
+
+        for document, parts in zip(result.documents, included):
+            document.text = "".join(parts)
+            if not document.complete and self.overflow_marker is not None:
+                document.text += self.overflow_marker.format(
+                    omitted=document.total_chunks - document.included_chunks, total=document.total_chunks)
+        if self.on_pack is not None:
+            self.on_pack(result)
+        return result
+
+
+__all__ = [
+    "CharTokenizer",
+    "ContextPacker"
+]
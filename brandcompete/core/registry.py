@@ -0,0 +1,124 @@
+"""Module providing an indexed catalogue of the available models"""
+import threading
+import time
+from typing import (
+    Dict,
+    List,
+    Optional,
+    Union
+)
+from brandcompete.core.classes import AIModel
+
+
+class ModelRegistry:
+    """Represents a ttl cached catalogue of the available models, indexed by id, uuid, name and tag.
+    The clients load it on first use and refresh it in the background once it expired,
+    lookups never wait for a refresh"""
+
+    def __init__(self, ttl: float = 300.0) -> None:
+        """Create a model registry
+
+        Args:
+            ttl (float, optional): Seconds until the catalogue is refreshed. Defaults to 300.
+        """
+        self.ttl = ttl
+        self.loaded_at: Optional[float] = None
+        self._models: List[AIModel] = []
+        self._by_id: Dict[int, AIModel] = {}
+        self._by_tag: Dict[int, AIModel] = {}
+        self._by_key: Dict[str, AIModel] = {}
+        self._lock = threading.Lock()
+        self._refreshing = False
+
+    @property
+    def models(self) -> List[AIModel]:
+        """The models of the last load"""
+        return list(self._models)
+
+    @property
+    def loaded(self) -> bool:
+        """True once the catalogue was loaded"""
+        return self.loaded_at is not None
+
+    @property
+    def expired(self) -> bool:
+        """True if the catalogue is older than ttl (or not loaded)"""
+        return self.loaded_at is None or time.monotonic() - self.loaded_at > self.ttl
+
+    def load(self, models: List[AIModel]) -> None:
+        """Replace the catalogue (the indexes are swapped at once, concurrent lookups see the old or the new catalogue)
+
+        Args:
+            models (List[AIModel]): The available models
+        """
+        by_key = {}
+        for model in models:
+            if model.uuid:
+                by_key[model.uuid] = model
+            if model.name:
+                by_key[model.name.lower()] = model
+        self._by_id, self._by_tag, self._by_key, self._models = (
+            {model.id: model for model in models},
+            {model.default_model_tag_id: model for model in models},
+            by_key,
+            list(models))
+        self.loaded_at = time.monotonic()
+
+    def get(self, key: Union[int, str]) -> Optional[AIModel]:
+        """Look a model up by id, default model tag, uuid or name (case insensitive)
+
+        Args:
+            key (Union[int, str]): id, default model tag, uuid or name
+
+        Returns:
+            AIModel: None or the model
+        """
+        if isinstance(key, int):
+            return self._by_id.get(key, self._by_tag.get(key))
+        return self._by_key.get(key, self._by_key.get(key.lower()))
+
+    def resolve(self, model: Union[int, str]) -> int:
+        """Resolve a model name or uuid to its default model tag (tags are returned unchanged)
+
+        Args:
+            model (Union[int, str]): model tag (int or numeric string), name or uuid
+
+        Raises:
+            ValueError: If the model is unknown
+
+        Returns:
+            int: The model tag
+        """
+        if not self.is_name(model):
+            return int(model)
+        found = self._by_key.get(model, self._by_key.get(model.lower()))
+        if found is None:
+            raise ValueError(f"Error: unknown model: {model}")
+        return found.default_model_tag_id
+
+    def begin_refresh(self) -> bool:
+        """Claim the refresh of the catalogue
+
+        Returns:
+            bool: True if the caller has to refresh (and call end_refresh), False if a refresh is running
+        """
+        with self._lock:
+            if self._refreshing:
+                return False
+            self._refreshing = True
+            return True
+
+    def end_refresh(self) -> None:
+        """Release the refresh claimed by begin_refresh"""
+        with self._lock:
+            self._refreshing = False
+
+    @classmethod
+    def is_name(cls, model: Union[int, str]) -> bool:
+        """True if model is a name or uuid (not a model tag)"""
+        return isinstance(model, str) and not model.isdigit()
+
+
+__all__ = [
+    "ModelRegistry"
+]
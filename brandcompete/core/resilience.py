@@ -0,0 +1,285 @@
+"""Module providing retries, client side rate limiting and a circuit breaker for the request layer"""
+import errno
+import random
+import threading
+import time
+from email.utils import parsedate_to_datetime
+from typing import (
+    Dict,
+    Iterable,
+    Optional
+)
+from brandcompete.core.classes import RequestType
+from brandcompete.core.exceptions import AIManRequestError, CircuitOpenError
+
+
+def parse_retry_after(value: Optional[str]) -> Optional[float]:
+    """Parse a Retry-After header (seconds or http date)
+
+    Args:
+        value (str, optional): The header value
+
+    Returns:
+        float: None or the seconds to wait (>= 0)
+    """
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+
+def is_connection_reset(error: BaseException) -> bool:
+    """Check whether an error (or an error it wraps) is a connection reset by the host, e.g. a pooled
+    keep-alive connection the host closed while it was idle
+
+    Args:
+        error (BaseException): The transport error
+
+    Returns:
+        bool: True if the connection was reset, closed or broken
+    """
+    seen = set()
+    pending = [error]
+    while pending:
+        current = pending.pop()
+        if current is None or id(current) in seen:
+            continue
+        seen.add(id(current))
+        if isinstance(current, (ConnectionResetError, BrokenPipeError)):
+            return True
+        if isinstance(current, OSError) and current.errno in (errno.ECONNRESET, errno.EPIPE):
+            return True
+        pending.extend((current.__cause__, current.__context__))
+        pending.extend(arg for arg in current.args if isinstance(arg, BaseException))
+    return False
+
+
+class RetryPolicy:
+    """Represents the retry rules of the request layer (jittered exponential backoff).
+
+    Throttled requests (429) were not processed by the api and are retried for every method.
+    Other retryable statuses and transport errors (connection reset, timeout) are only retried for
+    idempotent methods or calls explicitly marked as retryable (e.g. prompt(..., retry=True))."""
+
+    def __init__(
+            self,
+            max_attempts: int = 4,
+            backoff_base: float = 0.5,
+            backoff_max: float = 30.0,
+            retry_statuses: Iterable[int] = (429, 502, 503, 504),
+            idempotent_methods: Iterable[RequestType] = (RequestType.GET, RequestType.PUT, RequestType.DELETE),
+            max_retry_after: float = 120.0) -> None:
+        """Create a retry policy
+
+        Args:
+            max_attempts (int, optional): Max. number of attempts (including the first one). Defaults to 4.
+            backoff_base (float, optional): Upper bound of the first backoff in seconds. Defaults to 0.5.
+            backoff_max (float, optional): Upper bound of any backoff in seconds. Defaults to 30.
+            retry_statuses (Iterable[int], optional): Retryable status codes. Defaults to (429, 502, 503, 504).
+            idempotent_methods (Iterable[RequestType], optional): Methods retried on any retryable error.
+                Defaults to GET, PUT and DELETE.
+            max_retry_after (float, optional): A longer Retry-After is not waited for (the error is raised). Defaults to 120.
+        """
+        self.max_attempts = max_attempts
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.retry_statuses = frozenset(retry_statuses)
+        self.idempotent_methods = frozenset(idempotent_methods)
+        self.max_retry_after = max_retry_after
+
+    def backoff(self, attempt: int) -> float:
+        """Get the (full jitter) backoff before the retry of a failed attempt (zero based)"""
+        return random.uniform(0, min(self.backoff_max, self.backoff_base * (2 ** attempt)))
+
+    def delay(self, request_type: RequestType, error: Exception, attempt: int, transient: bool = False, retry: Optional[bool] = None) -> Optional[float]:
+        """Get the seconds to wait before retrying a failed attempt
+
+        Args:
+            request_type (RequestType): The request method
+            error (Exception): The error of the attempt
+            attempt (int): Zero based number of the failed attempt
+            transient (bool, optional): The error is a transport error (connection reset, timeout). Defaults to False.
+            retry (bool, optional): True marks the call as retryable, False disables retries. Defaults to None.
+
+        Returns:
+            float: None (raise the error) or the seconds to wait
+        """
+        if retry is False or attempt + 1 >= self.max_attempts or isinstance(error, CircuitOpenError):
+            return None
+        retryable_call = retry is True or request_type in self.idempotent_methods
+        if isinstance(error, AIManRequestError):
+            if error.status_code not in self.retry_statuses:
+                return None
+            if error.status_code != 429 and not retryable_call:
+                return None
+            if error.retry_after is not None:
+                if error.retry_after > self.max_retry_after:
+                    return None
+                return error.retry_after
+            return self.backoff(attempt)
+        if transient and retryable_call:
+            return self.backoff(attempt)
+        return None
+
+
+class TokenBucket:
+    """Represents a token bucket whose rate adapts to throttling (additive increase, multiplicative decrease)"""
+
+    def __init__(
+            self,
+            rate: float,
+            capacity: Optional[float] = None,
+            min_rate: float = 0.5,
+            max_rate: Optional[float] = None,
+            increase: float = 0.5,
+            decrease: float = 0.5) -> None:
+        """Create a token bucket
+
+        Args:
+            rate (float): Initial requests per second
+            capacity (float, optional): Burst size. Defaults to None (rate, at least 1).
+            min_rate (float, optional): Lower bound of the rate. Defaults to 0.5.
+            max_rate (float, optional): Upper bound of the rate. Defaults to None (the initial rate).
+            increase (float, optional): Rate added per second of successful requests. Defaults to 0.5.
+            decrease (float, optional): Factor applied to the rate on throttling (429). Defaults to 0.5.
+        """
+        self.rate = rate
+        self.capacity = max(1.0, rate) if capacity is None else capacity
+        self.min_rate = min_rate
+        self.max_rate = rate if max_rate is None else max_rate
+        self.increase = increase
+        self.decrease = decrease
+        self._tokens = self.capacity
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def reserve(self) -> float:
+        """Take a token (possibly in advance)
+
+        Returns:
+            float: Seconds the caller has to wait before sending
+        """
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+            self._updated = now
+            self._tokens -= 1
+            if self._tokens >= 0:
+                return 0.0
+            return -self._tokens / self.rate
+
+    def on_success(self) -> None:
+        """Increase the rate additively (by increase per second of successful requests)"""
+        with self._lock:
+            self.rate = min(self.max_rate, self.rate + self.increase / max(self.rate, 1.0))
+
+    def on_throttle(self) -> None:
+        """Decrease the rate multiplicatively"""
+        with self._lock:
+            self.rate = max(self.min_rate, self.rate * self.decrease)
+            self._tokens = min(self._tokens, 0.0)
+
+
+class RateLimiter:
+    """Represents the client side rate limiting, one adaptive token bucket per host or per model tag"""
+
+    def __init__(self, rate: float = 10.0, per_model_tag: bool = False, **bucket_options) -> None:
+        """Create a rate limiter
+
+        Args:
+            rate (float, optional): Initial requests per second of every bucket. Defaults to 10.
+            per_model_tag (bool, optional): Limit prompts per model tag (other requests share the host bucket). Defaults to False.
+            bucket_options: Further TokenBucket arguments (capacity, min_rate, max_rate, increase, decrease)
+        """
+        self.rate = rate
+        self.per_model_tag = per_model_tag
+        self.bucket_options = bucket_options
+        self._buckets: Dict[str, TokenBucket] = {}
+        self._lock = threading.Lock()
+
+    def bucket(self, key: str) -> TokenBucket:
+        """Get (or create) the bucket of a key"""
+        with self._lock:
+            bucket = self._buckets.get(key)
+            if bucket is None:
+                bucket = self._buckets[key] = TokenBucket(rate=self.rate, **self.bucket_options)
+            return bucket
+
+
+class CircuitBreaker:
+    """Represents a circuit breaker. After failure_threshold consecutive failures (5xx, connection errors,
+    timeouts) requests are rejected immediately for recovery_time seconds, then a single probe is let through"""
+
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+    def __init__(self, failure_threshold: int = 5, recovery_time: float = 30.0) -> None:
+        """Create a circuit breaker
+
+        Args:
+            failure_threshold (int, optional): Consecutive failures opening the circuit. Defaults to 5.
+            recovery_time (float, optional): Seconds until a probe request is let through. Defaults to 30.
+        """
+        self.failure_threshold = failure_threshold
+        self.recovery_time = recovery_time
+        self.state = CircuitBreaker.CLOSED
+        self._failures = 0
+        self._opened_at = 0.0
+        self._lock = threading.Lock()
+
+    def before_call(self) -> bool:
+        """Admit a request. Every admitted request has to report its outcome (on_success or on_failure),
+        a probe which is not sent has to be released (release)
+
+        Raises:
+            CircuitOpenError: If the circuit is open (or a probe is already running)
+
+        Returns:
+            bool: True if the request is the probe of the half open circuit
+        """
+        with self._lock:
+            if self.state == CircuitBreaker.CLOSED:
+                return False
+            remaining = self._opened_at + self.recovery_time - time.monotonic()
+            if self.state == CircuitBreaker.OPEN and remaining <= 0:
+                self.state = CircuitBreaker.HALF_OPEN
+                return True
+            raise CircuitOpenError(retry_after=max(0.0, remaining))
+
+    def release(self) -> None:
+        """Release a probe which was admitted but never sent (e.g. the token refresh failed).
+        The circuit is open again and the next request is let through as probe"""
+        with self._lock:
+            if self.state == CircuitBreaker.HALF_OPEN:
+                self.state = CircuitBreaker.OPEN
+
+    def on_success(self) -> None:
+        """Record a successful request (closes the circuit)"""
+        with self._lock:
+            self._failures = 0
+            self.state = CircuitBreaker.CLOSED
+
+    def on_failure(self) -> None:
+        """Record a failed request"""
+        with self._lock:
+            self._failures += 1
+            if self.state == CircuitBreaker.HALF_OPEN or self._failures >= self.failure_threshold:
+                self.state = CircuitBreaker.OPEN
+                self._opened_at = time.monotonic()
+
+
+__all__ = [
+    "parse_retry_after",
+    "is_connection_reset",
+    "RetryPolicy",
+    "TokenBucket",
+    "RateLimiter",
+    "CircuitBreaker"
+]
@@ -0,0 +1,189 @@
+"""Module providing client side caches for prompt responses"""
+import abc
+import hashlib
+import json
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import (
+    Callable,
+    Optional,
+    Tuple
+)
+from brandcompete.core.classes import ResponseCacheStats
+
+
+def is_deterministic(payload: dict) -> bool:
+    """Check whether a prompt payload is deterministic: raw, or temperature 0 with a set (non zero) seed
+
+    Args:
+        payload (dict): The request payload
+
+    Returns:
+        bool: True if the response may be cached
+    """
+    options = payload.get("options") or {}
+    if payload.get("raw") or options.get("raw"):
+        return True
+    return options.get("temperature") == 0 and bool(options.get("seed"))
+
+
+class ResponseCache(abc.ABC):
+    """Represents the base of a response cache. Subclasses store serialized responses
+    via _load and _store. Only deterministic prompts are cached (see is_deterministic)"""
+
+    def __init__(self, ttl: Optional[float] = None, cacheable: Optional[Callable[[dict], bool]] = None) -> None:
+        """Create a response cache
+
+        Args:
+            ttl (float, optional): Seconds an entry stays valid. Defaults to None (no expiry).
+            cacheable (Callable[[dict], bool], optional): Decides by the request payload whether a response
+                is cached. Defaults to None (is_deterministic).
+        """
+        self.ttl = ttl
+        self.cacheable = is_deterministic if cacheable is None else cacheable
+        self.stats = ResponseCacheStats()
+        self._stats_lock = threading.Lock()
+
+    def key(self, route: str, payload: dict, host: str = "") -> str:
+        """Build the canonical cache key of a request (attachments are represented by their hash)
+
+        Args:
+            route (str): The api route
+            payload (dict): The request payload
+            host (str, optional): The api host (a shared cache does not mix the responses of hosts). Defaults to "".
+
+        Returns:
+            str: The cache key
+        """
+        if payload.get("attachments"):
+            payload = dict(payload)
+            payload["attachments"] = [
+                {
+                    **attachment,
+                    "base64": hashlib.sha256(attachment.get("base64", "").encode()).hexdigest()
+                } for attachment in payload["attachments"]]
+        canonical = json.dumps([host, route, payload], sort_keys=True, separators=(",", ":"), default=str)
+        return hashlib.sha256(canonical.encode()).hexdigest()
+
+    def get(self, key: str):
+        """Get a cached response (None on a miss or if the entry expired)"""
+        entry = self._load(key)
+        now = time.time()
+        with self._stats_lock:
+            if entry is None or (self.ttl is not None and now - entry[2] > self.ttl):
+                self.stats.misses += 1
+                return None
+            self.stats.hits += 1
+            self.stats.saved_seconds += entry[1]
+        return json.loads(entry[0])
+
+    def set(self, key: str, response, latency: float = 0.0) -> None:
+        """Cache a response
+
+        Args:
+            key (str): The cache key
+            response: The (json serializable) api response
+            latency (float, optional): Seconds the request took (reported as saved on every hit). Defaults to 0.0.
+        """
+        self._store(key, (json.dumps(response), latency, time.time()))
+
+    @abc.abstractmethod
+    def clear(self) -> None:
+        """Remove all entries"""
+
+    @abc.abstractmethod
+    def _load(self, key: str) -> Optional[Tuple[str, float, float]]:
+        """Warning: This method is private and should not be called manually
+           Returns (serialized response, latency, created unix time) or None"""
+
+    @abc.abstractmethod
+    def _store(self, key: str, entry: Tuple[str, float, float]) -> None:
+        """Warning: This method is private and should not be called manually"""
+
+
+class LRUResponseCache(ResponseCache):
+    """Represents an in-process LRU response cache"""
+
+    def __init__(self, max_entries: int = 1024, ttl: Optional[float] = None, cacheable: Optional[Callable[[dict], bool]] = None) -> None:
+        """Create an in-process response cache
+
+        Args:
+            max_entries (int, optional): Max. number of cached responses. Defaults to 1024.
+            ttl (float, optional): Seconds an entry stays valid. Defaults to None (no expiry).
+            cacheable (Callable[[dict], bool], optional): Decides by the request payload whether a response
+                is cached. Defaults to None (is_deterministic).
+        """
+        super().__init__(ttl=ttl, cacheable=cacheable)
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[str, Tuple[str, float, float]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def _load(self, key: str) -> Optional[Tuple[str, float, float]]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+            return entry
+
+    def _store(self, key: str, entry: Tuple[str, float, float]) -> None:
+        with self._lock:
+            self._entries[key] = entry
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+
+class SQLiteResponseCache(ResponseCache):
+    """Represents a response cache persisted in a local SQLite file"""
+
+    def __init__(self, path: str, ttl: Optional[float] = None, cacheable: Optional[Callable[[dict], bool]] = None) -> None:
+        """Create (or open) a SQLite response cache
+
+        Args:
+            path (str): Path of the SQLite file
+            ttl (float, optional): Seconds an entry stays valid. Defaults to None (no expiry).
+            cacheable (Callable[[dict], bool], optional): Decides by the request payload whether a response
+                is cached. Defaults to None (is_deterministic).
+        """
+        super().__init__(ttl=ttl, cacheable=cacheable)
+        self.path = path
+        self._lock = threading.Lock()
+        self._connection = sqlite3.connect(path, check_same_thread=False)
+        with self._lock, self._connection:
+            self._connection.execute(
+                "CREATE TABLE IF NOT EXISTS responses "
+                "(key TEXT PRIMARY KEY, response TEXT, latency REAL, created REAL)")
+
+    def close(self) -> None:
+        """Close the database connection"""
+        with self._lock:
+            self._connection.close()
+
+    def clear(self) -> None:
+        with self._lock, self._connection:
+            self._connection.execute("DELETE FROM responses")
+
+    def _load(self, key: str) -> Optional[Tuple[str, float, float]]:
+        with self._lock:
+            return self._connection.execute(
+                "SELECT response, latency, created FROM responses WHERE key = ?", (key,)).fetchone()
+
+    def _store(self, key: str, entry: Tuple[str, float, float]) -> None:
+        with self._lock, self._connection:
+            self._connection.execute(
+                "INSERT OR REPLACE INTO responses (key, response, latency, created) VALUES (?, ?, ?, ?)",
+                (key, *entry))
+
+
+__all__ = [
+    "is_deterministic",
+    "ResponseCache",
+    "LRUResponseCache",
+    "SQLiteResponseCache"
+]
@@ -0,0 +1,124 @@
+"""Module providing the json (de)serialization of request and response bodies"""
+import json
+from typing import (
+    Any,
+    Dict,
+    Optional,
+    Type,
+    Union
+)
+
+
+class JsonSerializer:
+    """Represents the json codec of the request layer (standard library json).
+    Bodies are serialized to bytes and parsed from bytes, so the transport buffer
+    is handed to the parser without decoding it into a str first"""
+
+    name = "json"
+
+    def dumps(self, obj: Any) -> bytes:
+        """Serialize an object into a compact utf-8 json body
+
+        Args:
+            obj (Any): The json payload
+
+        Returns:
+            bytes: The body
+        """
+        return json.dumps(obj, separators=(",", ":")).encode('utf-8')
+
+    def loads(self, content: Union[bytes, str]) -> Any:
+        """Parse a json body
+
+        Args:
+            content (Union[bytes, str]): The body
+
+        Returns:
+            Any: The parsed object
+        """
+        return json.loads(content)
+
+    def loads_data(self, content: Union[bytes, str]) -> Any:
+        """Parse a response envelope (parsed once) and get its messageContent.data
+
+        Args:
+            content (Union[bytes, str]): The response body
+
+        Returns:
+            Any: The data of the response
+        """
+        return self.loads(content)['messageContent']['data']
+
+
+class OrjsonSerializer(JsonSerializer):
+    """Represents the json codec based on orjson (pip install orjson)"""
+
+    name = "orjson"
+
+    def __init__(self) -> None:
+        import orjson  # pylint: disable=import-outside-toplevel
+        self._orjson = orjson
+        self._options = orjson.OPT_NON_STR_KEYS
+
+    def dumps(self, obj: Any) -> bytes:
+        return self._orjson.dumps(obj, option=self._options)
+
+    def loads(self, content: Union[bytes, str]) -> Any:
+        return self._orjson.loads(content)
+
+
+class UjsonSerializer(JsonSerializer):
+    """Represents the json codec based on ujson (pip install ujson)"""
+
+    name = "ujson"
+
+    def __init__(self) -> None:
+        import ujson  # pylint: disable=import-outside-toplevel
+        self._ujson = ujson
+
+    def dumps(self, obj: Any) -> bytes:
+        return self._ujson.dumps(obj, ensure_ascii=False).encode('utf-8')
+
+    def loads(self, content: Union[bytes, str]) -> Any:
+        return self._ujson.loads(content)
+
+
+SERIALIZERS: Dict[str, Type[JsonSerializer]] = {
+    OrjsonSerializer.name: OrjsonSerializer,
+    UjsonSerializer.name: UjsonSerializer,
+    JsonSerializer.name: JsonSerializer
+}
+
+
+def get_serializer(name: Optional[str] = None) -> JsonSerializer:
+    """Get a json serializer
+
+    Args:
+        name (str, optional): "orjson", "ujson" or "json". Defaults to None (the fastest installed one).
+
+    Raises:
+        ValueError: If the name is unknown
+        ImportError: If the named library is not installed
+
+    Returns:
+        JsonSerializer: The serializer
+    """
+    if name is not None:
+        if name not in SERIALIZERS:
+            raise ValueError(f"Error: unknown serializer: {name}")
+        return SERIALIZERS[name]()
+    for serializer_class in SERIALIZERS.values():
+        try:
+            return serializer_class()
+        except ImportError:
+            continue
+    return JsonSerializer()
+
+
+__all__ = [
+    "JsonSerializer",
+    "OrjsonSerializer",
+    "UjsonSerializer",
+    "SERIALIZERS",
+    "get_serializer"
+]
@@ -0,0 +1,116 @@
+"""Module providing pooled HTTP sessions"""
+import contextvars
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3 import HTTPConnectionPool, HTTPSConnectionPool
+from urllib3.util.retry import Retry
+
+_connection_reused: contextvars.ContextVar = contextvars.ContextVar("connection_reused", default=False)
+
+
+def connection_reused() -> bool:
+    """Whether the last request of the current thread (or task) was sent on a pooled keep-alive
+    connection instead of a new one. Tracked for the sessions of the SessionFactory and the sessions
+    with a connection_trace_config, False for every other session
+
+    Returns:
+        bool: True if the connection was reused
+    """
+    return _connection_reused.get()
+
+
+def forget_connection() -> None:
+    """Reset connection_reused before a request is sent"""
+    _connection_reused.set(False)
+
+
+def connection_trace_config():
+    """Create an aiohttp trace config which tracks the reuse of pooled connections (see connection_reused)
+
+    Returns:
+        aiohttp.TraceConfig: The trace config to pass to the aiohttp.ClientSession
+    """
+    import aiohttp  # pylint: disable=import-outside-toplevel
+
+    async def on_reuse(session, context, params):  # pylint: disable=unused-argument
+        _connection_reused.set(True)
+
+    async def on_create(session, context, params):  # pylint: disable=unused-argument
+        _connection_reused.set(False)
+
+    trace_config = aiohttp.TraceConfig()
+    trace_config.on_connection_reuseconn.append(on_reuse)
+    trace_config.on_connection_create_end.append(on_create)
+    return trace_config
+
+
+class _TrackingHTTPConnectionPool(HTTPConnectionPool):
+    """Warning: This class is private and should not be instantiated manually"""
+
+    def _get_conn(self, timeout=None):
+        conn = super()._get_conn(timeout=timeout)
+        # a pooled connection keeps its socket, a new (or a dropped and closed) one has none yet
+        _connection_reused.set(getattr(conn, "sock", None) is not None)
+        return conn
+
+
+class _TrackingHTTPSConnectionPool(HTTPSConnectionPool, _TrackingHTTPConnectionPool):
+    """Warning: This class is private and should not be instantiated manually"""
+
+
+class _TrackingHTTPAdapter(HTTPAdapter):
+    """Warning: This class is private and should not be instantiated manually"""
+
+    def init_poolmanager(self, *args, **kwargs):
+        super().init_poolmanager(*args, **kwargs)
+        self.poolmanager.pool_classes_by_scheme = {
+            "http": _TrackingHTTPConnectionPool,
+            "https": _TrackingHTTPSConnectionPool
+        }
+
+
+class SessionFactory:
+    """Represents a factory for pooled keep-alive HTTP sessions"""
+
+    @classmethod
+    def create(cls, pool_connections: int = 4, pool_maxsize: int = 16, max_retries: int = 2) -> requests.Session:
+        """Create a requests session with a keep-alive connection pool
+
+        Args:
+            pool_connections (int, optional): Number of host pools to cache. Defaults to 4.
+            pool_maxsize (int, optional): Max. number of pooled connections per host. Defaults to 16.
+            max_retries (int, optional): How often a request is retried if the connection
+                could not be established. Defaults to 2. Read errors (timeouts, a pooled connection
+                reset by the host) are not retried here, but by the client, so a slow host is not waited
+                for several times per attempt: the RetryPolicy retries them for idempotent methods and
+                a request whose reused keep-alive connection was reset before any response arrived
+                is sent once more (see connection_reused).
+
+        Returns:
+            requests.Session: The configured session
+        """
+        retry = Retry(
+            total=max_retries,
+            connect=max_retries,
+            read=False,
+            status=0,
+            redirect=None,
+            allowed_methods=Retry.DEFAULT_ALLOWED_METHODS,
+            raise_on_status=False)
+        adapter = _TrackingHTTPAdapter(
+            pool_connections=pool_connections,
+            pool_maxsize=pool_maxsize,
+            max_retries=retry)
+        session = requests.Session()
+        session.mount("https://", adapter)
+        session.mount("http://", adapter)
+        session.headers.update({"Connection": "keep-alive"})
+        return session
+
+
+__all__ = [
+    "SessionFactory",
+    "connection_reused",
+    "connection_trace_config",
+    "forget_connection"
+]
@@ -0,0 +1,122 @@
+"""Module providing request coalescing (single-flight) for identical concurrent calls"""
+import asyncio
+import copy
+import threading
+from typing import (
+    Any,
+    Awaitable,
+    Callable,
+    Dict,
+    List
+)
+
+
+class _Flight:
+    """Warning: This class is private and should not be instantiated manually"""
+    __slots__ = ("event", "result", "error", "waiters")
+
+    def __init__(self) -> None:
+        self.event = threading.Event()
+        self.result = None
+        self.error = None
+        self.waiters = 0
+
+
+class SingleFlight:
+    """Represents a group of calls where concurrent calls with the same key share one execution.
+    The first caller executes the function, the others wait for its result (or its error)"""
+
+    def __init__(self, share: Callable[[Any], Any] = copy.deepcopy) -> None:
+        """Create a single-flight group
+
+        Args:
+            share (Callable[[Any], Any], optional): Applied to the result for every caller if the
+                result was shared, so callers may modify it. Defaults to copy.deepcopy.
+        """
+        self.share = share
+        self.coalesced = 0
+        self._flights: Dict[str, _Flight] = {}
+        self._lock = threading.Lock()
+
+    def do(self, key: str, function: Callable[[], Any]) -> Any:
+        """Execute function, or wait for the running execution with the same key
+
+        Args:
+            key (str): The call key (e.g. the route)
+            function (Callable[[], Any]): The call
+
+        Returns:
+            Any: The result of the call
+        """
+        with self._lock:
+            flight = self._flights.get(key)
+            leader = flight is None
+            if leader:
+                flight = self._flights[key] = _Flight()
+            else:
+                flight.waiters += 1
+                self.coalesced += 1
+        if not leader:
+            flight.event.wait()
+            if flight.error is not None:
+                raise flight.error
+            return self.share(flight.result)
+
+        try:
+            flight.result = function()
+        except BaseException as e:
+            flight.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._flights[key]
+            flight.event.set()
+        return flight.result if flight.waiters == 0 else self.share(flight.result)
+
+
+class AsyncSingleFlight:
+    """Represents the asyncio counterpart of SingleFlight. The shared call runs in its own task,
+    a cancelled caller does not cancel the call of the others"""
+
+    def __init__(self, share: Callable[[Any], Any] = copy.deepcopy) -> None:
+        """Create a single-flight group
+
+        Args:
+            share (Callable[[Any], Any], optional): Applied to the result for every caller if the
+                result was shared, so callers may modify it. Defaults to copy.deepcopy.
+        """
+        self.share = share
+        self.coalesced = 0
+        self._flights: Dict[str, List] = {}
+
+    async def do(self, key: str, function: Callable[[], Awaitable[Any]]) -> Any:
+        """Await function(), or the running call with the same key
+
+        Args:
+            key (str): The call key (e.g. the route)
+            function (Callable[[], Awaitable[Any]]): The call
+
+        Returns:
+            Any: The result of the call
+        """
+        flight = self._flights.get(key)
+        if flight is None or flight[0].done():
+            task = asyncio.ensure_future(function())
+            flight = self._flights[key] = [task, 0]
+            task.add_done_callback(lambda _: self._drop(key, task))
+        else:
+            flight[1] += 1
+            self.coalesced += 1
+        result = await asyncio.shield(flight[0])
+        return result if flight[1] == 0 else self.share(result)
+
+    def _drop(self, key: str, task: asyncio.Future) -> None:
+        """Warning: This method is private and should not be called manually"""
+        if key in self._flights and self._flights[key][0] is task:
+            del self._flights[key]
+
+
+__all__ = [
+    "SingleFlight",
+    "AsyncSingleFlight"
+]
@@ -0,0 +1,83 @@
+"""Module providing prepared prompts with a pre-serialized json prefix"""
+from dataclasses import replace
+from typing import (
+    List,
+    Optional
+)
+from brandcompete.core.classes import Loader, Prompt, PromptOptions, Route
+from brandcompete.core.serialization import JsonSerializer, get_serializer
+
+
+class PromptTemplate:
+    """Represents a prepared prompt of a model tag with fixed prompt options (see AIManServiceClient.prepare_prompt).
+
+    The static fields of the payload are serialized once. Per call only the query and the attachments
+    are serialized and spliced in, so repeated prompts with the same options cost little client CPU.
+    Treat the template as immutable, it can be shared between threads and clients"""
+    __slots__ = ("model_tag", "prompt_options", "loader", "route", "serializer", "_static", "_prefix")
+
+    def __init__(
+            self,
+            model_tag: int,
+            prompt_options: Optional[PromptOptions] = None,
+            loader: Optional[Loader] = None,
+            serializer: Optional[JsonSerializer] = None) -> None:
+        """Create a prompt template
+
+        Args:
+            model_tag (int): The (resolved) model tag
+            prompt_options (PromptOptions, optional): The prompt options. A copy is kept, later changes
+                of the passed options do not apply. Defaults to None (default options).
+            loader (Loader, optional): Loader of the files to rag. Defaults to None (inferred from the file extension).
+            serializer (JsonSerializer, optional): Defaults to None (see get_serializer).
+        """
+        self.model_tag = model_tag
+        self.prompt_options = PromptOptions() if prompt_options is None else replace(prompt_options)
+        self.loader = loader
+        self.route = Route.PROMPT.value.replace("model_tag", f"{model_tag}")
+        self.serializer = get_serializer() if serializer is None else serializer
+
+        static = Prompt().to_dict()
+        del static["prompt"]
+        del static["attachments"]
+        static["options"] = self.prompt_options.to_dict()
+        static["raw"] = self.prompt_options.raw
+        static["keepContext"] = self.prompt_options.keep_context
+        self._static = static
+        # '{"modelTagId":0,...,"keepContext":true' + ',"prompt":'
+        self._prefix = self.serializer.dumps(static)[:-1] + b',"prompt":'
+
+    def render(self, query: str, attachments: Optional[List[dict]] = None) -> dict:
+        """Build the payload of a prompt (as prompt builds it)
+
+        Args:
+            query (str): Query to prompt
+            attachments (List[dict], optional): The attachments. Defaults to None.
+
+        Returns:
+            dict: The payload
+        """
+        return dict(self._static, prompt=query, attachments=attachments if attachments else None)
+
+    def encode(self, query: str, attachments: Optional[List[dict]] = None) -> bytes:
+        """Build the json body of a prompt from the serialized prefix
+
+        Args:
+            query (str): Query to prompt
+            attachments (List[dict], optional): The attachments. Defaults to None.
+
+        Returns:
+            bytes: The body (equal to the serialized render(query, attachments))
+        """
+        dumps = self.serializer.dumps
+        if attachments:
+            return b"".join((self._prefix, dumps(query), b',"attachments":', dumps(attachments), b"}"))
+        return b"".join((self._prefix, dumps(query), b',"attachments":null}'))
+
+    def __repr__(self) -> str:
+        return f"PromptTemplate(model_tag={self.model_tag!r}, prompt_options={self.prompt_options!r}, loader={self.loader!r})"
+
+
+__all__ = [
+    "PromptTemplate"
+]
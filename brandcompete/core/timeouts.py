@@ -0,0 +1,64 @@
+"""Module providing deadlines, carried through batched and parallel calls"""
+import time
+from typing import (
+    Optional,
+    Union
+)
+from brandcompete.core.classes import Timeout
+from brandcompete.core.exceptions import DeadlineExceededError
+
+
+class Deadline:
+    """Represents a point in time by which a call (including its retries and sub requests) has to finish"""
+
+    def __init__(self, seconds: float) -> None:
+        """Create a deadline
+
+        Args:
+            seconds (float): Seconds from now
+        """
+        self.expires_at = time.monotonic() + seconds
+
+    @classmethod
+    def of(cls, value: Optional[Union[float, "Deadline"]]) -> Optional["Deadline"]:
+        """Get a deadline from seconds from now (or an existing deadline)"""
+        if value is None or isinstance(value, Deadline):
+            return value
+        return cls(value)
+
+    @classmethod
+    def earliest(cls, first: Optional["Deadline"], second: Optional["Deadline"]) -> Optional["Deadline"]:
+        """Get the earlier of two (optional) deadlines"""
+        if first is None or second is None:
+            return second if first is None else first
+        return first if first.expires_at <= second.expires_at else second
+
+    @property
+    def expired(self) -> bool:
+        """True if the deadline passed"""
+        return self.remaining() <= 0
+
+    def remaining(self) -> float:
+        """Get the remaining seconds (may be negative)"""
+        return self.expires_at - time.monotonic()
+
+    def check(self) -> None:
+        """Raises:
+            DeadlineExceededError: If the deadline passed
+        """
+        if self.expired:
+            raise DeadlineExceededError("Error: deadline exceeded")
+
+    def bound(self, timeout: Timeout) -> Timeout:
+        """Get the timeout capped at the remaining time
+
+        Raises:
+            DeadlineExceededError: If the deadline passed
+        """
+        self.check()
+        return timeout.bounded(self.remaining())
+
+
+__all__ = [
+    "Deadline"
+]
@@ -0,0 +1,222 @@
+"""Module providing streamed (bounded memory) request bodies for uploads"""
+import asyncio
+import base64
+import json
+import os
+import uuid
+from typing import (
+    Any,
+    AsyncIterator,
+    Callable,
+    Dict,
+    Iterator,
+    List,
+    Optional
+)
+
+
+class StreamedJsonBody:
+    """Represents a json request body whose file contents are base64 encoded
+    chunk by chunk while the body is sent, instead of being held in memory.
+
+    The body has a known length (Content-Length) and can be iterated more than once,
+    so it can be sent again on a retry."""
+
+    content_type = "application/json"
+
+    def __init__(self, chunk_size: int = 3 * 256 * 1024, dumps: Optional[Callable[[Any], bytes]] = None) -> None:
+        """Create an empty body
+
+        Args:
+            chunk_size (int, optional): Number of raw bytes read (and encoded) at once.
+                Rounded down to a multiple of 3. Defaults to 768 KiB.
+            dumps (Callable[[Any], bytes], optional): Serializes the payload to utf-8 json.
+                Defaults to None (the standard library json).
+        """
+        self.chunk_size = max(3, chunk_size - chunk_size % 3)
+        self.dumps = dumps
+        self._files: Dict[str, str] = {}
+        self._parts: List[object] = []
+        self._length = 0
+
+    def file_placeholder(self, file_path: str) -> str:
+        """Register a file whose base64 content replaces the returned placeholder string
+
+        Args:
+            file_path (str): The file path
+
+        Returns:
+            str: The placeholder to use as base64 value in the payload
+        """
+        placeholder = f"__bc_stream_{uuid.uuid4().hex}__"
+        self._files[placeholder] = file_path
+        return placeholder
+
+    def encode(self, payload: dict) -> "StreamedJsonBody":
+        """Serialize the payload (containing placeholders) into the body
+
+        Args:
+            payload (dict): The json payload
+
+        Returns:
+            StreamedJsonBody: The body itself
+        """
+        parts: List[object] = [
+            json.dumps(payload).encode('utf-8') if self.dumps is None else self.dumps(payload)]
+        for placeholder, file_path in self._files.items():
+            for index, part in enumerate(parts):
+                if isinstance(part, bytes) and placeholder.encode() in part:
+                    before, after = part.split(placeholder.encode(), 1)
+                    parts[index:index + 1] = [before, file_path, after]
+                    break
+        self._parts = parts
+        self._length = 0
+        for part in parts:
+            if isinstance(part, bytes):
+                self._length += len(part)
+            else:
+                self._length += 4 * ((os.path.getsize(part) + 2) // 3)
+        return self
+
+    def __len__(self) -> int:
+        return self._length
+
+    def __iter__(self) -> Iterator[bytes]:
+        for part in self._parts:
+            if isinstance(part, bytes):
+                yield part
+                continue
+            with open(part, "rb") as file:
+                while True:
+                    chunk = file.read(self.chunk_size)
+                    if not chunk:
+                        break
+                    yield base64.b64encode(chunk)
+
+    async def __aiter__(self) -> AsyncIterator[bytes]:
+        loop = asyncio.get_running_loop()
+        chunks = iter(self)
+        while True:
+            chunk = await loop.run_in_executor(None, next, chunks, None)
+            if chunk is None:
+                return
+            yield chunk
+
+
+class MultipartBody:
+    """Represents a multipart/form-data request body: the json payload (part "payload") followed by
+    the raw (not base64 encoded) files and attachments, referenced in the payload by their part name.
+    Files are read chunk by chunk while the body is sent.
+
+    Like StreamedJsonBody the body has a known length and can be iterated more than once."""
+
+    def __init__(self, chunk_size: int = 256 * 1024, dumps: Optional[Callable[[Any], bytes]] = None) -> None:
+        """Create an empty body
+
+        Args:
+            chunk_size (int, optional): Number of bytes read from a file at once. Defaults to 256 KiB.
+            dumps (Callable[[Any], bytes], optional): Serializes the payload to utf-8 json.
+                Defaults to None (the standard library json).
+        """
+        self.chunk_size = chunk_size
+        self.dumps = dumps
+        self.boundary = f"bc-{uuid.uuid4().hex}"
+        self._files: List[tuple] = []
+        self._parts: List[object] = []
+        self._length = 0
+
+    @property
+    def content_type(self) -> str:
+        """The Content-Type header of the body"""
+        return f"multipart/form-data; boundary={self.boundary}"
+
+    def add_file(self, file_path: str, filename: str, mime_type: str) -> str:
+        """Register a file sent (streamed from disk) as its own part
+
+        Args:
+            file_path (str): The file path
+            filename (str): The file name
+            mime_type (str): The mime type
+
+        Returns:
+            str: The part name to reference the file in the payload
+        """
+        return self._add(file_path, filename, mime_type)
+
+    def add_bytes(self, content: bytes, filename: str, mime_type: str) -> str:
+        """Register in-memory content sent as its own part
+
+        Args:
+            content (bytes): The content
+            filename (str): The file name
+            mime_type (str): The mime type
+
+        Returns:
+            str: The part name to reference the content in the payload
+        """
+        return self._add(content, filename, mime_type)
+
+    def encode(self, payload: dict) -> "MultipartBody":
+        """Serialize the payload (referencing the registered parts) into the body
+
+        Args:
+            payload (dict): The json payload
+
+        Returns:
+            MultipartBody: The body itself
+        """
+        delimiter = f"--{self.boundary}\r\n".encode()
+        parts: List[object] = [
+            delimiter,
+            b'Content-Disposition: form-data; name="payload"\r\nContent-Type: application/json\r\n\r\n',
+            json.dumps(payload).encode('utf-8') if self.dumps is None else self.dumps(payload),
+            b"\r\n"]
+        for name, content, filename, mime_type in self._files:
+            filename = filename.replace('"', "%22")
+            parts.append(delimiter)
+            parts.append((
+                f'Content-Disposition: form-data; name="{name}"; filename="{filename}"\r\n'
+                f'Content-Type: {mime_type or "application/octet-stream"}\r\n\r\n').encode('utf-8'))
+            parts.append(content)
+            parts.append(b"\r\n")
+        parts.append(f"--{self.boundary}--\r\n".encode())
+        self._parts = parts
+        self._length = sum(
+            len(part) if isinstance(part, bytes) else os.path.getsize(part) for part in parts)
+        return self
+
+    def _add(self, content, filename: str, mime_type: str) -> str:
+        """Warning: This method is private and should not be called manually"""
+        name = f"file{len(self._files)}"
+        self._files.append((name, content, filename, mime_type))
+        return name
+
+    def __len__(self) -> int:
+        return self._length
+
+    def __iter__(self) -> Iterator[bytes]:
+        for part in self._parts:
+            if isinstance(part, bytes):
+                yield part
+                continue
+            with open(part, "rb") as file:
+                while True:
+                    chunk = file.read(self.chunk_size)
+                    if not chunk:
+                        break
+                    yield chunk
+
+    async def __aiter__(self) -> AsyncIterator[bytes]:
+        loop = asyncio.get_running_loop()
+        chunks = iter(self)
+        while True:
+            chunk = await loop.run_in_executor(None, next, chunks, None)
+            if chunk is None:
+                return
+            yield chunk
+
+
+__all__ = [
+    "StreamedJsonBody",
+    "MultipartBody"
+]
@@ -8,11 +8,14 @@ class Util:
     """Represents a Utility Class"""
 
     @classmethod
-    def validate_url(cls, url:str,check_only = False):
+    def validate_url(cls, url:str,check_only = False, allow_http: bool = False):
         """Validate and parse an url
 
         Args:
             url (str): url
+            check_only (bool, optional): Only check whether url is a valid url. Defaults to False.
+            allow_http (bool, optional): Keep a plain http url instead of upgrading it to https
+                (e.g. a local test server). Defaults to False.
 
         Raises:
             ValueError: If url is not type of string
@@ -28,7 +31,7 @@ class Util:
                 return url
             if not url.lower().startswith('http'):
                 url = "https://" + url
-            if url.lower().startswith("http://"):
+            if url.lower().startswith("http://") and not allow_http:
                 url = url.replace("http://", "https://")
             if url.lower().endswith("/"):
                 url = url[:-1]
@@ -88,6 +91,22 @@ class Util:
         """Returns the final component of a pathname"""
         return os.path.basename(file_path)
 
+    @classmethod
+    def get_base64_size(cls, content_base64: str) -> int:
+        """Get the size in bytes of base64 encoded content (without decoding it)
+
+        Args:
+            content_base64 (str): base64 encoded content
+
+        Returns:
+            int: size of the decoded content in bytes
+        """
+        length = len(content_base64)
+        if length == 0:
+            return 0
+        padding = 2 if content_base64.endswith("==") else 1 if content_base64.endswith("=") else 0
+        return length * 3 // 4 - padding
+
     @classmethod
     def get_file_name_and_ext(cls, file_path:str) -> tuple:
         """Get the filename and extension from a given path
@@ -0,0 +1,123 @@
+"""Shared fixtures: a local stand-in of the AI Manager API which records the requests"""
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Callable, Dict, List, Optional, Tuple
+import jwt
+import pytest
+from brandcompete.core.credentials import TokenCredential
+
+MEDIA = [
+    {"id": 1, "name": "a.pdf", "base64": "QUFB", "mime_type": "application/pdf", "size": 3},
+    {"id": 2, "name": "b.pdf", "base64": "QkJC", "mime_type": "application/pdf", "size": 3}]
+
+
+class FakeApi:
+    """Represents the routes of the stand-in api. A handler registered via on(method, path) replaces
+    the default response of a route, it gets the request handler and the request body"""
+
+    def __init__(self) -> None:
+        self.requests: List[Tuple[str, str, bytes]] = []
+        self.handlers: Dict[Tuple[str, str], Callable] = {}
+        self.datasource = {
+            "id": 5, "name": "docs", "summary": "s", "categories": [], "tags": [], "assocContexts": [],
+            "media": [dict(media) for media in MEDIA], "status": 2, "mediaCount": len(MEDIA), "ownerId": 1}
+
+    def on(self, method: str, path: str, handler: Callable) -> None:
+        """Replace the response of a route"""
+        self.handlers[(method, path)] = handler
+
+    def sent(self, method: str, path: Optional[str] = None) -> List[bytes]:
+        """Bodies of the requests sent to a route (every path if path is None)"""
+        return [body for m, p, body in self.requests if m == method and (path is None or p == path)]
+
+    def respond(self, handler: "_Handler", method: str, path: str, body: bytes) -> None:
+        """Warning: This method is private and should not be called manually"""
+        custom = self.handlers.get((method, path))
+        if custom is not None:
+            custom(handler, body)
+            return
+        if path.startswith("/api/v1/auth"):
+            token = jwt.encode({"exp": int(time.time()) + 3600}, "fake-api-signing-key-of-32-bytes", algorithm="HS256")
+            handler.send_data({"access_token": token, "refresh_token": "refresh"})
+        elif path == "/api/v1/models":
+            handler.send_data({"Models": []})
+        elif path.startswith("/api/v1/prompts"):
+            handler.send_data({"response": "echo:" + json.loads(body or b"{}").get("prompt", "")})
+        elif path == "/api/v1/datasources" and method == "POST":
+            handler.send_data({"datasource": {"id": 6}})
+        elif path == "/api/v1/datasources":
+            handler.send_data({"datasources": [
+                {key: value for key, value in self.datasource.items() if key != "media"}]})
+        elif path.startswith("/api/v1/datasources/") and method == "PUT":
+            handler.send_data({"datasource": self.datasource})
+        elif path.startswith("/api/v1/datasources/"):
+            handler.send_data({"datasource": self.datasource})
+        else:
+            handler.send_data({}, status=404)
+
+
+class _Handler(BaseHTTPRequestHandler):
+    """Warning: This class is private and should not be instantiated manually"""
+    protocol_version = "HTTP/1.1"
+    disable_nagle_algorithm = True
+    server: "_Server"
+
+    def log_message(self, format, *args) -> None:  # pylint: disable=redefined-builtin
+        pass
+
+    def send_data(self, data, status: int = 200) -> None:
+        """Send data wrapped like the api"""
+        body = json.dumps({"messageContent": {"data": data}}).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _handle(self, method: str) -> None:
+        body = self.rfile.read(int(self.headers.get("Content-Length", 0)))
+        self.server.api.requests.append((method, self.path, body))
+        self.server.api.respond(self, method, self.path, body)
+
+    def do_GET(self) -> None:  # pylint: disable=invalid-name
+        self._handle("GET")
+
+    def do_POST(self) -> None:  # pylint: disable=invalid-name
+        self._handle("POST")
+
+    def do_PUT(self) -> None:  # pylint: disable=invalid-name
+        self._handle("PUT")
+
+    def do_DELETE(self) -> None:  # pylint: disable=invalid-name
+        self._handle("DELETE")
+
+
+class _Server(ThreadingHTTPServer):
+    """Warning: This class is private and should not be instantiated manually"""
+    daemon_threads = True
+    api: FakeApi
+
+    def handle_error(self, request, client_address) -> None:
+        # clients abandon slow responses on purpose
+        pass
+
+
+@pytest.fixture
+def api():
+    """The stand-in api (served on a local port while the test runs)"""
+    server = _Server(("127.0.0.1", 0), _Handler)
+    server.api = FakeApi()
+    server.api.url = f"http://127.0.0.1:{server.server_address[1]}"
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield server.api
+    server.shutdown()
+    server.server_close()
+
+
+@pytest.fixture
+def credential(api):
+    """A credential logged in at the stand-in api"""
+    return TokenCredential(api.url, "user", "password", allow_insecure_http=True)
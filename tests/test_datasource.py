@@ -0,0 +1,70 @@
+"""Tests of the datasource updates"""
+import asyncio
+import json
+import pytest
+from brandcompete.client import AIManServiceClient, AsyncAIManServiceClient
+from conftest import MEDIA
+
+NEW_MEDIA = {"name": "c.pdf", "base64": "Q0ND", "mime_type": "application/pdf", "size": 3}
+
+
+def test_listing_datasource_media_not_loaded(api, credential):
+    datasource = AIManServiceClient(credential).fetch_all_datasources()[0]
+    assert datasource.is_tracked
+    assert not datasource.media_loaded
+
+
+def test_update_of_listing_datasource_keeps_existing_media(api, credential):
+    client = AIManServiceClient(credential)
+    datasource = client.fetch_all_datasources()[0]
+    datasource.add_media(dict(NEW_MEDIA))
+    client.update_datasource(datasource)
+
+    payload = json.loads(api.sent("PUT", "/api/v1/datasources/5")[-1])
+    assert [media.get("name") for media in payload["media"]] == ["a.pdf", "b.pdf", "c.pdf"]
+    # the existing media are referenced without their body, the new one is uploaded
+    assert [("base64" in media) for media in payload["media"]] == [False, False, True]
+    assert datasource.media_loaded
+
+
+def test_update_of_listing_datasource_without_media_change(api, credential):
+    client = AIManServiceClient(credential)
+    datasource = client.fetch_all_datasources()[0]
+    datasource.name = "renamed"
+    client.update_datasource(datasource)
+
+    assert json.loads(api.sent("PUT", "/api/v1/datasources/5")[-1]) == {"name": "renamed"}
+    assert api.sent("GET", "/api/v1/datasources/5") == []
+
+
+def test_update_payload_of_unloaded_media_raises(api, credential):
+    client = AIManServiceClient(credential)
+    datasource = client.fetch_all_datasources()[0]
+    datasource.add_media(dict(NEW_MEDIA))
+    with pytest.raises(ValueError):
+        client._build_update_payload(datasource, delta=True)  # pylint: disable=protected-access
+
+
+def test_full_update_of_listing_datasource_sends_all_media(api, credential):
+    client = AIManServiceClient(credential)
+    datasource = client.fetch_all_datasources()[0]
+    datasource.add_media(dict(NEW_MEDIA))
+    client.update_datasource(datasource, delta=False)
+
+    payload = json.loads(api.sent("PUT", "/api/v1/datasources/5")[-1])
+    assert payload["media"] == MEDIA + [NEW_MEDIA]
+
+
+def test_async_update_of_listing_datasource_keeps_existing_media(api, credential):
+    async def update():
+        client = AsyncAIManServiceClient(credential)
+        try:
+            datasource = (await client.fetch_all_datasources())[0]
+            datasource.add_media(dict(NEW_MEDIA))
+            await client.update_datasource(datasource)
+        finally:
+            await client.close()
+
+    asyncio.run(update())
+    payload = json.loads(api.sent("PUT", "/api/v1/datasources/5")[-1])
+    assert [media.get("name") for media in payload["media"]] == ["a.pdf", "b.pdf", "c.pdf"]
@@ -0,0 +1,33 @@
+"""Tests of the import cost of the package (measured in a fresh interpreter)"""
+import json
+import subprocess
+import sys
+
+# seconds, generous for slow CI machines (about 0.2 seconds on a laptop)
+IMPORT_BUDGET = 1.5
+# imported on first use only: data frames, the async client, the fast json libraries and the document loaders
+LAZY_MODULES = ["pandas", "aiohttp", "orjson", "PyPDF2", "docx2txt", "openpyxl"]
+
+SCRIPT = """
+import json, sys, time
+start = time.perf_counter()
+import brandcompete
+from brandcompete.client import AIManServiceClient
+seconds = time.perf_counter() - start
+print(json.dumps({"seconds": seconds, "modules": [name for name in %r if name in sys.modules]}))
+"""
+
+
+def measure_import() -> dict:
+    """Import the package in a subprocess, returns the seconds and the loaded lazy modules"""
+    output = subprocess.run(
+        [sys.executable, "-c", SCRIPT % (LAZY_MODULES,)], capture_output=True, check=True, text=True).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def test_import_within_budget():
+    assert measure_import()["seconds"] < IMPORT_BUDGET
+
+
+def test_import_leaves_optional_dependencies_unloaded():
+    assert measure_import()["modules"] == []
@@ -0,0 +1,75 @@
+"""Tests of the resending of requests whose connection was reset"""
+import asyncio
+import aiohttp
+import pytest
+import requests
+from brandcompete.client import AIManServiceClient, AsyncAIManServiceClient
+
+PROMPT_ROUTE = "/api/v1/prompts/1"
+
+
+def drop_connection(handler, body) -> None:  # pylint: disable=unused-argument
+    """Close the connection without a response, like a host closing an idle keep-alive connection"""
+    handler.close_connection = True
+
+
+def drop_first(handler, body) -> None:
+    """Close the connection of the first request, respond to the others"""
+    if len(handler.server.api.sent("POST", PROMPT_ROUTE)) == 1:
+        drop_connection(handler, body)
+    else:
+        handler.send_data({"response": "echo"})
+
+
+def test_create_is_not_resent(api, credential):
+    api.on("POST", "/api/v1/datasources", drop_connection)
+    client = AIManServiceClient(credential)
+    client.fetch_all_datasources()  # the create is sent on the pooled connection
+    with pytest.raises(requests.ConnectionError):
+        client.init_new_datasource(name="docs", summary="s")
+    assert len(api.sent("POST", "/api/v1/datasources")) == 1
+
+
+def test_prompt_on_reused_connection_is_resent(api, credential):
+    api.on("POST", PROMPT_ROUTE, drop_first)
+    client = AIManServiceClient(credential)
+    client.fetch_all_datasources()
+    assert client.prompt(model_tag=1, query="hi") == {"response": "echo"}
+    assert len(api.sent("POST", PROMPT_ROUTE)) == 2
+
+
+def test_prompt_on_new_connection_is_not_resent(api, credential):
+    api.on("POST", PROMPT_ROUTE, drop_first)
+    client = AIManServiceClient(credential)
+    with pytest.raises(requests.ConnectionError):
+        client.prompt(model_tag=1, query="hi")
+    assert len(api.sent("POST", PROMPT_ROUTE)) == 1
+
+
+def test_async_create_is_not_resent(api, credential):
+    async def create():
+        client = AsyncAIManServiceClient(credential)
+        try:
+            await client.fetch_all_datasources()
+            await client.init_new_datasource(name="docs", summary="s")
+        finally:
+            await client.close()
+
+    api.on("POST", "/api/v1/datasources", drop_connection)
+    with pytest.raises(aiohttp.ServerDisconnectedError):
+        asyncio.run(create())
+    assert len(api.sent("POST", "/api/v1/datasources")) == 1
+
+
+def test_async_prompt_on_reused_connection_is_resent(api, credential):
+    async def prompt():
+        client = AsyncAIManServiceClient(credential)
+        try:
+            await client.fetch_all_datasources()
+            return await client.prompt(model_tag=1, query="hi")
+        finally:
+            await client.close()
+
+    api.on("POST", PROMPT_ROUTE, drop_first)
+    assert asyncio.run(prompt()) == {"response": "echo"}
+    assert len(api.sent("POST", PROMPT_ROUTE)) == 2
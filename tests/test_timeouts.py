@@ -0,0 +1,45 @@
+"""Tests of the deadlines of requests"""
+import asyncio
+import time
+import pytest
+import requests
+from brandcompete.client import AIManServiceClient, AsyncAIManServiceClient
+from brandcompete.core.batch import PromptJob
+from brandcompete.core.exceptions import DeadlineExceededError
+
+PROMPT_ROUTE = "/api/v1/prompts/1"
+
+
+def slow_response(handler, body) -> None:  # pylint: disable=unused-argument
+    """Respond after the deadline of the tests"""
+    time.sleep(0.5)
+    handler.send_data({"response": "late"})
+
+
+def test_prompt_deadline_raises_deadline_exceeded(api, credential):
+    api.on("POST", PROMPT_ROUTE, slow_response)
+    client = AIManServiceClient(credential)
+    with pytest.raises(DeadlineExceededError) as info:
+        client.prompt(model_tag=1, query="hi", deadline=0.05)
+    assert isinstance(info.value.__cause__, requests.Timeout)
+
+
+def test_prompt_many_reports_deadline_exceeded(api, credential):
+    api.on("POST", PROMPT_ROUTE, slow_response)
+    client = AIManServiceClient(credential)
+    results = list(client.prompt_many([PromptJob(model_tag=1, query="hi")], deadline=0.05))
+    assert isinstance(results[0].error, DeadlineExceededError)
+
+
+def test_async_prompt_deadline_raises_deadline_exceeded(api, credential):
+    async def prompt():
+        client = AsyncAIManServiceClient(credential)
+        try:
+            return await client.prompt(model_tag=1, query="hi", deadline=0.05)
+        finally:
+            await client.close()
+
+    api.on("POST", PROMPT_ROUTE, slow_response)
+    with pytest.raises(DeadlineExceededError) as info:
+        asyncio.run(prompt())
+    assert isinstance(info.value.__cause__, asyncio.TimeoutError)